@@ -0,0 +1,154 @@
+import collections
+import socket
+import struct
+import threading
+import time
+from typing import Optional
+
+from ip_state import ip_to_int
+
+
+# Reasons a connection can be shed, in the order they are checked
+SHED_REASONS = ('global', 'ip', 'prefix')
+
+
+class AdmissionController:
+    """
+    Decides at accept time whether a connection may be trapped.
+
+    Enforces a cap on concurrently trapped connections overall, per IP
+    and per network prefix (/24 for IPv4 and /64 for IPv6 by default).
+    A cap of 0 disables that check. Admitted connections must be handed
+    back with release() when they close.
+    """
+    def __init__(self, max_active: int, max_per_ip: int = 0, max_per_prefix: int = 0,
+                 prefix_v4: int = 24, prefix_v6: int = 64):
+        self.max_active = max_active
+        self.max_per_ip = max_per_ip
+        self.max_per_prefix = max_per_prefix
+        self.prefix_v4 = prefix_v4
+        self.prefix_v6 = prefix_v6
+        self.active = 0
+        self.per_ip = {}  # ip -> trapped connections
+        self.per_prefix = {}  # prefix key -> trapped connections
+        self.lock = threading.Lock()
+
+    def _prefix(self, ip: str) -> int:
+        key = ip_to_int(ip)
+        if key >> 32 == 0xFFFF:
+            return key >> (32 - self.prefix_v4)
+        return (1 << 128 | key) >> (128 - self.prefix_v6)  # Keep v6 prefixes apart from v4
+
+    def admit(self, ip: str) -> Optional[str]:
+        """
+        Try to admit a connection from an IP.
+
+        Args:
+            ip: Client IP address
+
+        Returns:
+            None if admitted, otherwise the shed reason ('global', 'ip' or 'prefix')
+        """
+        prefix = self._prefix(ip) if self.max_per_prefix else None
+        with self.lock:
+            if self.max_active and self.active >= self.max_active:
+                return 'global'
+            if self.max_per_ip and self.per_ip.get(ip, 0) >= self.max_per_ip:
+                return 'ip'
+            if prefix is not None and self.per_prefix.get(prefix, 0) >= self.max_per_prefix:
+                return 'prefix'
+            self.active += 1
+            self.per_ip[ip] = self.per_ip.get(ip, 0) + 1
+            if prefix is not None:
+                self.per_prefix[prefix] = self.per_prefix.get(prefix, 0) + 1
+        return None
+
+    def release(self, ip: str):
+        """
+        Hand back the slot of an admitted connection that has closed.
+
+        Args:
+            ip: Client IP address
+        """
+        prefix = self._prefix(ip) if self.max_per_prefix else None
+        with self.lock:
+            self.active -= 1
+            if self.per_ip[ip] > 1:
+                self.per_ip[ip] -= 1
+            else:
+                del self.per_ip[ip]
+            if prefix is not None:
+                if self.per_prefix[prefix] > 1:
+                    self.per_prefix[prefix] -= 1
+                else:
+                    del self.per_prefix[prefix]
+
+
+class OverflowTarpit:
+    """
+    Holds shed connections open without serving them.
+
+    A parked socket gets a minimal receive buffer and is never read or
+    written, so the kernel alone keeps the client waiting; it costs a
+    file descriptor but no thread, task or timer. At most `limit` sockets
+    are held (the oldest is closed to make room) and each is closed after
+    `hold_time` seconds. Expiry is checked whenever another socket is
+    parked, and by each engine calling expire() every `expiry_interval`
+    seconds, so sockets are released after a flood stops too.
+    """
+    expiry_interval = 1.0
+
+    def __init__(self, limit: int, hold_time: float):
+        self.limit = limit
+        self.hold_time = hold_time
+        self.parked = collections.deque()  # (deadline, closable), oldest first
+        self.lock = threading.Lock()
+
+    def park(self, closable):
+        """
+        Park a connection.
+
+        Args:
+            closable: Socket or stream writer; only close() is called on it
+        """
+        with self.lock:
+            self.parked.append((time.monotonic() + self.hold_time, closable))
+        self.expire()
+
+    def expire(self):
+        """
+        Close connections held past `hold_time` or beyond `limit`.
+
+        Must run where closing a parked connection is safe: for asyncio
+        stream writers, on the event loop.
+        """
+        now = time.monotonic()
+        expired = []
+        with self.lock:
+            while self.parked and (len(self.parked) > self.limit or self.parked[0][0] <= now):
+                expired.append(self.parked.popleft()[1])
+        for closable in expired:
+            _close_quietly(closable)
+
+    def close_all(self):
+        with self.lock:
+            parked, self.parked = self.parked, collections.deque()
+        for _, closable in parked:
+            _close_quietly(closable)
+
+    def __len__(self):
+        return len(self.parked)
+
+
+def _close_quietly(closable):
+    try:
+        closable.close()
+    except Exception:
+        pass
+
+
+def set_rst_on_close(client_socket: socket.socket):
+    """
+    Make close() reset the connection (SO_LINGER with a zero timeout).
+    """
+    client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
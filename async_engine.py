@@ -0,0 +1,235 @@
+import asyncio
+import os
+import resource
+import socket
+import time
+
+from tarpit import endless_line
+from zero_window import shrink_receive_buffer
+
+
+def raise_nofile_limit(logger=None):
+    """
+    Raise the soft open-file limit to the hard limit.
+
+    Every trapped client holds a file descriptor, so the default soft
+    limit (often 1024) caps the engine long before memory does.
+    """
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard == resource.RLIM_INFINITY or hard > soft:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+            if logger:
+                logger.info(f"Raised open file limit from {soft} to {hard}")
+    except (ValueError, OSError) as e:
+        if logger:
+            logger.warning(f"Could not raise open file limit: {e}")
+
+
+class AsyncEngine:
+    """
+    Asyncio connection engine for DeadlockSSH.
+
+    Each trapped client is a coroutine on a single event loop instead of
+    an OS thread, so tens of thousands of clients cost only a few KB each.
+    Statistics and adaptive delays are shared with the threaded engine
+    through the honeypot's register/release helpers.
+    """
+    def __init__(self, honeypot):
+        self.honeypot = honeypot
+        self.config = honeypot.config
+        self.logger = honeypot.logger
+        self.loop = None
+        self.server = None
+        self.tasks = set()
+        self._stop_event = None
+
+    def run(self):
+        """
+        Run the event loop until stop() is called.
+        """
+        raise_nofile_limit(self.logger)
+        asyncio.run(self._serve())
+
+    def stop(self):
+        """
+        Ask the event loop to stop. Safe to call from any thread or a signal handler.
+        """
+        if self.loop and not self.loop.is_closed() and self._stop_event:
+            self.loop.call_soon_threadsafe(self._stop_event.set)
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+
+        self.server = await asyncio.start_server(
+            self.handle_client,
+            host='0.0.0.0',
+            port=self.config['port'],
+            backlog=self.config['max_connections'],
+            reuse_address=True,
+            reuse_port=self.honeypot.reuse_port or None
+        )
+        if self.honeypot.zero_window:
+            # Accepted sockets inherit a minimal receive window
+            for server_socket in self.server.sockets:
+                shrink_receive_buffer(server_socket)
+        self.logger.info(f"DeadlockSSH listening on port {self.config['port']} (asyncio engine)")
+        if self.config['overflow_policy'] == 'tarpit':
+            self._expire_overflow()
+
+        try:
+            await self._stop_event.wait()
+        finally:
+            self.server.close()
+            for task in list(self.tasks):
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def _expire_overflow(self):
+        # Parked writers must be closed on the loop; this also closes them
+        # on time when no new connections arrive
+        self.honeypot.overflow_tarpit.expire()
+        self.loop.call_later(self.honeypot.overflow_tarpit.expiry_interval, self._expire_overflow)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Coroutine equivalent of DeadlockSSH.handle_client.
+
+        Args:
+            reader: Stream reader for the client
+            writer: Stream writer for the client
+        """
+        # asyncio accepted the socket just before scheduling this callback
+        accepted = time.monotonic()
+        task = asyncio.current_task()
+        self.tasks.add(task)
+
+        client_address = writer.get_extra_info('peername')
+        client_ip = client_address[0]
+        registered = False
+        parked = False
+
+        reason = self.honeypot.admission.admit(client_ip)
+        if reason:
+            if self.config['overflow_policy'] == 'tarpit':
+                writer.transport.pause_reading()
+            self.honeypot.shed_connection(writer.get_extra_info('socket'), client_address, reason, closable=writer)
+            self.tasks.discard(task)
+            return
+
+        try:
+            # Enable TCP keepalive for client socket if configured
+            client_socket = writer.get_extra_info('socket')
+            if self.config['tcp_keepalive'] and client_socket is not None:
+                client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+            current_delay = self.honeypot.register_connection(client_ip, client_address[1], accepted)
+            registered = True
+
+            # Apply adaptive delay
+            if current_delay > 0:
+                await asyncio.sleep(current_delay)
+            self.honeypot.banner_started(client_address)
+
+            if self.config['tarpit_mode'] == 'endless':
+                # Never finish the banner; trickle pre-banner lines forever
+                await self.send_endless_banner(writer, client_address)
+            else:
+                # Send SSH banner slowly
+                if await self.send_ssh_banner(writer, client_address):
+                    self.honeypot.banner_complete(client_address)
+
+                # Keep connection open and log any data received
+                if await self.monitor_connection(reader, client_address):
+                    writer.transport.pause_reading()
+                    # Hand a duplicate of the socket to the parker; closing the
+                    # transport's copy below leaves the connection open
+                    client_socket = writer.get_extra_info('socket')
+                    self.honeypot.park_zero_window(
+                        socket.socket(fileno=os.dup(client_socket.fileno())), client_address)
+                    parked = True
+
+        except asyncio.CancelledError:
+            pass
+        except ConnectionResetError:
+            self.logger.info(f"Connection from {client_ip} reset by peer")
+        except Exception as e:
+            self.logger.error(f"Error handling client {client_ip}: {e}")
+        finally:
+            writer.close()
+            if parked:
+                pass  # Released by the zero-window parker
+            elif registered:
+                self.honeypot.release_connection(client_ip, client_address[1])
+            else:
+                self.honeypot.admission.release(client_ip)
+            self.tasks.discard(task)
+
+    async def send_ssh_banner(self, writer: asyncio.StreamWriter, client_address: tuple) -> bool:
+        """
+        Send SSH banner byte by byte with delay.
+
+        Args:
+            writer: Stream writer for the client
+            client_address: Client address tuple (ip, port)
+
+        Returns:
+            True if the whole banner was sent
+        """
+        banner = (self.config['ssh_banner'] + '\r\n').encode('utf-8')
+
+        for i in range(len(banner)):
+            if writer.is_closing():
+                return False
+            writer.write(banner[i:i + 1])
+            self.honeypot.record_bytes_sent(client_address, 1)
+            await writer.drain()
+            await asyncio.sleep(self.config['banner_delay'])
+        return True
+
+    async def send_endless_banner(self, writer: asyncio.StreamWriter, client_address: tuple):
+        """
+        Send one random pre-banner line per interval until the client leaves.
+
+        Args:
+            writer: Stream writer for the client
+            client_address: Client address tuple (ip, port)
+        """
+        while self.honeypot.running and not writer.is_closing():
+            line = endless_line(self.config['endless_line_length'])
+            writer.write(line)
+            self.honeypot.record_bytes_sent(client_address, len(line))
+            await writer.drain()
+            await asyncio.sleep(self.config['endless_interval'])
+
+    async def monitor_connection(self, reader: asyncio.StreamReader, client_address: tuple) -> bool:
+        """
+        Log any data received from client until it disconnects.
+
+        Args:
+            reader: Stream reader for the client
+            client_address: Client address tuple (ip, port)
+
+        Returns:
+            True if reading stopped at the zero-window capture limit
+        """
+        capture = self.honeypot.new_capture()
+        limit = self.config['zero_window_capture_bytes'] if self.honeypot.zero_window else None
+
+        try:
+            while self.honeypot.running:
+                # Never read past the end of the ring, so a held capture cannot wrap
+                if limit is None:
+                    data = await reader.read(capture.room())
+                else:
+                    data = await reader.read(capture.room(limit - capture.total))
+                if not data:
+                    break
+
+                self.honeypot.log_received_data(client_address, capture, capture.feed(data))
+                if limit is not None and capture.total >= limit:
+                    return True
+            return False
+        finally:
+            self.honeypot.end_capture(client_address, capture)
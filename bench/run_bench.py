@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+DeadlockSSH Benchmark Suite
+
+Launches DeadlockSSH on a loopback port, drives it with simulated scanner
+clients and prints the results as JSON, so runs can be compared across
+engines, settings and commits.
+
+Client behaviors:
+- wait: connect, read the banner and hold the connection open
+- kexinit: like wait, but answer the banner with a client version string
+  and an SSH_MSG_KEXINIT packet, as real scanners do
+- storm: connect and hang up over and over for the hold time
+
+Reported per run: accept rate, p50/p99 time to first byte, server RSS
+per held connection, server CPU per connection and log throughput.
+Server figures are read from /proc, so the suite runs on Linux only.
+
+Usage:
+    python3 bench/run_bench.py --engine threaded,reactor --clients 2000 --rate 500
+"""
+
+import argparse
+import asyncio
+import configparser
+import json
+import math
+import multiprocessing
+import os
+import random
+import resource
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from queue import Empty
+from typing import Dict, List, Optional
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_SCRIPT = os.path.join(REPO_DIR, 'deadlockssh.py')
+
+BEHAVIORS = ('wait', 'kexinit', 'storm')
+
+CLIENT_VERSION = b'SSH-2.0-Go\r\n'
+
+# Algorithm name-lists of the KEXINIT packet, in protocol order
+KEXINIT_NAME_LISTS = (
+    b'curve25519-sha256,diffie-hellman-group14-sha256',
+    b'ssh-ed25519,rsa-sha2-256',
+    b'aes128-ctr,aes256-ctr', b'aes128-ctr,aes256-ctr',
+    b'hmac-sha2-256', b'hmac-sha2-256',
+    b'none', b'none',
+    b'', b''
+)
+
+
+def build_kexinit() -> bytes:
+    """
+    Build an unencrypted SSH_MSG_KEXINIT binary packet (RFC 4253 section 7.1).
+
+    Returns:
+        Packet bytes ready to send after the version exchange
+    """
+    payload = bytes([20]) + os.urandom(16)
+    for name_list in KEXINIT_NAME_LISTS:
+        payload += struct.pack('>I', len(name_list)) + name_list
+    payload += b'\x00' + struct.pack('>I', 0)  # first_kex_packet_follows, reserved
+    # Padding of at least 4 bytes brings the packet to a multiple of 8
+    padding = 8 - (5 + len(payload)) % 8
+    if padding < 4:
+        padding += 8
+    return struct.pack('>IB', 1 + len(payload) + padding, padding) + payload + os.urandom(padding)
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """
+    Parse a behavior mix such as "wait=0.7,kexinit=0.2,storm=0.1".
+
+    A bare behavior name means all clients behave that way.
+    """
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in BEHAVIORS:
+            raise ValueError(f"unknown behavior {name!r} (expected one of {', '.join(BEHAVIORS)})")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """
+    Return the nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return round(sorted_values[index], 6)
+
+
+def raise_nofile_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or hard > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+# --- Server process accounting (/proc) ---
+
+def process_tree(pid: int) -> List[int]:
+    """
+    Return a process and its children (the worker processes, if any).
+    """
+    pids = [pid]
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return pids
+
+
+def tree_usage(pid: int) -> tuple:
+    """
+    Return (RSS in KiB, CPU seconds) summed over a process tree.
+    """
+    rss = 0
+    cpu = 0.0
+    ticks = os.sysconf('SC_CLK_TCK')
+    for member in process_tree(pid):
+        try:
+            with open(f'/proc/{member}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        rss += int(line.split()[1])
+                        break
+            with open(f'/proc/{member}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / ticks
+        except (OSError, IndexError, ValueError):
+            pass
+    return rss, cpu
+
+
+def log_volume(directory: str) -> tuple:
+    """
+    Return (lines, bytes) written to the log files in a run directory,
+    including rotated backups.
+    """
+    lines = 0
+    size = 0
+    for name in os.listdir(directory):
+        if name.startswith(('honeypot.log', 'events.jsonl')):
+            with open(os.path.join(directory, name), 'rb') as f:
+                data = f.read()
+            lines += data.count(b'\n')
+            size += len(data)
+    return lines, size
+
+
+# --- Simulated clients ---
+
+class ClientRunner:
+    """
+    One load-generator process: opens its share of clients on an asyncio loop.
+    """
+    def __init__(self, port: int, clients: int, rate: float, mix: Dict[str, float],
+                 hold: float, timeout: float, held, seed: int):
+        self.port = port
+        self.clients = clients
+        self.rate = rate
+        self.mix = mix
+        self.hold = hold
+        self.timeout = timeout
+        self.held = held  # Shared count of currently open connections
+        self.random = random.Random(seed)
+        self.results = {
+            'attempted': 0, 'established': 0, 'connect_errors': 0,
+            'storm_connects': 0, 'ttfb': [], 'first_connect': None, 'last_connect': None
+        }
+
+    def run(self) -> dict:
+        asyncio.run(self._run())
+        return self.results
+
+    async def _run(self):
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        tasks = []
+        for _ in range(self.clients):
+            behavior = self.random.choices(names, weights)[0]
+            tasks.append(asyncio.create_task(getattr(self, '_' + behavior)()))
+            if self.rate > 0:
+                # Poisson arrivals at the requested rate
+                await asyncio.sleep(self.random.expovariate(self.rate))
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _connect(self):
+        self.results['attempted'] += 1
+        started = time.monotonic()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection('127.0.0.1', self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            self.results['connect_errors'] += 1
+            return None, None, started
+        now = time.time()
+        self.results['established'] += 1
+        if self.results['first_connect'] is None:
+            self.results['first_connect'] = now
+        self.results['last_connect'] = now
+        return reader, writer, started
+
+    async def _hold(self, kexinit: bool):
+        reader, writer, started = await self._connect()
+        if writer is None:
+            return
+        with self.held.get_lock():
+            self.held.value += 1
+        try:
+            try:
+                await asyncio.wait_for(reader.readexactly(1), self.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                return
+            self.results['ttfb'].append(time.monotonic() - started)
+            if kexinit:
+                await self._send_kexinit(reader, writer, started)
+            # Hold until the hold time is up, discarding anything sent
+            deadline = started + self.hold
+            while time.monotonic() < deadline:
+                try:
+                    if not await asyncio.wait_for(reader.read(4096), deadline - time.monotonic()):
+                        return
+                except asyncio.TimeoutError:
+                    break
+        except OSError:
+            pass
+        finally:
+            with self.held.get_lock():
+                self.held.value -= 1
+            writer.close()
+
+    async def _send_kexinit(self, reader, writer, started: float):
+        # Wait for the server's version line, skipping endless-mode filler
+        deadline = started + self.hold
+        while time.monotonic() < deadline:
+            try:
+                line = await asyncio.wait_for(reader.readline(), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                return
+            if not line:
+                return
+            if line.startswith(b'SSH-'):
+                break
+        writer.write(CLIENT_VERSION + build_kexinit())
+        await writer.drain()
+
+    async def _wait(self):
+        await self._hold(kexinit=False)
+
+    async def _kexinit(self):
+        await self._hold(kexinit=True)
+
+    async def _storm(self):
+        # Reconnect as fast as possible for the hold time
+        deadline = time.monotonic() + self.hold
+        while time.monotonic() < deadline:
+            reader, writer, _ = await self._connect()
+            if writer is None:
+                await asyncio.sleep(0.01)
+                continue
+            self.results['storm_connects'] += 1
+            writer.close()
+
+
+def _client_process(queue, *args):
+    raise_nofile_limit()
+    try:
+        queue.put(ClientRunner(*args).run())
+    except Exception as e:
+        queue.put({'error': str(e)})
+
+
+# --- Runs ---
+
+def write_config(directory: str, args, engine: str) -> str:
+    """
+    Write the server configuration for one run and return its path.
+    """
+    config = configparser.ConfigParser()
+    config['honeypot'] = {
+        'port': str(args.port),
+        'engine': engine,
+        'workers': str(args.workers),
+        'max_connections': str(args.max_connections),
+        'log_file': os.path.join(directory, 'honeypot.log'),
+        'enable_http_stats': 'True',
+        'http_stats_port': str(args.stats_port),
+        'http_stats_cache_ttl': '0',
+        # Every client shares one loopback IP; without this each closed
+        # connection would lengthen the delay for all the others
+        'delay_increment': '0'
+    }
+    if args.event_log:
+        config['honeypot']['event_log_file'] = os.path.join(directory, 'events.jsonl')
+    for override in args.set:
+        key, _, value = override.partition('=')
+        config['honeypot'][key.strip()] = value.strip()
+    path = os.path.join(directory, 'bench.ini')
+    with open(path, 'w') as f:
+        config.write(f)
+    return path
+
+
+def wait_for_server(directory: str, process: subprocess.Popen, timeout: float = 15.0):
+    """
+    Wait until the server logs that it is listening (without connecting to it).
+    """
+    log_path = os.path.join(directory, 'honeypot.log')
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            with open(log_path, 'rb') as f:
+                if b'DeadlockSSH listening on port' in f.read():
+                    time.sleep(0.2)  # Let workers and the stats server finish starting
+                    return
+        except FileNotFoundError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError("server did not start listening in time")
+
+
+def fetch_stats(port: int) -> dict:
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/stats', timeout=5) as response:
+            return json.loads(response.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def run_once(args, engine: str) -> dict:
+    """
+    Benchmark one engine and return its results.
+    """
+    with tempfile.TemporaryDirectory(prefix='deadlockssh-bench-') as directory:
+        config_path = write_config(directory, args, engine)
+        server = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, '-c', config_path],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=directory
+        )
+        try:
+            wait_for_server(directory, server)
+            time.sleep(args.settle)
+            rss_baseline, cpu_start = tree_usage(server.pid)
+            lines_start, bytes_start = log_volume(directory)
+
+            held = multiprocessing.Value('i', 0)
+            queue = multiprocessing.Queue()
+            processes = []
+            for i in range(args.client_procs):
+                share = args.clients // args.client_procs + (i < args.clients % args.client_procs)
+                process = multiprocessing.Process(
+                    target=_client_process,
+                    args=(queue, args.port, share, args.rate / args.client_procs, args.mix,
+                          args.hold, args.timeout, held, args.seed + i),
+                    daemon=True
+                )
+                process.start()
+                processes.append(process)
+
+            # Sample the server while the clients run
+            started = time.monotonic()
+            peak_held = 0
+            rss_at_peak = rss_baseline
+            rss_peak = rss_baseline
+            reports = []
+            while len(reports) < len(processes):
+                try:
+                    reports.append(queue.get(timeout=args.sample_interval))
+                except Empty:
+                    pass
+                rss, _ = tree_usage(server.pid)
+                rss_peak = max(rss_peak, rss)
+                if held.value > peak_held:
+                    peak_held, rss_at_peak = held.value, rss
+            duration = time.monotonic() - started
+            for process in processes:
+                process.join()
+
+            time.sleep(args.settle)  # Let the server log the final closes
+            _, cpu_end = tree_usage(server.pid)
+            lines_end, bytes_end = log_volume(directory)
+            stats = fetch_stats(args.stats_port)
+        finally:
+            server.send_signal(signal.SIGINT)
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+
+    errors = [report['error'] for report in reports if 'error' in report]
+    reports = [report for report in reports if 'error' not in report]
+    ttfb = sorted(sample for report in reports for sample in report['ttfb'])
+    established = sum(report['established'] for report in reports)
+    firsts = [report['first_connect'] for report in reports if report['first_connect']]
+    lasts = [report['last_connect'] for report in reports if report['last_connect']]
+    connect_window = max(lasts) - min(firsts) if firsts else 0.0
+    server_connections = stats.get('total_connections', established)
+    cpu_seconds = cpu_end - cpu_start
+    log_lines = lines_end - lines_start
+    log_bytes = bytes_end - bytes_start
+
+    return {
+        'engine': engine,
+        'results': {
+            'duration_s': round(duration, 3),
+            'connections_attempted': sum(report['attempted'] for report in reports),
+            'connections_established': established,
+            'connect_errors': sum(report['connect_errors'] for report in reports),
+            'storm_connects': sum(report['storm_connects'] for report in reports),
+            'server_connections': server_connections,
+            'connections_shed': stats.get('connections_shed'),
+            'accept_rate_per_s': round(established / connect_window, 1) if connect_window > 0 else None,
+            'ttfb_samples': len(ttfb),
+            'ttfb_p50_s': percentile(ttfb, 0.50),
+            'ttfb_p99_s': percentile(ttfb, 0.99),
+            'peak_held_connections': peak_held,
+            'rss_baseline_kb': rss_baseline,
+            'rss_peak_kb': rss_peak,
+            'rss_per_held_connection_kb': round((rss_at_peak - rss_baseline) / peak_held, 2) if peak_held else None,
+            'cpu_seconds': round(cpu_seconds, 3),
+            'cpu_ms_per_connection': round(1000 * cpu_seconds / server_connections, 3) if server_connections else None,
+            'log_lines': log_lines,
+            'log_bytes': log_bytes,
+            'log_lines_per_s': round(log_lines / duration, 1) if duration else None,
+            'log_bytes_per_s': round(log_bytes / duration, 1) if duration else None,
+            'log_records_dropped': stats.get('log_records_dropped'),
+            'client_errors': errors
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DeadlockSSH benchmark suite')
+    parser.add_argument('--engine', default='threaded',
+                        help='Comma-separated engines to benchmark in turn (default: threaded)')
+    parser.add_argument('--workers', type=int, default=1, help='Server worker processes')
+    parser.add_argument('--clients', type=int, default=1000, help='Total simulated clients')
+    parser.add_argument('--rate', type=float, default=200.0,
+                        help='Client arrivals per second (0 to open them all at once)')
+    parser.add_argument('--behavior', default='wait',
+                        help='Behavior mix, e.g. "wait=0.7,kexinit=0.2,storm=0.1" (default: wait)')
+    parser.add_argument('--hold', type=float, default=10.0,
+                        help='Seconds each client holds its connection (or storms for)')
+    parser.add_argument('--timeout', type=float, default=60.0,
+                        help='Seconds a client waits to connect or for its first byte')
+    parser.add_argument('--client-procs', type=int, default=max(1, min(4, os.cpu_count() or 1)),
+                        help='Load-generator processes')
+    parser.add_argument('--port', type=int, default=22399, help='Loopback port for the server')
+    parser.add_argument('--stats-port', type=int, default=28399, help='Port for the server stats endpoint')
+    parser.add_argument('--max-connections', type=int, default=100000,
+                        help='Server max_connections (high so admission does not shed by default)')
+    parser.add_argument('--event-log', action='store_true', help='Also write the JSON-lines event log')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='Extra server config option (repeatable), e.g. --set banner_delay=0.1')
+    parser.add_argument('--settle', type=float, default=1.0,
+                        help='Seconds to let the server idle before and after the load')
+    parser.add_argument('--sample-interval', type=float, default=0.25,
+                        help='Seconds between server RSS samples')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for arrivals and behaviors')
+    parser.add_argument('-o', '--output', help='Write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    try:
+        args.mix = parse_mix(args.behavior)
+    except ValueError as e:
+        parser.error(str(e))
+    if not os.path.isdir('/proc'):
+        parser.error("the benchmark reads server usage from /proc and needs Linux")
+    raise_nofile_limit()
+
+    report = {
+        'benchmark': {
+            'clients': args.clients,
+            'rate': args.rate,
+            'behavior': args.mix,
+            'hold_s': args.hold,
+            'workers': args.workers,
+            'client_procs': args.client_procs,
+            'config': args.set,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'runs': [run_once(args, engine.strip()) for engine in args.engine.split(',')]
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
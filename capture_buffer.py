@@ -0,0 +1,84 @@
+import socket
+
+
+class CaptureBuffer:
+    """
+    Fixed-size ring buffer holding the most recent bytes from one client.
+
+    Data is received straight into the ring with recv_into, so capturing
+    costs no intermediate bytes objects and per-connection memory never
+    exceeds `capacity`. `total` counts every byte ever received and is
+    the stream offset of the next byte. While `holding` is set the bytes
+    are being held back to be stored as one payload, so the ring must
+    not wrap: reads stop at the end of the ring until it is released.
+    """
+    __slots__ = ('capacity', 'buffer', 'view', 'write_pos', 'total', 'holding')
+
+    def __init__(self, capacity: int, holding: bool = False):
+        self.capacity = max(1, capacity)
+        self.buffer = bytearray(self.capacity)
+        self.view = memoryview(self.buffer)
+        self.write_pos = 0
+        self.total = 0
+        self.holding = holding
+
+    def room(self, max_bytes: int = 1024) -> int:
+        """
+        Return how many bytes the next read may take in one piece.
+
+        Args:
+            max_bytes: Upper bound for the read
+
+        Returns:
+            Bytes left before the end of the ring, at most `max_bytes`
+        """
+        return min(max_bytes, self.capacity - self.write_pos)
+
+    def recv_into(self, client_socket: socket.socket, max_bytes: int = 1024) -> memoryview:
+        """
+        Receive the next chunk from a socket directly into the ring.
+
+        Args:
+            client_socket: Socket to read from
+            max_bytes: Maximum bytes to read in this call
+
+        Returns:
+            View of the newly received bytes (empty on EOF), valid until the next read
+        """
+        size = self.room(max_bytes)
+        start = self.write_pos
+        received = client_socket.recv_into(self.view[start:start + size], size)
+        self._advance(received)
+        return self.view[start:start + received]
+
+    def feed(self, data: bytes) -> memoryview:
+        """
+        Copy already-received bytes into the ring.
+
+        Args:
+            data: Bytes received from the client
+
+        Returns:
+            View of `data`
+        """
+        view = memoryview(data)
+        if len(view) > self.capacity:
+            view = view[-self.capacity:]
+        first = min(len(view), self.capacity - self.write_pos)
+        self.buffer[self.write_pos:self.write_pos + first] = view[:first]
+        self.buffer[:len(view) - first] = view[first:]
+        self.write_pos = (self.write_pos + len(view)) % self.capacity
+        self.total += len(data)
+        return memoryview(data)
+
+    def _advance(self, received: int):
+        self.write_pos = (self.write_pos + received) % self.capacity
+        self.total += received
+
+    def contents(self) -> bytes:
+        """
+        Return the retained bytes (the last `capacity` received) in order.
+        """
+        if self.total < self.capacity:
+            return bytes(self.view[:self.total])
+        return bytes(self.view[self.write_pos:]) + bytes(self.view[:self.write_pos])
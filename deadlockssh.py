@@ -7,32 +7,69 @@ connection attempts and analyze potential attackers.
 
 Features:
 - Configurable TCP port listening
-- Multi-threaded concurrent connections
-- Slow SSH banner transmission
-- Adaptive delay per client IP
-- Comprehensive logging with rotation
+- Multi-threaded concurrent connections with admission control and overload shedding
+- Optional asyncio engine for very large numbers of trapped clients
+- Optional single-threaded epoll reactor engine
+- Slow SSH banner transmission (optionally dripped from a single timer wheel)
+- Endless-banner tarpit mode that never completes the SSH handshake
+- Zero-window tarpit mode that parks clients on a tiny, unread receive buffer
+- Multi-process workers sharing the port via SO_REUSEPORT
+- Adaptive delay per client IP, tracked in a bounded, self-expiring store
+  that can live in a memory-mapped file to survive restarts
+- Comprehensive logging with rotation, written off the connection threads
+- Optional compressed (gzip or zstd), rotated and indexed log archive
+- Optional structured JSON-lines event log
+- Optional content-addressed payload store that logs repeated payloads by hash only
 - Graceful shutdown handling
-- Optional HTTP stats server
+- Optional HTTP stats server with a top attackers endpoint
+- Unique attacker counts per minute, hour and day from HyperLogLog sketches
+- Prometheus /metrics endpoint with connection, byte and timing histograms
+- Per-phase connection timing (accept, delay, banner, monitor) in log-bucket histograms
+- Live counts of client versions and HASSH fingerprints parsed from what clients send
+- Rolling per-second, per-minute and per-hour connection, byte and banner counts
 - TCP keepalive support
+- `analyze` subcommand reporting per-IP timelines, payload frequencies and
+  hourly connection rates from rotated and archived logs
 
 Author: Manus AI Assistant
 License: MIT
 """
 
+import os
 import socket
 import threading
 import time
 import json
 import logging
 import logging.handlers
+import queue
 import signal
 import sys
 import configparser
 from datetime import datetime
-from collections import defaultdict, Counter
-from typing import Dict, Set, Optional
+import heapq
+from typing import Dict, Set, Optional, Tuple
 import argparse
-from http_stats_server import HTTPStatsServer
+from http_stats_server import HTTPStatsServer, StatsPayload
+from async_engine import AsyncEngine
+from reactor import ReactorEngine
+from drip_scheduler import BannerDripScheduler
+from workers import WorkerSupervisor
+from ip_state import IPStateStore
+from log_pipeline import DroppingQueueHandler, BatchingQueueListener
+from log_archive import ArchiveHandler
+import log_analytics
+from event_log import JSONLEventSink
+from capture_buffer import CaptureBuffer
+from payload_store import PayloadStore
+from heavy_hitters import ShardedSpaceSaving
+from hyperloglog import UniqueCounter
+from metrics import MetricsRegistry
+from lifecycle import LifecycleTimings
+from timeseries import ConnectionRates, ACCEPTS, CLOSES, BYTES_IN, BANNERS
+from ssh_parser import SSHClientParser, ClientFingerprints
+from admission import AdmissionController, OverflowTarpit, SHED_REASONS, set_rst_on_close
+from zero_window import ZeroWindowParker, shrink_receive_buffer
 
 
 class DeadlockSSH:
@@ -51,7 +88,7 @@ class DeadlockSSH:
         # Default configuration
         self.config = {
             'port': 2222,
-            'max_connections': 100,
+            'max_connections': 100,  # Admission cap on trapped connections; the rest go to overflow_policy
             'ssh_banner': 'SSH-2.0-OpenSSH_8.9p1 Ubuntu-3ubuntu0.1',
             'banner_delay': 0.1,  # Delay between characters in seconds
             'initial_delay': 1.0,  # Initial delay for new IPs
@@ -65,7 +102,51 @@ class DeadlockSSH:
             'connection_timeout': 300,  # 5 minutes
             'enable_http_stats': False,
             'http_stats_port': 8080,
-            'tcp_keepalive': True
+            'tcp_keepalive': True,
+            'engine': 'threaded',  # 'threaded', 'asyncio' or 'reactor'
+            'banner_scheduler': 'thread',  # 'thread' or 'wheel' (threaded engine only)
+            'tarpit_mode': 'banner',  # 'banner', 'endless' or 'zerowindow'
+            'endless_interval': 10.0,  # Seconds between pre-banner lines in endless mode
+            'endless_line_length': 32,  # Maximum length of each pre-banner line
+            'zero_window_capture_bytes': 256,  # Bytes captured before reading stops in zerowindow mode
+            'zero_window_hold_time': 3600,  # Seconds a zero-window client is held before closing
+            'zero_window_probe_interval': 30.0,  # Seconds between checks that a parked client is still there
+            'workers': 1,  # Worker processes sharing the port via SO_REUSEPORT
+            'stats_report_interval': 2.0,  # Seconds between worker stats reports
+            'ip_state_capacity': 100000,  # Maximum number of tracked IPs
+            'ip_state_ttl': 86400,  # Forget IPs idle for this many seconds
+            'ip_state_file': '',  # Memory-mapped file keeping per-IP state across restarts (empty to disable)
+            'delay_decay_interval': 3600,  # Quiet seconds per delay_increment of decay
+            'log_queue_size': 10000,  # Log records buffered before new ones are dropped
+            'log_batch_size': 256,  # Log records written per batch
+            'event_log_file': '',  # JSON-lines event log path (empty to disable)
+            'event_log_batch_size': 1024,  # Events written per batch
+            'event_log_flush_interval': 1.0,  # Maximum seconds an event waits to be written
+            'http_stats_cache_ttl': 1.0,  # Seconds a /stats snapshot is reused
+            'http_stats_gzip': True,  # Gzip stats responses for clients that accept it
+            'top_attackers_capacity': 1000,  # IPs monitored by the top attackers sketch
+            'unique_ips_precision': 12,  # HyperLogLog precision (2**p registers per sketch)
+            'unique_ips_state_file': '',  # Where unique-IP sketches persist across restarts (empty to disable)
+            'stat_shards': 16,  # Independently locked parts of the IP state and top attackers
+            'max_connections_per_ip': 0,  # Concurrent trapped connections per IP (0 for no limit)
+            'max_connections_per_prefix': 0,  # Concurrent trapped connections per /24 or /64 (0 for no limit)
+            'admission_prefix_v4': 24,  # IPv4 prefix length for the per-prefix limit
+            'admission_prefix_v6': 64,  # IPv6 prefix length for the per-prefix limit
+            'overflow_policy': 'close',  # What to do with shed connections: 'close', 'rst' or 'tarpit'
+            'overflow_tarpit_limit': 1000,  # Shed connections held open by the 'tarpit' policy
+            'lifecycle_trace': False,  # Write a 'trace' event with per-phase timings when a connection closes
+            'client_fingerprint_capacity': 1000,  # Client versions and HASSH fingerprints monitored by their sketches
+            'timeseries_seconds': 600,  # Per-second buckets kept for /stats/timeseries (0 to disable)
+            'timeseries_minutes': 1440,  # Per-minute buckets kept (0 to disable)
+            'timeseries_hours': 168,  # Per-hour buckets kept (0 to disable)
+            'payload_store_dir': '',  # Directory of content-addressed payload blobs (empty to log payloads in full)
+            'payload_cache_size': 10000,  # Recently seen payload hashes remembered in memory
+            'payload_capture_bytes': 4096,  # Bytes held per connection to store as one payload
+            'log_archive_dir': '',  # Directory of compressed log segments (empty to disable)
+            'log_archive_codec': 'auto',  # 'zstd', 'gzip' or 'auto' (zstd when installed)
+            'log_archive_segment_size': 64 * 1024 * 1024,  # Uncompressed bytes per archive segment
+            'log_archive_segment_interval': 3600,  # Longest span of one archive segment in seconds
+            'log_archive_max_bytes': 0  # Compressed archive size kept before the oldest segments go (0 for no limit)
         }
         
         # Load configuration from file if provided
@@ -77,16 +158,57 @@ class DeadlockSSH:
         self.server_socket = None
         self.active_connections: Set[threading.Thread] = set()
         self.connection_count = 0
-        self.ip_delays: Dict[str, float] = defaultdict(lambda: self.config["initial_delay"])
-        self.ip_connection_counts: Dict[str, int] = defaultdict(int)
+        self.ip_state = IPStateStore(
+            capacity=self.config['ip_state_capacity'],
+            ttl=self.config['ip_state_ttl'],
+            initial_delay=self.config['initial_delay'],
+            delay_increment=self.config['delay_increment'],
+            max_delay=self.config['max_delay'],
+            decay_interval=self.config['delay_decay_interval'],
+            stripes=self.config['stat_shards'],
+            path=self.config['ip_state_file']
+        )
+        self.top_attackers = ShardedSpaceSaving(self.config['top_attackers_capacity'], self.config['stat_shards'])
+        self.unique_ips = UniqueCounter(self.config['unique_ips_precision'])
+        self.client_fingerprints = ClientFingerprints(self.config['client_fingerprint_capacity'], self.config['stat_shards'])
+        self.connection_rates = ConnectionRates(
+            seconds=self.config['timeseries_seconds'],
+            minutes=self.config['timeseries_minutes'],
+            hours=self.config['timeseries_hours']
+        )
+        self.setup_metrics()
+        self.admission = AdmissionController(
+            max_active=self.config['max_connections'],
+            max_per_ip=self.config['max_connections_per_ip'],
+            max_per_prefix=self.config['max_connections_per_prefix'],
+            prefix_v4=self.config['admission_prefix_v4'],
+            prefix_v6=self.config['admission_prefix_v6']
+        )
+        self.overflow_tarpit = OverflowTarpit(
+            limit=self.config['overflow_tarpit_limit'],
+            hold_time=self.config['connection_timeout']
+        )
+        # total_connections, active_connections and bytes_sent live in
+        # the sharded metrics counters (see setup_metrics)
         self.stats = {
-            "total_connections": 0,
-            "active_connections": 0,
-            "connections_per_ip": Counter(),
+            "connections_per_ip": self.ip_state,
+            "bytes_sent_per_connection": {},  # "ip:port" -> bytes, open connections only
             "start_time": datetime.now()
         }
         
         self.http_server_thread = None # Initialize HTTP server thread  
+        self.engine = None  # Set when running with a non-threaded engine
+        self.drip_scheduler = None  # Timer-wheel banner scheduler (threaded engine)
+        self.supervisor = None  # Set in the parent process when running workers
+        self.reuse_port = False  # Set in worker processes
+        self.event_sink = None  # JSON-lines event writer, if enabled
+        self.payload_store = None  # Content-addressed payload blobs, if enabled
+        self.zero_window = None  # Parker for clients in zerowindow mode
+        # "ip:port" -> monotonic start times of the accept, delay, banner and monitor phases
+        self.connection_timings: Dict[str, list] = {}
+        self.lifecycle = LifecycleTimings()
+        # "ip:port" -> parser of the client's identification and KEXINIT, until both are seen
+        self.ssh_parsers: Dict[str, SSHClientParser] = {}
         # Setup logging
         self.setup_logging()
         
@@ -94,6 +216,14 @@ class DeadlockSSH:
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
         
+        if self.ip_state.file:
+            self.logger.info(f"Loaded state for {len(self.ip_state)} IPs from {self.config['ip_state_file']}")
+            if self.ip_state.repaired:
+                self.logger.warning(f"Dropped {self.ip_state.repaired} torn IP state records after an unclean shutdown")
+        
+        if self.config['log_archive_codec'] == 'zstd' and self.log_archive and self.log_archive.codec != 'zstd':
+            self.logger.warning("zstandard is not installed; archiving log segments with gzip")
+        
         self.logger.info("DeadlockSSH initialized")
     
     def load_config(self, config_file: str):
@@ -127,6 +257,54 @@ class DeadlockSSH:
                 self.config['enable_http_stats'] = section.getboolean('enable_http_stats', self.config['enable_http_stats'])
                 self.config['http_stats_port'] = section.getint('http_stats_port', self.config['http_stats_port'])
                 self.config['tcp_keepalive'] = section.getboolean('tcp_keepalive', self.config['tcp_keepalive'])
+                self.config['engine'] = section.get('engine', self.config['engine'])
+                self.config['banner_scheduler'] = section.get('banner_scheduler', self.config['banner_scheduler'])
+                self.config['tarpit_mode'] = section.get('tarpit_mode', self.config['tarpit_mode'])
+                self.config['endless_interval'] = section.getfloat('endless_interval', self.config['endless_interval'])
+                self.config['endless_line_length'] = section.getint('endless_line_length', self.config['endless_line_length'])
+                self.config['zero_window_capture_bytes'] = section.getint('zero_window_capture_bytes', self.config['zero_window_capture_bytes'])
+                self.config['zero_window_hold_time'] = section.getfloat('zero_window_hold_time', self.config['zero_window_hold_time'])
+                self.config['zero_window_probe_interval'] = section.getfloat('zero_window_probe_interval', self.config['zero_window_probe_interval'])
+                self.config['workers'] = section.getint('workers', self.config['workers'])
+                self.config['stats_report_interval'] = section.getfloat('stats_report_interval', self.config['stats_report_interval'])
+                ip_state_capacity = section.getint('ip_state_capacity', self.config['ip_state_capacity'])
+                if ip_state_capacity < 1:
+                    print(f"Warning: ip_state_capacity must be at least 1, keeping {self.config['ip_state_capacity']}")
+                else:
+                    self.config['ip_state_capacity'] = ip_state_capacity
+                self.config['ip_state_ttl'] = section.getfloat('ip_state_ttl', self.config['ip_state_ttl'])
+                self.config['ip_state_file'] = section.get('ip_state_file', self.config['ip_state_file'])
+                self.config['delay_decay_interval'] = section.getfloat('delay_decay_interval', self.config['delay_decay_interval'])
+                self.config['log_queue_size'] = section.getint('log_queue_size', self.config['log_queue_size'])
+                self.config['log_batch_size'] = section.getint('log_batch_size', self.config['log_batch_size'])
+                self.config['event_log_file'] = section.get('event_log_file', self.config['event_log_file'])
+                self.config['event_log_batch_size'] = section.getint('event_log_batch_size', self.config['event_log_batch_size'])
+                self.config['event_log_flush_interval'] = section.getfloat('event_log_flush_interval', self.config['event_log_flush_interval'])
+                self.config['http_stats_cache_ttl'] = section.getfloat('http_stats_cache_ttl', self.config['http_stats_cache_ttl'])
+                self.config['http_stats_gzip'] = section.getboolean('http_stats_gzip', self.config['http_stats_gzip'])
+                self.config['top_attackers_capacity'] = section.getint('top_attackers_capacity', self.config['top_attackers_capacity'])
+                self.config['unique_ips_precision'] = section.getint('unique_ips_precision', self.config['unique_ips_precision'])
+                self.config['unique_ips_state_file'] = section.get('unique_ips_state_file', self.config['unique_ips_state_file'])
+                self.config['stat_shards'] = section.getint('stat_shards', self.config['stat_shards'])
+                self.config['max_connections_per_ip'] = section.getint('max_connections_per_ip', self.config['max_connections_per_ip'])
+                self.config['max_connections_per_prefix'] = section.getint('max_connections_per_prefix', self.config['max_connections_per_prefix'])
+                self.config['admission_prefix_v4'] = section.getint('admission_prefix_v4', self.config['admission_prefix_v4'])
+                self.config['admission_prefix_v6'] = section.getint('admission_prefix_v6', self.config['admission_prefix_v6'])
+                self.config['overflow_policy'] = section.get('overflow_policy', self.config['overflow_policy'])
+                self.config['overflow_tarpit_limit'] = section.getint('overflow_tarpit_limit', self.config['overflow_tarpit_limit'])
+                self.config['lifecycle_trace'] = section.getboolean('lifecycle_trace', self.config['lifecycle_trace'])
+                self.config['client_fingerprint_capacity'] = section.getint('client_fingerprint_capacity', self.config['client_fingerprint_capacity'])
+                self.config['timeseries_seconds'] = section.getint('timeseries_seconds', self.config['timeseries_seconds'])
+                self.config['timeseries_minutes'] = section.getint('timeseries_minutes', self.config['timeseries_minutes'])
+                self.config['timeseries_hours'] = section.getint('timeseries_hours', self.config['timeseries_hours'])
+                self.config['payload_store_dir'] = section.get('payload_store_dir', self.config['payload_store_dir'])
+                self.config['payload_cache_size'] = section.getint('payload_cache_size', self.config['payload_cache_size'])
+                self.config['payload_capture_bytes'] = section.getint('payload_capture_bytes', self.config['payload_capture_bytes'])
+                self.config['log_archive_dir'] = section.get('log_archive_dir', self.config['log_archive_dir'])
+                self.config['log_archive_codec'] = section.get('log_archive_codec', self.config['log_archive_codec'])
+                self.config['log_archive_segment_size'] = section.getint('log_archive_segment_size', self.config['log_archive_segment_size'])
+                self.config['log_archive_segment_interval'] = section.getfloat('log_archive_segment_interval', self.config['log_archive_segment_interval'])
+                self.config['log_archive_max_bytes'] = section.getint('log_archive_max_bytes', self.config['log_archive_max_bytes'])
                 
             print(f"Configuration loaded from {config_file}")
             
@@ -134,6 +312,38 @@ class DeadlockSSH:
             print(f"Warning: Could not load configuration file {config_file}: {e}")
             print("Using default configuration")
     
+    def setup_metrics(self):
+        """
+        Create the counters and histograms served on /metrics.
+        
+        They are updated as connections progress, so a scrape only reads them.
+        """
+        self.metrics = MetricsRegistry()
+        self.accepts_counter = self.metrics.counter(
+            'deadlockssh_connections_total', 'Connections accepted')
+        self.active_gauge = self.metrics.gauge(
+            'deadlockssh_active_connections', 'Connections currently trapped')
+        self.shed_counter = self.metrics.labeled_counter(
+            'deadlockssh_connections_shed_total', 'Connections refused by admission control',
+            'reason', SHED_REASONS)
+        self.bytes_sent_counter = self.metrics.counter(
+            'deadlockssh_bytes_sent_total', 'Bytes sent to clients')
+        self.bytes_received_counter = self.metrics.counter(
+            'deadlockssh_bytes_received_total', 'Bytes received from clients')
+        self.delay_histogram = self.metrics.histogram(
+            'deadlockssh_delay_seconds', 'Adaptive delay applied before the banner',
+            [0.5, 1, 2, 5, 10, 20, 30, 60, 120])
+        self.banner_duration_histogram = self.metrics.histogram(
+            'deadlockssh_banner_duration_seconds', 'Time from accept until the banner was fully sent',
+            [1, 2, 5, 10, 30, 60, 120, 300, 600])
+        self.client_versions_counter = self.metrics.counter(
+            'deadlockssh_client_versions_total', 'Clients that sent an SSH identification line')
+        self.client_kexinits_counter = self.metrics.counter(
+            'deadlockssh_client_kexinits_total', 'Clients whose KEXINIT was fingerprinted')
+        self.trap_duration_histogram = self.metrics.histogram(
+            'deadlockssh_trap_duration_seconds', 'Time from accept until the client disconnected',
+            [1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600])
+    
     def setup_logging(self):
         """
         Setup logging with rotation support.
@@ -143,11 +353,7 @@ class DeadlockSSH:
         self.logger.setLevel(getattr(logging, self.config['log_level'].upper()))
         
         # Create rotating file handler
-        file_handler = logging.handlers.RotatingFileHandler(
-            self.config['log_file'],
-            maxBytes=self.config['max_log_size'],
-            backupCount=self.config['log_backup_count']
-        )
+        file_handler = self.rotating_file_handler(self.config['log_file'])
         
         # Create console handler
         console_handler = logging.StreamHandler()
@@ -160,9 +366,95 @@ class DeadlockSSH:
         file_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
         
-        # Add handlers to logger
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        # Handlers are written by a background thread, never by the logger's callers
+        self.file_handler = file_handler
+        self.log_handlers = [file_handler, console_handler]
+        self.log_archive = None
+        if self.config['log_archive_dir']:
+            self.log_archive = ArchiveHandler(
+                self.config['log_archive_dir'],
+                codec=self.config['log_archive_codec'],
+                segment_bytes=self.config['log_archive_segment_size'],
+                segment_seconds=self.config['log_archive_segment_interval'],
+                max_bytes=self.config['log_archive_max_bytes']
+            )
+            self.log_archive.setFormatter(formatter)
+            self.log_handlers.append(self.log_archive)
+        self.queue_handler = None
+        self.log_listener = None
+        self.setup_log_pipeline()
+    
+    def rotating_file_handler(self, path: str) -> logging.handlers.RotatingFileHandler:
+        """
+        Create the handler for a size-rotated log file.
+        
+        Args:
+            path: Log file path
+            
+        Returns:
+            RotatingFileHandler using the configured size and backup count
+        """
+        return logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=self.config['max_log_size'],
+            backupCount=self.config['log_backup_count']
+        )
+    
+    def reopen_log_file(self, path: str):
+        """
+        Write the log file to another path from now on.
+        
+        Forked workers each write their own file, so no two processes
+        rotate the same one.
+        
+        Args:
+            path: New log file path
+        """
+        file_handler = self.rotating_file_handler(path)
+        file_handler.setFormatter(self.file_handler.formatter)
+        self.log_handlers[self.log_handlers.index(self.file_handler)] = file_handler
+        self.file_handler.close()  # Only this process's copy of the parent's file
+        self.file_handler = file_handler
+    
+    def setup_log_pipeline(self):
+        """
+        Route the logger through a bounded queue drained by a batching writer thread.
+        
+        The writer thread is only started by start_log_writer(), after any
+        workers are forked; until then records wait in the queue. Forked
+        workers call this again for a queue of their own.
+        """
+        if self.queue_handler:
+            self.logger.removeHandler(self.queue_handler)
+        
+        log_queue = queue.Queue(maxsize=self.config['log_queue_size'])
+        self.queue_handler = DroppingQueueHandler(log_queue)
+        self.log_listener = BatchingQueueListener(
+            log_queue,
+            self.log_handlers,
+            batch_size=self.config['log_batch_size']
+        )
+        self.logger.addHandler(self.queue_handler)
+    
+    def start_log_writer(self):
+        """
+        Start the thread that writes queued log records.
+        """
+        if self.log_listener and not self.log_listener.is_alive():
+            self.log_listener.start()
+    
+    def stop_log_pipeline(self):
+        """
+        Flush the log queue and attach the handlers directly for any late records.
+        """
+        if not self.log_listener:
+            return
+        self.logger.removeHandler(self.queue_handler)
+        for handler in self.log_handlers:
+            self.logger.addHandler(handler)
+        self.start_log_writer()  # Records queued before start() still get written
+        self.log_listener.stop()
+        self.log_listener = None
     
     def signal_handler(self, signum, frame):
         """
@@ -177,102 +469,400 @@ class DeadlockSSH:
     
     def start(self):
         """
-        Start the SSH honeypot server.
+        Start the SSH honeypot server using the configured engine.
         """
         try:
-            # Create server socket
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            
-            # Enable TCP keepalive if configured
-            if self.config['tcp_keepalive']:
-                self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-            
-            # Bind and listen
-            self.server_socket.bind(('0.0.0.0', self.config['port']))
-            self.server_socket.listen(self.config['max_connections'])
-            
             self.running = True
-            self.logger.info(f"DeadlockSSH listening on port {self.config["port"]}")
+            self.load_unique_ips_state()
+            
+            # Fork workers before any other thread exists, including the log writer
+            if self.config['workers'] > 1:
+                self.supervisor = WorkerSupervisor(self, self.config['workers'])
+                self.supervisor.spawn()
+            self.start_log_writer()
             
             # Start HTTP stats server if enabled
             if self.config['enable_http_stats']:
                 self.start_http_stats_server()
             
-            # Main server loop
-            while self.running:
-                try:
-                    client_socket, client_address = self.server_socket.accept()
-                    
-                    # Create and start client handler thread
-                    client_thread = threading.Thread(
-                        target=self.handle_client,
-                        args=(client_socket, client_address),
-                        daemon=True
-                    )
-                    
-                    self.active_connections.add(client_thread)
-                    client_thread.start()
-                    
-                    # Clean up finished threads
-                    self.cleanup_threads()
-                    
-                except socket.error as e:
-                    if self.running:
-                        self.logger.error(f"Socket error: {e}")
-                    break
+            # Only processes that handle connections write events
+            if self.config['event_log_file'] and not self.supervisor:
+                self.event_sink = JSONLEventSink(
+                    self.config['event_log_file'],
+                    batch_size=self.config['event_log_batch_size'],
+                    flush_interval=self.config['event_log_flush_interval']
+                )
+                self.event_sink.start()
+            
+            if self.config['payload_store_dir'] and not self.supervisor:
+                self.payload_store = PayloadStore(self.config['payload_store_dir'], self.config['payload_cache_size'],
+                                                  logger=self.logger)
+                self.payload_store.start()
+            
+            if self.config['tarpit_mode'] == 'zerowindow' and not self.supervisor:
+                self.zero_window = ZeroWindowParker(
+                    hold_time=self.config['zero_window_hold_time'],
+                    probe_interval=self.config['zero_window_probe_interval'],
+                    on_release=lambda address: self.release_connection(address[0], address[1]),
+                    logger=self.logger
+                )
+                self.zero_window.start()
+            
+            if self.supervisor:
+                self.supervisor.run()
+            elif self.config['engine'] == 'asyncio':
+                self.engine = AsyncEngine(self)
+                self.engine.run()
+            elif self.config['engine'] == 'reactor':
+                self.engine = ReactorEngine(self)
+                self.engine.run()
+            else:
+                self.serve_threaded()
                     
         except Exception as e:
             self.logger.error(f"Failed to start server: {e}")
         finally:
             self.shutdown()
     
-    def handle_client(self, client_socket: socket.socket, client_address: tuple):
+    def serve_threaded(self):
         """
-        Handle individual client connections.
+        Accept connections and handle each one in its own thread.
+        """
+        # Create server socket
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        
+        # Share the port with sibling workers; the kernel balances accepts
+        if self.reuse_port:
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        
+        # Enable TCP keepalive if configured
+        if self.config['tcp_keepalive']:
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        
+        # Accepted sockets inherit a minimal receive window
+        if self.zero_window:
+            shrink_receive_buffer(self.server_socket)
+        
+        # Bind and listen
+        self.server_socket.bind(('0.0.0.0', self.config['port']))
+        self.server_socket.listen(self.config['max_connections'])
+        
+        self.logger.info(f"DeadlockSSH listening on port {self.config['port']}")
+        
+        # Drip delays and banners from one timer-wheel thread if configured.
+        # Endless mode always runs there so no client ever holds a thread.
+        endless = self.config['tarpit_mode'] == 'endless'
+        if self.config['banner_scheduler'] == 'wheel' or endless:
+            self.drip_scheduler = BannerDripScheduler(
+                banner=(self.config['ssh_banner'] + '\r\n').encode('utf-8'),
+                banner_delay=self.config['banner_delay'],
+                on_complete=self.on_banner_complete,
+                logger=self.logger,
+                endless_interval=self.config['endless_interval'] if endless else None,
+                endless_line_length=self.config['endless_line_length'],
+                on_sent=self.record_bytes_sent,
+                on_start=self.banner_started
+            )
+            self.drip_scheduler.start()
+        
+        # Close shed connections on time even when no new ones arrive
+        if self.config['overflow_policy'] == 'tarpit':
+            threading.Thread(target=self.expire_overflow_loop, name="deadlockssh-overflow-expiry", daemon=True).start()
+        
+        # Main server loop
+        while self.running:
+            try:
+                client_socket, client_address = self.server_socket.accept()
+                accepted = time.monotonic()
+                
+                reason = self.admission.admit(client_address[0])
+                if reason:
+                    self.shed_connection(client_socket, client_address, reason)
+                    continue
+                
+                if self.drip_scheduler:
+                    self.schedule_client(client_socket, client_address)
+                    continue
+                
+                # Create and start client handler thread
+                client_thread = threading.Thread(
+                    target=self.handle_client,
+                    args=(client_socket, client_address, False, accepted),
+                    daemon=True
+                )
+                
+                try:
+                    client_thread.start()
+                except RuntimeError as e:
+                    # Out of threads: shed instead of taking the server down
+                    self.logger.error(f"Could not start handler thread: {e}")
+                    self.admission.release(client_address[0])
+                    self.shed_connection(client_socket, client_address, 'global')
+                    continue
+                self.active_connections.add(client_thread)
+                
+                # Clean up finished threads
+                self.cleanup_threads()
+                
+            except socket.error as e:
+                if self.running:
+                    self.logger.error(f"Socket error: {e}")
+                break
+    
+    def shed_connection(self, client_socket: socket.socket, client_address: tuple, reason: str, closable=None):
+        """
+        Dispose of a connection refused by admission control per overflow_policy.
         
         Args:
             client_socket: Client socket connection
             client_address: Client address tuple (ip, port)
+            reason: Shed reason from AdmissionController.admit
+            closable: Object whose close() ends the connection, if not the
+                socket itself (the asyncio stream writer that owns it)
         """
-        client_ip = client_address[0]
+        if closable is None:
+            closable = client_socket
+        self.shed_counter.inc(reason)
+        self.logger.debug("Shed connection from %s:%s (%s limit)", client_address[0], client_address[1], reason)
+        self.emit_event('shed', ip=client_address[0], port=client_address[1], reason=reason)
         
+        policy = self.config['overflow_policy']
         try:
-            # Set socket timeout
-            client_socket.settimeout(self.config['connection_timeout'])
+            if policy == 'tarpit':
+                shrink_receive_buffer(client_socket)
+                self.overflow_tarpit.park(closable)
+                return
+            if policy == 'rst':
+                set_rst_on_close(client_socket)
+        except OSError:
+            pass
+        try:
+            closable.close()
+        except OSError:
+            pass
+    
+    def expire_overflow_loop(self):
+        """
+        Release overflow-tarpit connections past their hold time (threaded engine).
+        """
+        while self.running:
+            time.sleep(self.overflow_tarpit.expiry_interval)
+            self.overflow_tarpit.expire()
+    
+    def register_connection(self, client_ip: str, client_port: int, accepted: Optional[float] = None) -> float:
+        """
+        Record a new connection and compute the adaptive delay for it.
+        
+        Shared by all engines so statistics and delays stay consistent.
+        
+        Args:
+            client_ip: Client IP address
+            client_port: Client source port
+            accepted: Monotonic time taken right after accept(), if work
+                happened since (defaults to now)
             
+        Returns:
+            Delay in seconds to apply before sending the banner
+        """
+        # Update statistics and calculate adaptive delay for this IP
+        key = f"{client_ip}:{client_port}"
+        self.stats['bytes_sent_per_connection'][key] = 0
+        now = time.monotonic()
+        self.connection_timings[key] = [now if accepted is None else accepted, now, None, None]
+        self.ssh_parsers[key] = SSHClientParser()
+        attempt, current_delay = self.ip_state.record_connection(client_ip)
+        self.top_attackers.add(client_ip)
+        self.unique_ips.add(client_ip)
+        self.accepts_counter.inc()
+        self.connection_rates.add(ACCEPTS)
+        self.active_gauge.inc()
+        self.delay_histogram.observe(current_delay)
+        
+        # Log connection attempt (formatted lazily on the log writer thread)
+        self.logger.info(
+            "Connection from %s:%s (attempt #%d, delay: %.1fs)",
+            client_ip, client_port, attempt, current_delay
+        )
+        self.emit_event('connect', ip=client_ip, port=client_port, attempt=attempt, delay=current_delay)
+        
+        return current_delay
+    
+    def release_connection(self, client_ip: str, client_port: int):
+        """
+        Record a closed connection and raise the delay for its IP.
+        
+        Args:
+            client_ip: Client IP address
+            client_port: Client source port
+        """
+        # Update delay for future connections from this IP
+        self.ip_state.record_close(client_ip)
+        self.admission.release(client_ip)
+        
+        key = f"{client_ip}:{client_port}"
+        bytes_sent = self.stats['bytes_sent_per_connection'].pop(key, 0)
+        marks = self.connection_timings.pop(key, None)
+        self.ssh_parsers.pop(key, None)
+        self.active_gauge.dec()
+        self.connection_rates.add(CLOSES)
+        duration = None
+        if marks is not None:
+            closed = time.monotonic()
+            duration = round(closed - marks[0], 6)
+            self.trap_duration_histogram.observe(duration)
+            phases = LifecycleTimings.durations(marks, closed)
+            self.lifecycle.observe(phases)
+            if self.config['lifecycle_trace']:
+                self.emit_event('trace', ip=client_ip, port=client_port,
+                                **{phase: round(seconds, 6) for phase, seconds in phases.items()})
+        self.logger.info("Connection from %s closed (%d bytes sent)", client_ip, bytes_sent)
+        self.emit_event('close', ip=client_ip, port=client_port, duration=duration, bytes_sent=bytes_sent)
+    
+    def banner_started(self, client_address: tuple):
+        """
+        Record that a client's adaptive delay is over and its banner has begun.
+        
+        Args:
+            client_address: Client address tuple (ip, port)
+        """
+        marks = self.connection_timings.get(f"{client_address[0]}:{client_address[1]}")
+        if marks is not None:
+            marks[2] = time.monotonic()
+    
+    def banner_complete(self, client_address: tuple):
+        """
+        Record that a client received the full SSH banner.
+        
+        Args:
+            client_address: Client address tuple (ip, port)
+        """
+        key = f"{client_address[0]}:{client_address[1]}"
+        bytes_sent = self.stats['bytes_sent_per_connection'].get(key, 0)
+        marks = self.connection_timings.get(key)
+        if marks is not None:
+            # Monitoring starts now
+            marks[3] = time.monotonic()
+            self.banner_duration_histogram.observe(marks[3] - marks[0])
+        self.connection_rates.add(BANNERS)
+        self.emit_event('banner_complete', ip=client_address[0], port=client_address[1], bytes_sent=bytes_sent)
+    
+    def emit_event(self, event: str, **fields):
+        """
+        Write a structured event to the JSON-lines event log, if enabled.
+        
+        Args:
+            event: Event name (connect, banner_complete, data, client_id, kexinit,
+                close, shed or trace)
+            **fields: Event fields
+        """
+        if self.event_sink:
+            self.event_sink.emit(event, **fields)
+    
+    def record_bytes_sent(self, client_address: tuple, nbytes: int):
+        """
+        Add bytes sent to a client to the aggregate and per-connection counters.
+        
+        Args:
+            client_address: Client address tuple (ip, port)
+            nbytes: Number of bytes sent
+        """
+        self.bytes_sent_counter.inc(nbytes)
+        key = f"{client_address[0]}:{client_address[1]}"
+        per_connection = self.stats['bytes_sent_per_connection']
+        if key in per_connection:
+            per_connection[key] += nbytes
+    
+    def schedule_client(self, client_socket: socket.socket, client_address: tuple):
+        """
+        Hand a new client to the timer-wheel scheduler for its delay and banner.
+        
+        Args:
+            client_socket: Client socket connection
+            client_address: Client address tuple (ip, port)
+        """
+        try:
             # Enable TCP keepalive for client socket if configured
             if self.config['tcp_keepalive']:
                 client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        except socket.error as e:
+            self.logger.error(f"Error handling client {client_address[0]}: {e}")
+            client_socket.close()
+            self.admission.release(client_address[0])
+            return
+        
+        current_delay = self.register_connection(client_address[0], client_address[1])
+        self.drip_scheduler.add(client_socket, client_address, current_delay)
+    
+    def on_banner_complete(self, client_socket: socket.socket, client_address: tuple, ok: bool):
+        """
+        Called by the timer-wheel scheduler once a client's banner is done.
+        
+        Args:
+            client_socket: Client socket connection
+            client_address: Client address tuple (ip, port)
+            ok: False if the banner could not be delivered
+        """
+        if not ok:
+            try:
+                client_socket.close()
+            except:
+                pass
+            self.release_connection(client_address[0], client_address[1])
+            return
+        
+        self.banner_complete(client_address)
+        
+        # Only the monitoring phase needs a thread of its own
+        client_thread = threading.Thread(
+            target=self.handle_client,
+            args=(client_socket, client_address, True),
+            daemon=True
+        )
+        self.active_connections.add(client_thread)
+        client_thread.start()
+    
+    def handle_client(self, client_socket: socket.socket, client_address: tuple, banner_sent: bool = False,
+                      accepted: Optional[float] = None):
+        """
+        Handle individual client connections.
+        
+        Args:
+            client_socket: Client socket connection
+            client_address: Client address tuple (ip, port)
+            banner_sent: True if the delay and banner were already delivered
+                by the timer-wheel scheduler and only monitoring remains
+            accepted: Monotonic time the accept loop accepted the connection
+        """
+        client_ip = client_address[0]
+        registered = banner_sent
+        parked = False
+        
+        try:
+            # Set socket timeout
+            client_socket.settimeout(self.config['connection_timeout'])
             
-            # Update statistics
-            self.stats['total_connections'] += 1
-            self.stats['active_connections'] += 1
-            self.stats['connections_per_ip'][client_ip] += 1
-            self.ip_connection_counts[client_ip] += 1
-            
-            # Calculate adaptive delay for this IP
-            current_delay = min(
-                self.ip_delays[client_ip],
-                self.config['max_delay']
-            )
-            
-            # Log connection attempt
-            self.logger.info(
-                f"Connection from {client_ip}:{client_address[1]} "
-                f"(attempt #{self.ip_connection_counts[client_ip]}, "
-                f"delay: {current_delay:.1f}s)"
-            )
-            
-            # Apply adaptive delay
-            if current_delay > 0:
-                time.sleep(current_delay)
-            
-            # Send SSH banner slowly
-            self.send_ssh_banner(client_socket)
+            if not banner_sent:
+                # Enable TCP keepalive for client socket if configured
+                if self.config['tcp_keepalive']:
+                    client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                
+                current_delay = self.register_connection(client_ip, client_address[1], accepted)
+                registered = True
+                
+                # Apply adaptive delay
+                if current_delay > 0:
+                    time.sleep(current_delay)
+                self.banner_started(client_address)
+                
+                # Send SSH banner slowly
+                if self.send_ssh_banner(client_socket, client_address):
+                    self.banner_complete(client_address)
             
             # Keep connection open and log any data received
-            self.monitor_connection(client_socket, client_ip)
+            if self.monitor_connection(client_socket, client_address):
+                self.park_zero_window(client_socket, client_address)
+                parked = True
             
         except socket.timeout:
             self.logger.info(f"Connection from {client_ip} timed out")
@@ -281,78 +871,243 @@ class DeadlockSSH:
         except Exception as e:
             self.logger.error(f"Error handling client {client_ip}: {e}")
         finally:
-            # Update delay for future connections from this IP
-            self.ip_delays[client_ip] = min(
-                self.ip_delays[client_ip] + self.config['delay_increment'],
-                self.config['max_delay']
-            )
-            
-            # Clean up
-            try:
-                client_socket.close()
-            except:
-                pass
-            
-            self.stats['active_connections'] -= 1
-            self.logger.info(f"Connection from {client_ip} closed")
+            # Clean up, unless the zero-window parker now owns the client
+            if not parked:
+                try:
+                    client_socket.close()
+                except:
+                    pass
+                
+                if registered:
+                    self.release_connection(client_ip, client_address[1])
+                else:
+                    self.admission.release(client_ip)
     
-    def send_ssh_banner(self, client_socket: socket.socket):
+    def send_ssh_banner(self, client_socket: socket.socket, client_address: tuple) -> bool:
         """
         Send SSH banner character by character with delay.
         
         Args:
             client_socket: Client socket to send banner to
+            client_address: Client address tuple (ip, port)
+            
+        Returns:
+            True if the whole banner was sent
         """
         banner = self.config['ssh_banner'] + '\r\n'
         
         for char in banner:
             try:
-                client_socket.send(char.encode('utf-8'))
+                sent = client_socket.send(char.encode('utf-8'))
+                self.record_bytes_sent(client_address, sent)
                 time.sleep(self.config['banner_delay'])
             except socket.error:
-                break
+                return False
+        return True
     
-    def monitor_connection(self, client_socket: socket.socket, client_ip: str):
+    def monitor_connection(self, client_socket: socket.socket, client_address: tuple) -> bool:
         """
         Monitor connection and log any data received from client.
         
         Args:
             client_socket: Client socket to monitor
-            client_ip: Client IP address
+            client_address: Client address tuple (ip, port)
+            
+        Returns:
+            True if reading stopped at the zero-window capture limit and
+            the client should be parked
         """
-        buffer = b''
+        capture = self.new_capture()
+        limit = self.config['zero_window_capture_bytes'] if self.zero_window else None
         
-        while self.running:
-            try:
-                data = client_socket.recv(1024)
-                if not data:
-                    break
-                
-                buffer += data
-                
-                # Log received data (truncate if too long)
-                if len(buffer) > self.config['max_input_length']:
-                    log_data = buffer[:self.config['max_input_length']] + b'...[truncated]'
-                else:
-                    log_data = buffer
-                
-                # Convert to string for logging, handling non-UTF8 data
+        try:
+            while self.running:
                 try:
-                    log_string = log_data.decode('utf-8', errors='replace')
-                except:
-                    log_string = repr(log_data)
-                
-                self.logger.info(f"Data from {client_ip}: {log_string}")
-                
-                # Reset buffer periodically to prevent memory issues
-                if len(buffer) > self.config['max_input_length'] * 2:
-                    buffer = buffer[-self.config['max_input_length']:]
-                
-            except socket.timeout:
-                # Continue monitoring on timeout
-                continue
-            except socket.error:
-                break
+                    if limit is None:
+                        data = capture.recv_into(client_socket)
+                    else:
+                        data = capture.recv_into(client_socket, min(1024, limit - capture.total))
+                    if not data:
+                        break
+                    
+                    self.log_received_data(client_address, capture, data)
+                    if limit is not None and capture.total >= limit:
+                        return True
+                    
+                except socket.timeout:
+                    # Continue monitoring on timeout
+                    continue
+                except socket.error:
+                    break
+            return False
+        finally:
+            self.end_capture(client_address, capture)
+    
+    def park_zero_window(self, client_socket: socket.socket, client_address: tuple):
+        """
+        Stop reading from a client and leave it to the kernel's zero window.
+        
+        Args:
+            client_socket: Client socket whose capture is complete
+            client_address: Client address tuple (ip, port)
+        """
+        self.logger.info("Parking %s:%s in the zero-window tarpit", client_address[0], client_address[1])
+        self.zero_window.park(client_socket, client_address)
+    
+    def new_capture(self) -> CaptureBuffer:
+        """
+        Create the ring buffer that receives one client's data.
+        
+        With a payload store the start of the stream is held back and
+        stored as one payload, so the ring is sized for a whole
+        identification line and KEXINIT.
+        
+        Returns:
+            Empty CaptureBuffer
+        """
+        if self.payload_store:
+            capacity = max(self.config['max_input_length'], self.config['payload_capture_bytes'])
+            return CaptureBuffer(capacity, holding=True)
+        return CaptureBuffer(self.config['max_input_length'])
+    
+    def log_received_data(self, client_address: tuple, capture: CaptureBuffer, data: memoryview):
+        """
+        Log one chunk of newly received client data with its stream offset.
+        
+        While the capture is held for the payload store, nothing is logged
+        until the client's KEXINIT is complete, the ring is full or the
+        capture ends; the held bytes are then stored and logged as one
+        payload, and later chunks are logged one by one.
+        
+        Args:
+            client_address: Client address tuple (ip, port)
+            capture: The connection's capture, already holding `data`
+            data: Newly received bytes
+        """
+        offset = capture.total - len(data)
+        self.bytes_received_counter.inc(len(data))
+        self.connection_rates.add(BYTES_IN, len(data))
+        parser = self.parse_client_data(client_address, data)
+        
+        if not capture.holding:
+            self.log_data(client_address, offset, data)
+        elif parser is not None:
+            # Store the identification and KEXINIT; the rest of the chunk is logged as usual
+            end = parser.kexinit_offset + parser.kexinit_length
+            self.store_capture(client_address, capture, end, parser.cookie_range)
+            if capture.total > end:
+                self.log_data(client_address, end, data[end - offset:])
+        elif capture.total >= capture.capacity:
+            self.store_capture(client_address, capture, capture.total)
+    
+    def log_data(self, client_address: tuple, offset: int, data, payload: Optional[str] = None,
+                 new: bool = True):
+        """
+        Write a data log line and event, tagged with its payload hash if stored.
+        
+        Args:
+            client_address: Client address tuple (ip, port)
+            offset: Offset of the data's first byte in the client's stream
+            data: Received bytes
+            payload: Payload hash, if the data went to the payload store
+            new: False if the payload was seen before, so only its hash is logged
+        """
+        if not new:
+            # Seen before: its blob already holds every byte, so log the hash alone
+            self.logger.info("Data from %s (offset %d) [payload %s]", client_address[0], offset, payload)
+            self.emit_event('data', ip=client_address[0], port=client_address[1], offset=offset,
+                            data=None, payload=payload)
+            return
+        
+        # Log received data (truncate if too long), handling non-UTF8 data
+        max_input_length = self.config['max_input_length']
+        log_string = str(data[:max_input_length], 'utf-8', 'replace')
+        if len(data) > max_input_length:
+            log_string += '...[truncated]'
+        
+        if payload:
+            self.logger.info("Data from %s (offset %d) [payload %s]: %s",
+                             client_address[0], offset, payload, log_string)
+        else:
+            self.logger.info("Data from %s (offset %d): %s", client_address[0], offset, log_string)
+        self.emit_event('data', ip=client_address[0], port=client_address[1], offset=offset,
+                        data=log_string, payload=payload)
+    
+    def store_capture(self, client_address: tuple, capture: CaptureBuffer, end: int,
+                      cookie_range: Optional[Tuple[int, int]] = None):
+        """
+        Store and log the held start of a client's stream as one payload.
+        
+        The KEXINIT cookie is random per connection, so it is zeroed first;
+        otherwise no two captures of the same client would ever match.
+        
+        Args:
+            client_address: Client address tuple (ip, port)
+            capture: The connection's capture, still holding from offset 0
+            end: Stream offset where the payload ends
+            cookie_range: Stream offsets of the KEXINIT cookie, if received
+        """
+        capture.holding = False
+        unit = bytearray(capture.contents()[:end])
+        if cookie_range is not None:
+            start, stop = cookie_range
+            unit[start:stop] = bytes(stop - start)
+        payload, new = self.payload_store.put(unit)
+        self.log_data(client_address, 0, unit, payload, new)
+    
+    def end_capture(self, client_address: tuple, capture: CaptureBuffer):
+        """
+        Store whatever a capture still holds once its connection stops being read.
+        
+        Args:
+            client_address: Client address tuple (ip, port)
+            capture: The connection's capture
+        """
+        if capture.holding and capture.total:
+            self.store_capture(client_address, capture, capture.total)
+    
+    def parse_client_data(self, client_address: tuple, data: memoryview) -> Optional[SSHClientParser]:
+        """
+        Feed received data to the connection's SSH client parser, if it still has one.
+        
+        Args:
+            client_address: Client address tuple (ip, port)
+            data: Newly received bytes
+            
+        Returns:
+            The parser if this chunk completed the client's KEXINIT, else None
+        """
+        key = f"{client_address[0]}:{client_address[1]}"
+        parser = self.ssh_parsers.get(key)
+        if parser is None:
+            return None
+        stages = parser.feed(data)
+        for stage in stages:
+            self.record_client_stage(client_address, parser, stage)
+        if parser.done:
+            self.ssh_parsers.pop(key, None)
+        return parser if 'kexinit' in stages else None
+    
+    def record_client_stage(self, client_address: tuple, parser: SSHClientParser, stage: str):
+        """
+        Count and log a client's identification line or KEXINIT fingerprint.
+        
+        Args:
+            client_address: Client address tuple (ip, port)
+            parser: The connection's parser
+            stage: 'version' or 'kexinit'
+        """
+        if stage == 'version':
+            self.client_fingerprints.add_version(parser.client_version)
+            self.client_versions_counter.inc()
+            self.logger.info("Client %s:%s identifies as %s", client_address[0], client_address[1], parser.client_version)
+            self.emit_event('client_id', ip=client_address[0], port=client_address[1], version=parser.client_version)
+        else:
+            self.client_fingerprints.add_fingerprint(parser.hassh, parser.hassh_algorithms)
+            self.client_kexinits_counter.inc()
+            self.logger.info("Client %s:%s HASSH %s", client_address[0], client_address[1], parser.hassh)
+            self.emit_event('kexinit', ip=client_address[0], port=client_address[1],
+                            hassh=parser.hassh, algorithms=parser.hassh_algorithms)
     
     def cleanup_threads(self):
         """
@@ -362,6 +1117,243 @@ class DeadlockSSH:
         for thread in finished_threads:
             self.active_connections.discard(thread)
     
+    def local_stats_snapshot(self) -> dict:
+        """
+        Build a JSON-ready copy of this process's statistics.
+        
+        Returns:
+            Statistics dictionary with plain JSON types
+        """
+        snapshot = {
+            'total_connections': self.accepts_counter.value(),
+            'active_connections': self.active_gauge.value(),
+            'bytes_sent': self.bytes_sent_counter.value()
+        }
+        snapshot.update(self.stats)
+        snapshot['start_time'] = snapshot['start_time'].isoformat()
+        snapshot['connections_per_ip'] = self.ip_state.counts()
+        snapshot['bytes_sent_per_connection'] = dict(snapshot['bytes_sent_per_connection'])
+        snapshot['ip_state'] = self.ip_state.stats()
+        snapshot['connections_shed'] = self.shed_counter.value()
+        snapshot['overflow_tarpit_parked'] = len(self.overflow_tarpit)
+        if self.zero_window:
+            snapshot['zero_window_parked'] = len(self.zero_window.parked)
+        snapshot['lifecycle'] = self.lifecycle.value()
+        if self.payload_store:
+            snapshot['payload_store'] = self.payload_store.stats()
+        snapshot['log_records_dropped'] = self.queue_handler.dropped if self.queue_handler else 0
+        if self.event_sink:
+            snapshot['events_written'] = self.event_sink.written
+            snapshot['events_dropped'] = self.event_sink.dropped
+        return snapshot
+    
+    def stats_snapshot(self) -> dict:
+        """
+        Build a JSON-ready view of the statistics, merged across workers if any.
+        
+        Returns:
+            Statistics dictionary with plain JSON types
+        """
+        snapshot = self.supervisor.merged_snapshot() if self.supervisor else self.local_stats_snapshot()
+        # Phase histograms merge as bucket counts; quantiles come from the merged counts
+        return dict(snapshot, lifecycle=self.lifecycle.summarize(snapshot.get('lifecycle', {})))
+    
+    def top_attackers_list(self, k: int) -> list:
+        """
+        Return the k IPs with the most connections, merged across workers if any.
+        
+        Counts come from the Space-Saving sketch, so they may overestimate
+        by at most the reported error.
+        
+        Args:
+            k: Number of IPs to return
+            
+        Returns:
+            List of {"ip", "connections", "error"} dictionaries, busiest first
+        """
+        if self.supervisor:
+            merged = self.supervisor.merged_snapshot().get('top_attackers', {})
+            top = heapq.nlargest(k, merged.items(), key=lambda item: item[1][0])
+            return [{"ip": ip, "connections": count, "error": error} for ip, (count, error) in top]
+        return [
+            {"ip": ip, "connections": count, "error": error}
+            for ip, count, error in self.top_attackers.top(k)
+        ]
+    
+    def top_attackers_route(self, query: dict) -> dict:
+        """
+        Build the /stats/top response.
+        
+        Args:
+            query: Parsed query string; optional "k" (default 10)
+            
+        Returns:
+            JSON-ready dictionary with the top attackers
+        """
+        try:
+            k = int(query.get('k', ['10'])[0])
+        except ValueError:
+            raise ValueError("k must be an integer")
+        if not 1 <= k <= self.config['top_attackers_capacity']:
+            raise ValueError(f"k must be between 1 and {self.config['top_attackers_capacity']}")
+        return {"k": k, "top": self.top_attackers_list(k)}
+    
+    def client_fingerprints_route(self, query: dict) -> dict:
+        """
+        Build the /stats/clients response: the most common client versions
+        and HASSH fingerprints, merged across workers if any.
+        
+        Counts come from Space-Saving sketches, so they may overestimate
+        by at most the reported error.
+        
+        Args:
+            query: Parsed query string; optional "k" (default 10)
+            
+        Returns:
+            JSON-ready dictionary with the top versions and fingerprints
+        """
+        try:
+            k = int(query.get('k', ['10'])[0])
+        except ValueError:
+            raise ValueError("k must be an integer")
+        if not 1 <= k <= self.config['client_fingerprint_capacity']:
+            raise ValueError(f"k must be between 1 and {self.config['client_fingerprint_capacity']}")
+        
+        if self.supervisor:
+            merged = self.supervisor.merged_snapshot()
+            versions = [
+                (version, count, error) for version, (count, error) in
+                heapq.nlargest(k, merged.get('client_versions', {}).items(), key=lambda item: item[1][0])
+            ]
+            fingerprints = [
+                (fingerprint, count, error, algorithms) for fingerprint, (count, error, algorithms) in
+                heapq.nlargest(k, merged.get('client_fingerprints', {}).items(), key=lambda item: item[1][0])
+            ]
+        else:
+            versions = self.client_fingerprints.top_versions(k)
+            fingerprints = self.client_fingerprints.top_fingerprints(k)
+        return {
+            "k": k,
+            "versions": [
+                {"version": version, "connections": count, "error": error}
+                for version, count, error in versions
+            ],
+            "fingerprints": [
+                {"hassh": fingerprint, "algorithms": algorithms, "connections": count, "error": error}
+                for fingerprint, count, error, algorithms in fingerprints
+            ]
+        }
+    
+    def unique_ips_route(self, query: dict) -> dict:
+        """
+        Build the /stats/unique response.
+        
+        Args:
+            query: Parsed query string (unused)
+            
+        Returns:
+            JSON-ready dictionary of estimated unique IPs per window
+        """
+        return {
+            "unique_ips": self.unique_ips.counts(),
+            "standard_error": round(self.unique_ips.standard_error(), 4)
+        }
+    
+    def lifecycle_route(self, query: dict) -> dict:
+        """
+        Build the /stats/lifecycle response: per-phase timing summaries
+        with every non-empty histogram bucket.
+        
+        Args:
+            query: Parsed query string (unused)
+            
+        Returns:
+            JSON-ready dictionary keyed by phase, in seconds
+        """
+        if self.supervisor:
+            value = self.supervisor.merged_snapshot().get('lifecycle', {})
+        else:
+            value = self.lifecycle.value()
+        return {"lifecycle": self.lifecycle.summarize(value, with_buckets=True)}
+    
+    def timeseries_route(self, query: dict) -> dict:
+        """
+        Build the /stats/timeseries response: rolling per-second, per-minute
+        and per-hour counts, merged across workers if any.
+        
+        Args:
+            query: Parsed query string; optional "resolution" (second, minute
+                or hour; default every enabled one) and "points" (most recent
+                buckets only)
+            
+        Returns:
+            JSON-ready dictionary with one array per counted field and resolution
+        """
+        resolutions = query.get('resolution', list(self.connection_rates.rings))
+        for name in resolutions:
+            if name not in self.connection_rates.rings:
+                raise ValueError(f"resolution must be one of {', '.join(self.connection_rates.rings)}")
+        points = None
+        if 'points' in query:
+            try:
+                points = int(query['points'][0])
+            except ValueError:
+                raise ValueError("points must be an integer")
+            if points < 1:
+                raise ValueError("points must be at least 1")
+        
+        now = time.time()
+        if self.supervisor:
+            value = self.supervisor.merged_timeseries()
+        else:
+            value = self.connection_rates.value(now)
+        return {"now": round(now, 3), "series": self.connection_rates.render(value, resolutions, points, now)}
+    
+    def load_unique_ips_state(self):
+        """
+        Merge unique-IP sketches saved by a previous run, if configured.
+        """
+        path = self.config['unique_ips_state_file']
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r') as f:
+                self.unique_ips.merge_encoded(json.load(f))
+            self.logger.info(f"Unique IP sketches loaded from {path}")
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not load unique IP sketches from {path}: {e}")
+    
+    def save_unique_ips_state(self):
+        """
+        Save the unique-IP sketches so the next run can merge them back in.
+        """
+        path = self.config['unique_ips_state_file']
+        if not path:
+            return
+        try:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.unique_ips.encode(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"Could not save unique IP sketches to {path}: {e}")
+    
+    def metrics_route(self, query: dict) -> StatsPayload:
+        """
+        Build the /metrics response in the Prometheus text exposition format.
+        
+        Args:
+            query: Parsed query string (unused)
+            
+        Returns:
+            Pre-encoded exposition payload
+        """
+        values = self.supervisor.merged_metrics() if self.supervisor else None
+        return StatsPayload(
+            self.metrics.render(values).encode('utf-8'),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+    
     def start_http_stats_server(self):
         """
         Start HTTP server for statistics.
@@ -370,8 +1362,17 @@ class DeadlockSSH:
             self.http_server_thread = HTTPStatsServer(
                 port=self.config["http_stats_port"],
                 stats_ref=self.stats,
-                logger=self.logger
+                logger=self.logger,
+                snapshot_fn=self.stats_snapshot,
+                cache_ttl=self.config["http_stats_cache_ttl"],
+                enable_gzip=self.config["http_stats_gzip"]
             )
+            self.http_server_thread.add_json_route("/stats/top", self.top_attackers_route)
+            self.http_server_thread.add_json_route("/stats/unique", self.unique_ips_route, cached=True)
+            self.http_server_thread.add_json_route("/stats/clients", self.client_fingerprints_route)
+            self.http_server_thread.add_json_route("/stats/lifecycle", self.lifecycle_route, cached=True)
+            self.http_server_thread.add_json_route("/stats/timeseries", self.timeseries_route, compact=True)
+            self.http_server_thread.add_route("/metrics", self.metrics_route)
             self.http_server_thread.start()
             self.logger.info(f"Attempting to start HTTP stats server on port {self.config['http_stats_port']}")
     
@@ -385,6 +1386,23 @@ class DeadlockSSH:
         self.logger.info("Shutting down DeadlockSSH...")
         self.running = False
         
+        # Stop the asyncio or reactor engine if it is running
+        if self.engine:
+            self.engine.stop()
+        
+        # Release clients still waiting on the banner scheduler
+        if self.drip_scheduler:
+            self.drip_scheduler.stop()
+        
+        # Close connections held by the overflow tarpit and zero-window parker
+        self.overflow_tarpit.close_all()
+        if self.zero_window:
+            self.zero_window.stop()
+        
+        # Stop worker processes
+        if self.supervisor:
+            self.supervisor.stop()
+        
         # Close server socket
         if self.server_socket:
             try:
@@ -407,13 +1425,29 @@ class DeadlockSSH:
             time.sleep(0.1)
         
         # Log final statistics
+        final_stats = self.stats_snapshot()
         uptime = datetime.now() - self.stats['start_time']
+        top_ips = {entry['ip']: entry['connections'] for entry in self.top_attackers_list(5)}
         self.logger.info(f"Final statistics:")
-        self.logger.info(f"  Total connections: {self.stats['total_connections']}")
+        self.logger.info(f"  Total connections: {final_stats['total_connections']}")
         self.logger.info(f"  Uptime: {uptime}")
-        self.logger.info(f"  Top attacking IPs: {dict(list(self.stats['connections_per_ip'].most_common(5)))}")
+        self.logger.info(f"  Top attacking IPs: {top_ips}")
+        self.logger.info(f"  Unique IPs: {self.unique_ips.counts()}")
+        self.save_unique_ips_state()
+        self.ip_state.close()
+        
+        if self.event_sink:
+            self.event_sink.stop()
+            self.event_sink = None
+        
+        if self.payload_store:
+            self.payload_store.stop()
         
         self.logger.info("DeadlockSSH shutdown complete")
+        self.stop_log_pipeline()
+        if self.log_archive:
+            # Archive the open segment now; forked workers never reach logging.shutdown()
+            self.log_archive.close()
 
 
 def main():
@@ -432,9 +1466,82 @@ def main():
         help='Port to listen on (overrides config file)',
         default=None
     )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        help='Number of worker processes sharing the port (overrides config file)',
+        default=None
+    )
+    parser.add_argument(
+        '--engine',
+        choices=['threaded', 'asyncio', 'reactor'],
+        help='Connection engine to use (overrides config file)',
+        default=None
+    )
+    
+    subcommands = parser.add_subparsers(dest='command')
+    analyze_parser = subcommands.add_parser(
+        'analyze',
+        help='Report on honeypot logs instead of running the server'
+    )
+    analyze_parser.add_argument(
+        'paths',
+        nargs='+',
+        help='Log files (plain, rotated or compressed), archive segments or directories of them'
+    )
+    analyze_parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        help='Processes reading files in parallel (default: CPU count)',
+        default=None
+    )
+    analyze_parser.add_argument(
+        '--top',
+        type=int,
+        help='Number of IPs and payloads to list',
+        default=20
+    )
+    analyze_parser.add_argument(
+        '--since',
+        help='Ignore records before this local time (YYYY-MM-DD[ HH:MM:SS])',
+        default=None
+    )
+    analyze_parser.add_argument(
+        '--until',
+        help='Ignore records after this local time (YYYY-MM-DD[ HH:MM:SS])',
+        default=None
+    )
+    analyze_parser.add_argument(
+        '--ip',
+        action='append',
+        help='Include the full timeline of this IP (repeatable)',
+        default=[]
+    )
+    analyze_parser.add_argument(
+        '--payloads',
+        help='payload_store_dir to read payloads from when the logs only carry their hash',
+        default=None
+    )
     
     args = parser.parse_args()
     
+    if args.command == 'analyze':
+        try:
+            since = log_analytics.normalize_time(args.since) if args.since else None
+            until = log_analytics.normalize_time(args.until, end=True) if args.until else None
+        except ValueError as e:
+            analyze_parser.error(str(e))
+        for path in args.paths:
+            if not os.path.exists(path):
+                analyze_parser.error(f"no such file or directory: {path}")
+        try:
+            report = log_analytics.analyze(args.paths, jobs=args.jobs, since=since, until=until, timeline_ips=args.ip)
+        except OSError as e:
+            analyze_parser.error(str(e))  # e.g. an unreadable directory
+        payload_store = PayloadStore(args.payloads) if args.payloads else None
+        print(json.dumps(report.to_dict(args.top, payload_store), indent=4))
+        return
+    
     try:
         # Create and start honeypot
         honeypot = DeadlockSSH(config_file=args.config)
@@ -443,6 +1550,14 @@ def main():
         if args.port:
             honeypot.config['port'] = args.port
         
+        # Override worker count if specified via command line
+        if args.workers:
+            honeypot.config['workers'] = args.workers
+        
+        # Override engine if specified via command line
+        if args.engine:
+            honeypot.config['engine'] = args.engine
+        
         honeypot.start()
         
     except KeyboardInterrupt:
@@ -0,0 +1,133 @@
+import socket
+import threading
+import time
+
+from tarpit import endless_line
+from timer_wheel import TimerWheel
+
+
+class _DripState:
+    """
+    Per-connection progress through the adaptive delay and banner.
+    """
+    __slots__ = ('client_socket', 'client_address', 'data', 'pos', 'timer')
+
+    def __init__(self, client_socket: socket.socket, client_address: tuple, data: bytes):
+        self.client_socket = client_socket
+        self.client_address = client_address
+        self.data = data
+        self.pos = 0
+        self.timer = None
+
+
+class BannerDripScheduler(threading.Thread):
+    """
+    Single thread that drips the SSH banner to every pending client.
+
+    Each connection's adaptive delay and every "next byte due" event live
+    on one TimerWheel, so thousands of clients in the delay or banner
+    phase cost one thread instead of one sleeping thread each. Sockets are
+    non-blocking while owned by the scheduler; when a banner completes (or
+    fails) the socket is handed to `on_complete(client_socket,
+    client_address, ok)`.
+
+    With `endless_interval` set, the banner is never sent: each client
+    gets one random pre-banner line per interval until it disconnects.
+    """
+    def __init__(self, banner: bytes, banner_delay: float, on_complete, logger,
+                 tick: float = 0.01, endless_interval: float = None,
+                 endless_line_length: int = 32, on_sent=None, on_start=None):
+        super().__init__()
+        self.banner = banner
+        self.banner_delay = banner_delay
+        self.on_complete = on_complete
+        self.logger = logger
+        self.endless_interval = endless_interval
+        self.endless_line_length = endless_line_length
+        self.on_sent = on_sent  # Called as on_sent(client_address, nbytes)
+        self.on_start = on_start  # Called as on_start(client_address) when the delay ends
+        self.wheel = TimerWheel(tick=tick)
+        self.pending = set()
+        self.running = False
+        self.daemon = True
+
+    def add(self, client_socket: socket.socket, client_address: tuple, delay: float):
+        """
+        Take ownership of a client and start its delay timer.
+
+        Args:
+            client_socket: Accepted client socket
+            client_address: Client address tuple (ip, port)
+            delay: Adaptive delay in seconds before the first banner byte
+        """
+        client_socket.setblocking(False)
+        if self.endless_interval is not None:
+            data = endless_line(self.endless_line_length)
+        else:
+            data = self.banner
+        state = _DripState(client_socket, client_address, data)
+        self.pending.add(state)
+        state.timer = self.wheel.schedule(delay, self._start, state)
+
+    def run(self):
+        self.running = True
+        tick = self.wheel.tick
+        while self.running:
+            started = time.monotonic()
+            try:
+                self.wheel.advance(started)
+            except Exception as e:
+                self.logger.error(f"Banner scheduler error: {e}")
+            elapsed = time.monotonic() - started
+            if elapsed < tick:
+                time.sleep(tick - elapsed)
+
+    def _start(self, state: _DripState):
+        if self.on_start:
+            self.on_start(state.client_address)
+        self._send_next(state)
+
+    def _send_next(self, state: _DripState):
+        endless = self.endless_interval is not None
+        # Endless lines go out in one tiny write; the banner a byte at a time
+        end = len(state.data) if endless else state.pos + 1
+        try:
+            sent = state.client_socket.send(state.data[state.pos:end])
+            state.pos += sent
+        except (BlockingIOError, InterruptedError):
+            sent = 0  # Send buffer full; retry on the next slot
+        except OSError:
+            self._finish(state, False)
+            return
+
+        if sent and self.on_sent:
+            self.on_sent(state.client_address, sent)
+
+        if state.pos < len(state.data):
+            state.timer = self.wheel.schedule(self.banner_delay, self._send_next, state)
+        elif endless:
+            state.data = endless_line(self.endless_line_length)
+            state.pos = 0
+            state.timer = self.wheel.schedule(self.endless_interval, self._send_next, state)
+        else:
+            self._finish(state, True)
+
+    def _finish(self, state: _DripState, ok: bool):
+        try:
+            self.pending.remove(state)
+        except KeyError:
+            return  # Already finished by stop()
+        try:
+            self.on_complete(state.client_socket, state.client_address, ok)
+        except Exception as e:
+            self.logger.error(f"Error completing banner for {state.client_address[0]}: {e}")
+
+    def stop(self):
+        """
+        Stop the scheduler and fail every client still waiting on it.
+        """
+        self.running = False
+        for state in list(self.pending):
+            if state.timer:
+                state.timer.cancel()
+            self._finish(state, False)
@@ -0,0 +1,100 @@
+import collections
+import json
+import threading
+import time
+
+from stats import ShardedCounters
+
+
+# Fixed schema: every record carries "ts" and "event" followed by these fields
+EVENT_SCHEMA = {
+    'connect': ('ip', 'port', 'attempt', 'delay'),
+    'banner_complete': ('ip', 'port', 'bytes_sent'),
+    'data': ('ip', 'port', 'offset', 'data', 'payload'),
+    'client_id': ('ip', 'port', 'version'),
+    'kexinit': ('ip', 'port', 'hassh', 'algorithms'),
+    'close': ('ip', 'port', 'duration', 'bytes_sent'),
+    'shed': ('ip', 'port', 'reason'),
+    'trace': ('ip', 'port', 'accept', 'delay', 'banner', 'monitor', 'total'),
+}
+
+
+class JSONLEventSink(threading.Thread):
+    """
+    Structured JSON-lines event log written in batches.
+
+    emit() only appends a tuple to a deque, so callers pay no formatting
+    or I/O cost. A background thread serializes pending events and
+    appends each batch to the file with a single unbuffered write, which
+    keeps lines from concurrent worker processes from interleaving.
+    Events beyond `max_pending` are dropped and counted per calling
+    thread, so concurrent callers never lose a count.
+    """
+    def __init__(self, path: str, batch_size: int = 1024, flush_interval: float = 1.0,
+                 max_pending: int = 100000):
+        super().__init__(name="deadlockssh-event-writer")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending = collections.deque()
+        self.wakeup = threading.Event()
+        self.running = False
+        self.drops = ShardedCounters(1)
+        self.written = 0  # Only the writer thread updates it
+        self.file = open(path, 'ab', buffering=0)
+        self.daemon = True
+
+    @property
+    def dropped(self) -> int:
+        return int(self.drops.total(0))
+
+    def emit(self, event: str, **fields):
+        """
+        Queue an event for writing.
+
+        Args:
+            event: Event name, one of EVENT_SCHEMA's keys
+            **fields: Values for the event's schema fields
+        """
+        if len(self.pending) >= self.max_pending:
+            self.drops.add(0)
+            return
+        self.pending.append((time.time(), event, fields))
+        if len(self.pending) >= self.batch_size:
+            self.wakeup.set()
+
+    def run(self):
+        self.running = True
+        while self.running:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """
+        Serialize every pending event and append them with one write per batch.
+        """
+        while self.pending:
+            lines = []
+            while self.pending and len(lines) < self.batch_size:
+                ts, event, fields = self.pending.popleft()
+                record = {'ts': round(ts, 6), 'event': event}
+                for name in EVENT_SCHEMA[event]:
+                    record[name] = fields.get(name)
+                lines.append(json.dumps(record, separators=(',', ':')))
+            self.file.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            self.written += len(lines)
+
+    def stop(self):
+        """
+        Write all pending events and close the file.
+        """
+        self.running = False
+        self.wakeup.set()
+        if self.is_alive():
+            self.join()
+        else:
+            self.flush()
+        self.file.close()
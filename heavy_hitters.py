@@ -0,0 +1,156 @@
+import heapq
+import itertools
+import threading
+from typing import Hashable, List, Tuple
+
+
+class _Bucket:
+    """
+    All monitored items that currently share one count.
+    """
+    __slots__ = ('count', 'items', 'prev', 'next')
+
+    def __init__(self, count: int):
+        self.count = count
+        self.items = {}  # Used as an insertion-ordered set
+        self.prev = None
+        self.next = None
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch over a stream-summary structure.
+
+    Monitors at most `capacity` items. Items with equal counts share a
+    bucket in a doubly linked list ordered by count, so an update is O(1)
+    and reading the top K walks K items from the high end. When full, a
+    new item replaces one from the lowest bucket and inherits its count;
+    the inherited part is reported as the item's maximum overestimate.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buckets = {}  # item -> _Bucket
+        self.errors = {}  # item -> overestimate
+        self.min_bucket = None
+        self.max_bucket = None
+        self.lock = threading.Lock()
+
+    def _link_after(self, bucket: _Bucket, prev: _Bucket):
+        bucket.prev = prev
+        bucket.next = prev.next if prev else self.min_bucket
+        if bucket.next:
+            bucket.next.prev = bucket
+        else:
+            self.max_bucket = bucket
+        if prev:
+            prev.next = bucket
+        else:
+            self.min_bucket = bucket
+
+    def _unlink(self, bucket: _Bucket):
+        if bucket.prev:
+            bucket.prev.next = bucket.next
+        else:
+            self.min_bucket = bucket.next
+        if bucket.next:
+            bucket.next.prev = bucket.prev
+        else:
+            self.max_bucket = bucket.prev
+
+    def _move_up(self, item: Hashable, bucket: _Bucket):
+        count = bucket.count + 1
+        target = bucket.next
+        if target is None or target.count != count:
+            target = _Bucket(count)
+            self._link_after(target, bucket)
+        target.items[item] = None
+        self.buckets[item] = target
+        del bucket.items[item]
+        if not bucket.items:
+            self._unlink(bucket)
+
+    def add(self, item: Hashable):
+        """
+        Count one occurrence of an item.
+        """
+        with self.lock:
+            bucket = self.buckets.get(item)
+            if bucket is not None:
+                self._move_up(item, bucket)
+                return
+
+            if len(self.buckets) < self.capacity:
+                bucket = self.min_bucket
+                if bucket is None or bucket.count != 1:
+                    bucket = _Bucket(1)
+                    self._link_after(bucket, None)
+                bucket.items[item] = None
+                self.buckets[item] = bucket
+                self.errors[item] = 0
+                return
+
+            # Replace an item with the minimum count
+            bucket = self.min_bucket
+            victim = next(iter(bucket.items))
+            del bucket.items[victim]
+            del self.buckets[victim]
+            del self.errors[victim]
+            bucket.items[item] = None
+            self.buckets[item] = bucket
+            self.errors[item] = bucket.count
+            self._move_up(item, bucket)
+
+    def top(self, k: int) -> List[Tuple[Hashable, int, int]]:
+        """
+        Return up to k items with the highest counts.
+
+        Returns:
+            List of (item, count, overestimate) tuples, highest count first
+        """
+        result = []
+        with self.lock:
+            bucket = self.max_bucket
+            while bucket is not None and len(result) < k:
+                for item in bucket.items:
+                    result.append((item, bucket.count, self.errors[item]))
+                    if len(result) >= k:
+                        break
+                bucket = bucket.prev
+        return result
+
+    def __len__(self):
+        return len(self.buckets)
+
+
+class ShardedSpaceSaving:
+    """
+    Space-Saving sketch split into independently locked shards.
+
+    Each item always hashes to the same shard, so every shard is an exact
+    Space-Saving summary of its part of the stream and keeps the usual
+    error bound. Updates only contend within a shard; a top-K query
+    merges the shards' already sorted top lists.
+    """
+    def __init__(self, capacity: int, shards: int = 16):
+        shards = max(1, min(shards, capacity))
+        self.capacity = capacity
+        self.shards = [SpaceSaving(-(-capacity // shards)) for _ in range(shards)]
+
+    def add(self, item: Hashable):
+        """
+        Count one occurrence of an item.
+        """
+        self.shards[hash(item) % len(self.shards)].add(item)
+
+    def top(self, k: int) -> List[Tuple[Hashable, int, int]]:
+        """
+        Return up to k items with the highest counts.
+
+        Returns:
+            List of (item, count, overestimate) tuples, highest count first
+        """
+        merged = heapq.merge(*(shard.top(k) for shard in self.shards), key=lambda entry: -entry[1])
+        return list(itertools.islice(merged, k))
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
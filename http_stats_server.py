@@ -1,55 +1,193 @@
 import http.server
-import socketserver
+import gzip
+import hashlib
 import json
 import threading
-from datetime import datetime
+import time
+from urllib.parse import urlsplit, parse_qs
+
+
+class StatsPayload:
+    """
+    A pre-encoded response body with its ETag and a lazily gzipped copy.
+
+    The gzipped copy is a different representation, so it gets its own
+    strong ETag with a "-gzip" suffix.
+    """
+    def __init__(self, body: bytes, content_type: str = "application/json"):
+        self.body = body
+        self.content_type = content_type
+        digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.etag = '"%s"' % digest
+        self.etag_gzip = '"%s-gzip"' % digest
+        self._gzipped = None
+
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=5)
+        return self._gzipped
+
+
+class SnapshotCache:
+    """
+    Rebuilds a payload at most once every `ttl` seconds.
+
+    Only one thread rebuilds at a time; concurrent requests keep getting
+    the previous payload instead of waiting or rebuilding it themselves.
+    """
+    def __init__(self, build_fn, ttl: float):
+        self.build_fn = build_fn  # Callable returning a StatsPayload
+        self.ttl = ttl
+        self.payload = None
+        self.built_at = 0.0
+        self.lock = threading.Lock()
+
+    def get(self) -> StatsPayload:
+        if self.payload is not None and time.monotonic() - self.built_at < self.ttl:
+            return self.payload
+
+        # Serve the stale payload if another thread is already rebuilding
+        if not self.lock.acquire(blocking=self.payload is None):
+            return self.payload
+        try:
+            if self.payload is None or time.monotonic() - self.built_at >= self.ttl:
+                self.payload = self.build_fn()
+                self.built_at = time.monotonic()
+            return self.payload
+        finally:
+            self.lock.release()
+
+
+class _StatsHTTPServer(http.server.ThreadingHTTPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
 
 class HTTPStatsServer(threading.Thread):
     """
     A simple HTTP server to expose honeypot statistics.
+
+    Requests are served concurrently. Each route returns a pre-encoded
+    payload; /stats is rebuilt at most every `cache_ttl` seconds. Payloads
+    carry an ETag (answered with 304 when unchanged) and are gzipped for
+    clients that accept it.
     """
-    def __init__(self, port: int, stats_ref: dict, logger):
+    def __init__(self, port: int, stats_ref: dict, logger, snapshot_fn=None,
+                 cache_ttl: float = 1.0, enable_gzip: bool = True):
         super().__init__()
         self.port = port
         self.stats_ref = stats_ref  # Reference to the honeypot's stats dictionary
+        self.snapshot_fn = snapshot_fn  # Optional callable returning JSON-ready stats
         self.logger = logger
+        self.cache_ttl = cache_ttl
+        self.enable_gzip = enable_gzip
+        self.routes = {}
         self.httpd = None
         self.daemon = True  # Allow the main program to exit even if this thread is running
 
+        self.add_json_route("/stats", lambda query: self.snapshot(), cached=True)
+
+    def add_route(self, path: str, handler):
+        """
+        Register a route.
+
+        Args:
+            path: URL path, without query string
+            handler: Callable taking the parsed query dict and returning a StatsPayload
+        """
+        self.routes[path] = handler
+
+    def add_json_route(self, path: str, build_fn, cached: bool = False, compact: bool = False):
+        """
+        Register a route whose body is `build_fn(query)` encoded as JSON.
+
+        Args:
+            path: URL path, without query string
+            build_fn: Callable taking the parsed query dict and returning JSON-ready data
+            cached: Cache the payload for `cache_ttl` seconds (the query is then ignored)
+            compact: Encode without indentation, for long arrays
+        """
+        options = {'separators': (',', ':')} if compact else {'indent': 4}
+
+        def build(query):
+            return StatsPayload(json.dumps(build_fn(query), **options).encode("utf-8"))
+
+        if cached:
+            cache = SnapshotCache(lambda: build({}), self.cache_ttl)
+            self.add_route(path, lambda query: cache.get())
+        else:
+            self.add_route(path, build)
+
+    def snapshot(self) -> dict:
+        """
+        Return the stats as a JSON-ready dictionary.
+        """
+        if self.snapshot_fn:
+            return self.snapshot_fn()
+
+        current_stats = self.stats_ref.copy()
+        current_stats["start_time"] = current_stats["start_time"].isoformat()
+        current_stats["connections_per_ip"] = dict(current_stats["connections_per_ip"])
+        return current_stats
+
     def run(self):
         Handler = self._create_handler()
         try:
-            self.httpd = socketserver.TCPServer(("0.0.0.0", self.port), Handler)
+            self.httpd = _StatsHTTPServer(("0.0.0.0", self.port), Handler)
             self.logger.info(f"HTTP Stats Server listening on port {self.port}")
             self.httpd.serve_forever()
         except Exception as e:
             self.logger.error(f"Failed to start HTTP Stats Server: {e}")
 
     def _create_handler(self):
-        # Capture self.stats_ref in the closure
-        _stats_ref = self.stats_ref
+        # Capture the server in the closure
+        _server = self
         _logger = self.logger
 
-        class StatsHandler(http.server.SimpleHTTPRequestHandler):
+        class StatsHandler(http.server.BaseHTTPRequestHandler):
             def do_GET(self):
-                if self.path == "/stats":
-                    self.send_response(200)
-                    self.send_header("Content-type", "application/json")
-                    self.end_headers()
-                    
-                    # Prepare stats for JSON serialization
-                    current_stats = _stats_ref.copy()
-                    current_stats["start_time"] = current_stats["start_time"].isoformat()
-                    current_stats["connections_per_ip"] = dict(current_stats["connections_per_ip"])
-
-                    self.wfile.write(json.dumps(current_stats, indent=4).encode("utf-8"))
-                    _logger.info(f"HTTP Stats request from {self.client_address[0]}: /stats")
-                else:
+                url = urlsplit(self.path)
+                route = _server.routes.get(url.path)
+                if route is None:
                     self.send_response(404)
                     self.send_header("Content-type", "text/html")
                     self.end_headers()
                     self.wfile.write(b"<h1>404 Not Found</h1>")
-                    _logger.warning(f"HTTP Stats request from {self.client_address[0]}: {self.path} (404)")
+                    _logger.warning("HTTP Stats request from %s: %s (404)", self.client_address[0], self.path)
+                    return
+
+                try:
+                    payload = route(parse_qs(url.query))
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+                except Exception as e:
+                    _logger.error("HTTP Stats request from %s: %s failed: %s", self.client_address[0], url.path, e)
+                    self.send_error(500)
+                    return
+
+                gzipped = _server.enable_gzip and "gzip" in self.headers.get("Accept-Encoding", "")
+                etag = payload.etag_gzip if gzipped else payload.etag
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Vary", "Accept-Encoding")
+                    self.end_headers()
+                    return
+
+                body = payload.gzipped() if gzipped else payload.body
+
+                self.send_response(200)
+                self.send_header("Content-type", payload.content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", f"max-age={int(_server.cache_ttl)}")
+                self.send_header("Vary", "Accept-Encoding")
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
+                self.end_headers()
+                self.wfile.write(body)
+                _logger.info("HTTP Stats request from %s: %s", self.client_address[0], url.path)
 
         return StatsHandler
 
@@ -58,6 +196,3 @@ class HTTPStatsServer(threading.Thread):
             self.logger.info("Shutting down HTTP Stats Server...")
             self.httpd.shutdown()
             self.httpd.server_close()
-
-
-
@@ -0,0 +1,186 @@
+import base64
+import hashlib
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+
+# 2 ** -rank for every possible register value
+_INV_POW2 = [2.0 ** -rank for rank in range(65)]
+
+# Window name -> (window length in seconds, number of slices it rotates through)
+WINDOWS = {
+    'minute': (60, 6),
+    'hour': (3600, 12),
+    'day': (86400, 24),
+}
+
+
+def hash64(item: str) -> int:
+    """
+    Hash a string to a 64-bit integer.
+    """
+    return int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """
+    HyperLogLog cardinality sketch.
+
+    Uses 2 ** precision one-byte registers (4 KiB at the default precision
+    of 12, for a standard error of about 1.6%). Sketches with the same
+    precision merge by taking the register-wise maximum, so a union can be
+    counted without ever holding the items themselves.
+    """
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision: int = 12, registers: Optional[bytes] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(1 << precision)
+
+    def add_hash(self, hashed: int):
+        """
+        Add an item given its 64-bit hash.
+        """
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add(self, item: str):
+        self.add_hash(hash64(item))
+
+    def merge(self, other: 'HyperLogLog'):
+        """
+        Fold another sketch of the same precision into this one.
+        """
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with different precision")
+        self.registers[:] = bytes(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        """
+        Estimate the number of distinct items added.
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(map(_INV_POW2.__getitem__, self.registers))
+        if estimate <= 2.5 * m:
+            # Small-range correction: fall back to linear counting
+            zeros = self.registers.count(0)
+            if zeros:
+                estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        precision = data[0]
+        if len(data) != 1 + (1 << precision):
+            raise ValueError("truncated HyperLogLog sketch")
+        return cls(precision, data[1:])
+
+
+class SlidingHyperLogLog:
+    """
+    Distinct-item count over a sliding time window.
+
+    The window is split into slices, each with its own sketch; slices
+    older than the window are dropped as time moves on. Counting merges
+    the live slices, so the window is accurate to one slice length.
+    """
+    def __init__(self, window: float, slices: int, precision: int = 12):
+        self.window = window
+        self.slices = slices
+        self.slice_length = window / slices
+        self.precision = precision
+        self.sketches: Dict[int, HyperLogLog] = {}  # Slice number -> sketch
+        self.lock = threading.Lock()
+
+    def _expire(self, current: int):
+        for number in [n for n in self.sketches if n <= current - self.slices]:
+            del self.sketches[number]
+
+    def add_hash(self, hashed: int, now: Optional[float] = None):
+        current = int((time.time() if now is None else now) // self.slice_length)
+        sketch = self.sketches.get(current)
+        if sketch is None:
+            # Only rotating to a new slice takes the lock
+            with self.lock:
+                sketch = self.sketches.get(current)
+                if sketch is None:
+                    self._expire(current)
+                    sketch = self.sketches[current] = HyperLogLog(self.precision)
+        sketch.add_hash(hashed)
+
+    def count(self, now: Optional[float] = None) -> int:
+        current = int((time.time() if now is None else now) // self.slice_length)
+        union = HyperLogLog(self.precision)
+        with self.lock:
+            self._expire(current)
+            for sketch in self.sketches.values():
+                union.merge(sketch)
+        return union.count()
+
+    def merge_encoded(self, encoded: Dict[str, str]):
+        """
+        Merge slices produced by encode(), e.g. from another worker or a saved state.
+        """
+        with self.lock:
+            for number, data in encoded.items():
+                other = HyperLogLog.from_bytes(base64.b64decode(data))
+                sketch = self.sketches.get(int(number))
+                if sketch is None:
+                    self.sketches[int(number)] = other
+                else:
+                    sketch.merge(other)
+
+    def encode(self) -> Dict[str, str]:
+        """
+        Return the live slices as JSON-ready base64 strings keyed by slice number.
+        """
+        with self.lock:
+            return {
+                str(number): base64.b64encode(sketch.to_bytes()).decode('ascii')
+                for number, sketch in self.sketches.items()
+            }
+
+
+class UniqueCounter:
+    """
+    Distinct-item counts over the minute, hour and day windows.
+    """
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.windows = {
+            name: SlidingHyperLogLog(window, slices, precision)
+            for name, (window, slices) in WINDOWS.items()
+        }
+
+    def add(self, item: str):
+        hashed = hash64(item)
+        now = time.time()
+        for window in self.windows.values():
+            window.add_hash(hashed, now)
+
+    def counts(self) -> Dict[str, int]:
+        now = time.time()
+        return {name: window.count(now) for name, window in self.windows.items()}
+
+    def standard_error(self) -> float:
+        return 1.04 / math.sqrt(1 << self.precision)
+
+    def encode(self) -> Dict[str, Dict[str, str]]:
+        return {name: window.encode() for name, window in self.windows.items()}
+
+    def merge_encoded(self, encoded: Dict[str, Dict[str, str]]):
+        for name, slices in encoded.items():
+            if name in self.windows:
+                self.windows[name].merge_encoded(slices)
+
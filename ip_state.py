@@ -0,0 +1,288 @@
+import heapq
+import ipaddress
+import random
+import sys
+import threading
+import time
+from collections.abc import Mapping
+from typing import List, Tuple
+
+from ip_table import CompactIPTable
+from ip_state_file import IPStateFile
+
+
+# IPv4 addresses are stored IPv4-mapped (::ffff:a.b.c.d) so both families share one key space
+_IPV4_MAPPED = 0xFFFF << 32
+
+# Slots examined per update by the TTL sweep, and records sampled per eviction
+_SWEEP_STEP = 2
+_EVICTION_SAMPLES = 8
+_MASK64 = (1 << 64) - 1
+
+
+def ip_to_int(ip: str) -> int:
+    """
+    Pack an IPv4 or IPv6 address string into a 128-bit integer key.
+    """
+    address = ipaddress.ip_address(ip)
+    if address.version == 4:
+        return _IPV4_MAPPED | int(address)
+    return int(address)
+
+
+def int_to_ip(key: int) -> str:
+    """
+    Convert a 128-bit integer key back into an address string.
+    """
+    if key >> 32 == 0xFFFF:
+        return str(ipaddress.IPv4Address(key & 0xFFFFFFFF))
+    return str(ipaddress.IPv6Address(key))
+
+
+class _Stripe:
+    """
+    One independently locked part of the store.
+    """
+    __slots__ = ('capacity', 'table', 'lock', 'sweep_cursor', 'evictions')
+
+    def __init__(self, capacity: int, table: CompactIPTable, lock):
+        self.capacity = capacity
+        self.table = table
+        self.lock = lock
+        self.sweep_cursor = 0
+        self.evictions = 0
+
+
+class IPStateStore(Mapping):
+    """
+    Bounded per-IP attacker state with LRU and TTL eviction.
+
+    Replaces the unbounded ip_delays/ip_connection_counts dicts. Records
+    live in a CompactIPTable keyed by packed integer addresses. When the
+    store is full, the least recently seen of a random sample of records
+    is evicted (approximate LRU), and an incremental sweep drops records
+    idle for longer than `ttl`. An IP's delay decays by one
+    `delay_increment` per `decay_interval` seconds of quiet, back toward
+    `initial_delay`.
+
+    Addresses are spread over `stripes` tables, each with its own lock
+    and an equal share of the capacity, so connection threads only
+    contend when their IPs land in the same stripe.
+
+    With `path` set, the stripes live in a memory-mapped IPStateFile
+    instead of process memory, so delays survive restarts and are shared
+    by forked workers.
+
+    As a Mapping it reads like the old connections_per_ip Counter
+    (address string -> connection count).
+    """
+    def __init__(self, capacity: int, ttl: float, initial_delay: float,
+                 delay_increment: float, max_delay: float, decay_interval: float,
+                 stripes: int = 16, path: str = ''):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.ttl = ttl
+        self.initial_delay = initial_delay
+        self.delay_increment = delay_increment
+        self.max_delay = max_delay
+        self.decay_interval = decay_interval
+        # Split the slots one table of this capacity would have, so striping
+        # costs no extra memory
+        stripes = max(1, min(stripes, capacity))
+        size = CompactIPTable.size_for(-(-CompactIPTable.size_for(capacity) // stripes), load_factor=1.0)
+        capacities = [min(capacity // stripes + (i < capacity % stripes), size - 1) for i in range(stripes)]
+        self.file = IPStateFile(path, stripes, size) if path else None
+        self.repaired = 0  # Torn slots dropped when reopening after a crash
+        if self.file:
+            self.stripes = [
+                _Stripe(capacities[i], self.file.table(i, capacities[i]), self.file.lock(i))
+                for i in range(stripes)
+            ]
+            if not self.file.clean:
+                for stripe in self.stripes:
+                    with stripe.lock:
+                        self.repaired += stripe.table.repair()
+            self._restore(self.file.migrated)
+        else:
+            self.stripes = [
+                _Stripe(capacities[i], CompactIPTable(capacities[i], size=size), threading.Lock())
+                for i in range(stripes)
+            ]
+
+    def _restore(self, records: list):
+        # Re-insert records from a state file of another layout, most
+        # recently seen first so the freshest survive a smaller capacity
+        for key, hits, delay, _, last_seen in sorted(records, key=lambda record: -record[4]):
+            stripe = self._stripe(key)
+            with stripe.lock:
+                if len(stripe.table) < stripe.capacity and stripe.table.lookup(key) < 0:
+                    stripe.table.write(stripe.table.insert(key, delay, last_seen), hits, delay, last_seen)
+
+    def _stripe(self, key: int) -> _Stripe:
+        mixed = ((key ^ (key >> 64)) * 0x9E3779B97F4A7C15) & _MASK64
+        return self.stripes[(mixed >> 32) % len(self.stripes)]
+
+    def _decayed_delay(self, delay: float, last_seen: int, now: int) -> float:
+        quiet = now - last_seen
+        if self.decay_interval > 0 and quiet >= self.decay_interval:
+            steps = int(quiet // self.decay_interval)
+            return max(self.initial_delay, delay - steps * self.delay_increment)
+        return delay
+
+    def _sweep(self, stripe: _Stripe, now: int):
+        # Check a few slots per call so TTL expiry is amortized O(1)
+        table = stripe.table
+        for _ in range(_SWEEP_STEP):
+            index = stripe.sweep_cursor
+            if table.occupied(index) and now - table.read(index)[3] >= self.ttl:
+                table.delete_at(index)  # A shifted record may now sit here; recheck next call
+                stripe.evictions += 1
+            else:
+                stripe.sweep_cursor = (index + 1) & table.mask
+
+    def _evict_one(self, stripe: _Stripe):
+        # Approximate LRU: drop the least recently seen of a random sample
+        table = stripe.table
+        victim = -1
+        oldest = None
+        for _ in range(_EVICTION_SAMPLES):
+            index = random.randrange(table.size)
+            while not table.occupied(index):
+                index = (index + 1) & table.mask
+            last_seen = table.read(index)[3]
+            if oldest is None or last_seen < oldest:
+                victim, oldest = index, last_seen
+        table.delete_at(victim)
+        stripe.evictions += 1
+
+    def _touch(self, stripe: _Stripe, key: int, now: int) -> Tuple[int, int, float]:
+        table = stripe.table
+        self._sweep(stripe, now)
+        index = table.lookup(key)
+        if index < 0:
+            if len(table) >= stripe.capacity:
+                self._evict_one(stripe)
+            index = table.insert(key, self.initial_delay, now)
+        hits, delay, _, last_seen = table.read(index)
+        return index, hits, self._decayed_delay(delay, last_seen, now)
+
+    def record_connection(self, ip: str) -> Tuple[int, float]:
+        """
+        Record a new connection from an IP.
+
+        Args:
+            ip: Client IP address
+
+        Returns:
+            Tuple of (connection count for this IP, delay to apply)
+        """
+        now = int(time.time())
+        key = ip_to_int(ip)
+        stripe = self._stripe(key)
+        with stripe.lock:
+            index, hits, delay = self._touch(stripe, key, now)
+            hits += 1
+            stripe.table.write(index, hits, delay, now)
+        return hits, round(min(delay, self.max_delay), 3)
+
+    def record_close(self, ip: str):
+        """
+        Raise the delay for an IP after one of its connections closes.
+
+        Args:
+            ip: Client IP address
+        """
+        now = int(time.time())
+        key = ip_to_int(ip)
+        stripe = self._stripe(key)
+        with stripe.lock:
+            index, hits, delay = self._touch(stripe, key, now)
+            stripe.table.write(index, hits, min(delay + self.delay_increment, self.max_delay), now)
+
+    def get_delay(self, ip: str) -> float:
+        """
+        Return the delay the next connection from an IP would get.
+        """
+        key = ip_to_int(ip)
+        stripe = self._stripe(key)
+        with stripe.lock:
+            index = stripe.table.lookup(key)
+            if index < 0:
+                return self.initial_delay
+            _, delay, _, last_seen = stripe.table.read(index)
+        return round(min(self._decayed_delay(delay, last_seen, int(time.time())), self.max_delay), 3)
+
+    def _records(self) -> list:
+        records = []
+        for stripe in self.stripes:
+            with stripe.lock:
+                records.extend(stripe.table)
+        return records
+
+    def delays(self) -> dict:
+        """
+        Return current delays keyed by address string.
+        """
+        now = int(time.time())
+        return {
+            int_to_ip(key): round(self._decayed_delay(delay, last_seen, now), 3)
+            for key, _, delay, _, last_seen in self._records()
+        }
+
+    def counts(self) -> dict:
+        """
+        Return connection counts keyed by address string.
+        """
+        return {int_to_ip(key): hits for key, hits, _, _, _ in self._records()}
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        """
+        Return the n IPs with the most connections, like Counter.most_common.
+        """
+        top = heapq.nlargest(n, self._records(), key=lambda record: record[1])
+        return [(int_to_ip(record[0]), record[1]) for record in top]
+
+    def memory_usage(self) -> int:
+        """
+        Return the memory held by the store in bytes.
+        """
+        if self.file:
+            return self.file.length
+        return sum(sys.getsizeof(stripe.table.buffer) for stripe in self.stripes)
+
+    def stats(self) -> dict:
+        """
+        Return size, capacity, eviction and memory figures for the stats endpoint.
+        """
+        stats = {
+            'entries': len(self),
+            'capacity': self.capacity,
+            'evictions': sum(stripe.evictions for stripe in self.stripes),
+            'memory_bytes': self.memory_usage()
+        }
+        if self.file:
+            stats['file'] = self.file.path
+        return stats
+
+    def close(self):
+        """
+        Flush the state file, if any, and mark it cleanly closed.
+        """
+        if self.file:
+            self.file.close()
+
+    def __getitem__(self, ip: str) -> int:
+        key = ip_to_int(ip)
+        stripe = self._stripe(key)
+        with stripe.lock:
+            index = stripe.table.lookup(key)
+            if index < 0:
+                raise KeyError(ip)
+            return stripe.table.read(index)[0]
+
+    def __iter__(self):
+        return (int_to_ip(record[0]) for record in self._records())
+
+    def __len__(self):
+        return sum(len(stripe.table) for stripe in self.stripes)
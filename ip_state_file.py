@@ -0,0 +1,209 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import List, Tuple
+
+from ip_table import CompactIPTable
+
+
+# File header: magic, format version, slot size, stripe count, slots per
+# stripe and a clean-shutdown flag, padded to _HEADER_SIZE bytes
+_HEADER = struct.Struct('<8sIIIII')
+_HEADER_SIZE = 64
+_CLEAN_OFFSET = 24
+_MAGIC = b'DLSSHIPS'
+_VERSION = 1
+
+# Per-stripe header: record count, padded to 8 bytes. Its byte range is
+# also what a process locks while it changes the stripe.
+_STRIPE_HEADER_SIZE = 8
+_UINT32 = struct.Struct('<I')
+
+# A CompactIPTable slot followed by the CRC32 of its first 32 bytes
+_FIELDS_SIZE = CompactIPTable.SLOT.size
+_MAPPED_SLOT = struct.Struct('<QQIfIII')
+
+
+class MappedIPTable(CompactIPTable):
+    """
+    CompactIPTable whose slots live in a region of a shared memory map.
+
+    Every slot carries a CRC32 of its fields, so a slot torn by a crash
+    in mid-write is recognized and dropped rather than trusted. The record
+    count lives in the mapped stripe header, so every process sharing the
+    map sees the same value.
+    """
+    SLOT = _MAPPED_SLOT
+    SLOT_SIZE = _MAPPED_SLOT.size
+
+    def __init__(self, capacity: int, size: int, view: memoryview, count_view: memoryview):
+        self.capacity = capacity
+        self.size = size
+        self.mask = size - 1
+        self.buffer = view
+        self.view = view
+        self.count_view = count_view
+
+    @property
+    def count(self) -> int:
+        return _UINT32.unpack_from(self.count_view)[0]
+
+    @count.setter
+    def count(self, value: int):
+        _UINT32.pack_into(self.count_view, 0, value)
+
+    def _pack(self, offset: int, hi: int, lo: int, hits: int, delay: float, first_seen: int, last_seen: int):
+        CompactIPTable.SLOT.pack_into(self.view, offset, hi, lo, hits, delay, first_seen, last_seen)
+        _UINT32.pack_into(self.view, offset + _FIELDS_SIZE, zlib.crc32(self.view[offset:offset + _FIELDS_SIZE]))
+
+    def valid(self, index: int) -> bool:
+        """
+        Return True if a slot's fields match its checksum.
+        """
+        offset = index * self.SLOT_SIZE
+        stored = _UINT32.unpack_from(self.view, offset + _FIELDS_SIZE)[0]
+        return zlib.crc32(self.view[offset:offset + _FIELDS_SIZE]) == stored
+
+    def lookup(self, key: int) -> int:
+        index = super().lookup(key)
+        if index >= 0 and not self.valid(index):
+            self.delete_at(index)  # Torn write; forget the IP rather than trust it
+            return -1
+        return index
+
+    def repair(self) -> int:
+        """
+        Drop every slot that fails its checksum and recount the records.
+
+        Returns:
+            Number of slots dropped
+        """
+        self.count = sum(1 for index in range(self.size) if self._occupied(index))
+        dropped = 0
+        index = 0
+        while index < self.size:
+            if self._occupied(index) and not self.valid(index):
+                self.delete_at(index)  # A shifted record may now sit here; recheck it
+                dropped += 1
+            else:
+                index += 1
+        return dropped
+
+
+class _StripeLock:
+    """
+    Thread lock plus an fcntl record lock on one stripe header.
+
+    fcntl locks belong to a process, so the thread lock serializes
+    threads within it and the record lock serializes the processes.
+    """
+    __slots__ = ('lock', 'fd', 'offset')
+
+    def __init__(self, fd: int, offset: int):
+        self.lock = threading.Lock()
+        self.fd = fd
+        self.offset = offset
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, _STRIPE_HEADER_SIZE, self.offset)
+        except BaseException:
+            self.lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, _STRIPE_HEADER_SIZE, self.offset)
+        finally:
+            self.lock.release()
+
+
+class IPStateFile:
+    """
+    Fixed-layout, memory-mapped file holding every stripe of an IPStateStore.
+
+    Layout: a 64-byte header, an 8-byte header per stripe, then each
+    stripe's slots back to back. Records are updated in place in the
+    shared map, so reopening the file is a single mmap() with nothing to
+    parse, and worker processes forked after opening share one table.
+
+    The header's clean flag is cleared while the file is open. After a
+    crash it is still clear, so `clean` is False and the owner should
+    repair() every table. A file written with another layout is read
+    once, and its records are returned in `migrated` for re-insertion.
+    """
+    def __init__(self, path: str, stripes: int, size: int):
+        self.path = path
+        self.stripes = stripes
+        self.size = size
+        self.slots_offset = _HEADER_SIZE + stripes * _STRIPE_HEADER_SIZE
+        self.stripe_bytes = size * MappedIPTable.SLOT_SIZE
+        self.length = self.slots_offset + stripes * self.stripe_bytes
+        self.owner = os.getpid()  # Only the opening process marks the file clean
+        self.migrated: List[Tuple[int, int, float, int, int]] = []
+
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        expected = (_MAGIC, _VERSION, MappedIPTable.SLOT_SIZE, stripes, size)
+        existing = os.fstat(self.fd).st_size
+        header = _HEADER.unpack(os.pread(self.fd, _HEADER.size, 0)) if existing >= _HEADER_SIZE else None
+        if header and header[:5] == expected and existing == self.length:
+            self.clean = bool(header[5])
+        else:
+            if header:
+                self.migrated = self._read_records(header, existing)
+            os.ftruncate(self.fd, 0)
+            os.ftruncate(self.fd, self.length)  # Zero-filled: every slot empty
+            os.pwrite(self.fd, _HEADER.pack(*expected, 0), 0)
+            self.clean = True
+        self.map = mmap.mmap(self.fd, self.length)
+        self.view = memoryview(self.map)
+        _UINT32.pack_into(self.view, _CLEAN_OFFSET, 0)
+
+    def _read_records(self, header: tuple, existing: int) -> List[Tuple[int, int, float, int, int]]:
+        magic, version, slot_size, stripes, size, _ = header
+        if magic != _MAGIC or version != _VERSION or slot_size != MappedIPTable.SLOT_SIZE:
+            return []
+        start = _HEADER_SIZE + stripes * _STRIPE_HEADER_SIZE
+        end = min(existing, start + stripes * size * slot_size)
+        if end <= start:
+            return []
+        data = os.pread(self.fd, end - start, start)
+        records = []
+        for offset in range(0, len(data) - slot_size + 1, slot_size):
+            hi, lo, hits, delay, first_seen, last_seen, checksum = _MAPPED_SLOT.unpack_from(data, offset)
+            if first_seen and zlib.crc32(data[offset:offset + _FIELDS_SIZE]) == checksum:
+                records.append(((hi << 64) | lo, hits, delay, first_seen, last_seen))
+        return records
+
+    def table(self, index: int, capacity: int) -> MappedIPTable:
+        """
+        Return the table mapped onto one stripe's region.
+        """
+        start = self.slots_offset + index * self.stripe_bytes
+        count_offset = _HEADER_SIZE + index * _STRIPE_HEADER_SIZE
+        return MappedIPTable(
+            capacity, self.size,
+            self.view[start:start + self.stripe_bytes],
+            self.view[count_offset:count_offset + _UINT32.size]
+        )
+
+    def lock(self, index: int) -> _StripeLock:
+        """
+        Return a lock serializing one stripe across threads and processes.
+        """
+        return _StripeLock(self.fd, _HEADER_SIZE + index * _STRIPE_HEADER_SIZE)
+
+    def close(self):
+        """
+        Flush the map and, in the process that opened it, mark the file clean.
+
+        The map stays valid, so forked workers still running keep using it.
+        """
+        if os.getpid() == self.owner:
+            _UINT32.pack_into(self.view, _CLEAN_OFFSET, 1)
+        self.map.flush()
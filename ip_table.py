@@ -0,0 +1,167 @@
+import struct
+from typing import Iterator, Tuple
+
+
+# One fixed-width slot per IP: key high/low 64 bits, hit count, current
+# delay, first-seen and last-seen (epoch seconds). first_seen == 0 marks
+# an empty slot.
+_SLOT = struct.Struct('<QQIfII')
+_KEY = struct.Struct('<QQ')
+_FIRST_SEEN = struct.Struct('<I')
+_FIRST_SEEN_OFFSET = 24
+_MASK64 = (1 << 64) - 1
+
+
+class CompactIPTable:
+    """
+    Open-addressing hash table of per-IP records in fixed-width slots.
+
+    All records live in a single bytearray (viewed through a memoryview),
+    so an IP costs one 32-byte slot plus load-factor slack instead of a
+    Python string, float and int spread across several dicts. Collisions
+    use linear probing and deletions use backward-shift, so there are no
+    tombstones.
+    """
+    SLOT = _SLOT
+    SLOT_SIZE = _SLOT.size
+
+    def __init__(self, capacity: int, load_factor: float = 0.75, size: int = 0):
+        if not size:
+            size = self.size_for(capacity, load_factor)
+        self.capacity = capacity
+        self.size = size
+        self.mask = size - 1
+        self.buffer = bytearray(size * self.SLOT_SIZE)
+        self.view = memoryview(self.buffer)
+        self.count = 0
+
+    @staticmethod
+    def size_for(capacity: int, load_factor: float = 0.75) -> int:
+        """
+        Return the power-of-two slot count needed to hold `capacity` records.
+        """
+        size = 8
+        while size * load_factor < capacity:
+            size <<= 1
+        return size
+
+    @staticmethod
+    def split_key(key: int) -> Tuple[int, int]:
+        """
+        Split a 128-bit address key into high and low 64-bit halves.
+        """
+        return key >> 64, key & _MASK64
+
+    def _home(self, hi: int, lo: int) -> int:
+        h = ((hi * 0x9E3779B97F4A7C15) ^ lo) * 0xBF58476D1CE4E5B9 & _MASK64
+        return (h ^ (h >> 31)) & self.mask
+
+    def _pack(self, offset: int, hi: int, lo: int, hits: int, delay: float, first_seen: int, last_seen: int):
+        _SLOT.pack_into(self.view, offset, hi, lo, hits, delay, first_seen, last_seen)
+
+    def _occupied(self, index: int) -> bool:
+        return _FIRST_SEEN.unpack_from(self.view, index * self.SLOT_SIZE + _FIRST_SEEN_OFFSET)[0] != 0
+
+    def lookup(self, key: int) -> int:
+        """
+        Find the slot holding a key.
+
+        Returns:
+            Slot index, or -1 if the key is not present
+        """
+        hi, lo = self.split_key(key)
+        index = self._home(hi, lo)
+        while self._occupied(index):
+            if _KEY.unpack_from(self.view, index * self.SLOT_SIZE) == (hi, lo):
+                return index
+            index = (index + 1) & self.mask
+        return -1
+
+    def insert(self, key: int, delay: float, now: int) -> int:
+        """
+        Insert a new key with zero hits. The caller must make room first.
+
+        Returns:
+            Slot index of the new record
+        """
+        if self.count >= self.size - 1:
+            raise OverflowError("IP table is full")
+        hi, lo = self.split_key(key)
+        index = self._home(hi, lo)
+        while self._occupied(index):
+            index = (index + 1) & self.mask
+        self._pack(index * self.SLOT_SIZE, hi, lo, 0, delay, now, now)
+        self.count += 1
+        return index
+
+    def read(self, index: int) -> Tuple[int, float, int, int]:
+        """
+        Read a slot.
+
+        Returns:
+            Tuple of (hits, delay, first_seen, last_seen)
+        """
+        return self.SLOT.unpack_from(self.view, index * self.SLOT_SIZE)[2:6]
+
+    def write(self, index: int, hits: int, delay: float, last_seen: int):
+        """
+        Update the mutable fields of an occupied slot.
+        """
+        offset = index * self.SLOT_SIZE
+        hi, lo, _, _, first_seen, _ = self.SLOT.unpack_from(self.view, offset)[:6]
+        self._pack(offset, hi, lo, hits, delay, first_seen, last_seen)
+
+    def key_at(self, index: int) -> int:
+        """
+        Return the 128-bit key stored in a slot.
+        """
+        hi, lo = _KEY.unpack_from(self.view, index * self.SLOT_SIZE)
+        return (hi << 64) | lo
+
+    def delete_at(self, index: int):
+        """
+        Remove the record in a slot, shifting later probe-chain members back.
+        """
+        size = self.SLOT_SIZE
+        hole = index
+        probe = index
+        while True:
+            probe = (probe + 1) & self.mask
+            if not self._occupied(probe):
+                break
+            home = self._home(*_KEY.unpack_from(self.view, probe * size))
+            # The record may fill the hole unless its home lies cyclically in (hole, probe]
+            if hole <= probe:
+                movable = home <= hole or home > probe
+            else:
+                movable = home <= hole and home > probe
+            if movable:
+                self.view[hole * size:(hole + 1) * size] = self.view[probe * size:(probe + 1) * size]
+                hole = probe
+        self.view[hole * size:(hole + 1) * size] = bytes(size)
+        self.count -= 1
+
+    def occupied(self, index: int) -> bool:
+        """
+        Return True if a slot holds a record.
+        """
+        return self._occupied(index)
+
+    def __iter__(self) -> Iterator[Tuple[int, int, float, int, int]]:
+        """
+        Yield (key, hits, delay, first_seen, last_seen) for every record.
+        """
+        for slot in self.SLOT.iter_unpack(self.view):
+            if slot[4]:
+                hi, lo, hits, delay, first_seen, last_seen = slot[:6]
+                yield (hi << 64) | lo, hits, delay, first_seen, last_seen
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size of the slot storage in bytes.
+        """
+        return len(self.buffer)
@@ -0,0 +1,158 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+from stats import ShardedCounters
+
+
+# Connection phases, in order. 'total' spans accept to close.
+PHASES = ('accept', 'delay', 'banner', 'monitor', 'total')
+
+# Quantiles reported for each phase
+QUANTILES = (('p50', 0.50), ('p90', 0.90), ('p99', 0.99), ('p999', 0.999))
+
+
+class LogHistogram:
+    """
+    HDR-style log-linear histogram of durations.
+
+    Values are recorded in microseconds. Below 2 ** sub_bucket_bits every
+    microsecond has its own bucket; above that, each power of two is split
+    into 2 ** (sub_bucket_bits - 1) equal buckets, so a bucket is never
+    wider than 1 / 2 ** (sub_bucket_bits - 1) of its values (6.25% at
+    the default of 5 bits) from a microsecond up to `max_seconds`.
+    Counts live in ShardedCounters, so observing takes no lock.
+    """
+    def __init__(self, sub_bucket_bits: int = 5, max_seconds: float = 86400.0):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_micros = int(max_seconds * 1e6)
+        self.buckets = self.bucket_index(self.max_micros, sub_bucket_bits) + 1
+        # One slot per bucket and the running sum (in seconds) last
+        self.counters = ShardedCounters(self.buckets + 1)
+
+    @staticmethod
+    def bucket_index(micros: int, sub_bucket_bits: int) -> int:
+        """
+        Return the bucket holding a value in microseconds.
+        """
+        exponent = max(0, micros.bit_length() - sub_bucket_bits)
+        return (exponent << (sub_bucket_bits - 1)) + (micros >> exponent)
+
+    @staticmethod
+    def bucket_bounds(index: int, sub_bucket_bits: int) -> Tuple[int, int]:
+        """
+        Return the [lower, upper) microsecond range of a bucket.
+        """
+        half = 1 << (sub_bucket_bits - 1)
+        if index < 2 * half:
+            return index, index + 1
+        exponent = index // half - 1
+        mantissa = index - exponent * half
+        return mantissa << exponent, (mantissa + 1) << exponent
+
+    def observe(self, seconds: float):
+        micros = min(max(0, int(seconds * 1e6)), self.max_micros)
+        shard = self.counters.shard()
+        shard[self.bucket_index(micros, self.sub_bucket_bits)] += 1
+        shard[-1] += seconds
+
+    def value(self) -> dict:
+        """
+        Return the non-empty buckets and the sum in a form that merges by summing.
+        """
+        totals = self.counters.totals()
+        return {
+            'buckets': {index: count for index, count in enumerate(totals[:-1]) if count},
+            'sum': totals[-1]
+        }
+
+
+def summarize(value: dict, sub_bucket_bits: int = 5, with_buckets: bool = False) -> dict:
+    """
+    Turn a LogHistogram value (possibly merged across workers) into
+    count, mean, quantiles and max, in seconds.
+
+    Quantiles are the upper bound of the bucket holding that rank, so
+    they overstate by at most one bucket width.
+
+    Args:
+        value: Dictionary from LogHistogram.value()
+        sub_bucket_bits: Bucket layout the value was recorded with
+        with_buckets: Also list every non-empty bucket as [lower, upper, count]
+
+    Returns:
+        JSON-ready summary
+    """
+    buckets = sorted((int(index), count) for index, count in value['buckets'].items())
+    count = sum(bucket_count for _, bucket_count in buckets)
+    summary = {'count': count, 'mean': round(value['sum'] / count, 6) if count else None}
+
+    targets = [(name, max(1, math.ceil(fraction * count))) for name, fraction in QUANTILES]
+    results: Dict[str, Optional[float]] = {name: None for name, _ in QUANTILES}
+    seen = 0
+    for index, bucket_count in buckets:
+        seen += bucket_count
+        upper = LogHistogram.bucket_bounds(index, sub_bucket_bits)[1] / 1e6
+        for name, rank in targets:
+            if results[name] is None and seen >= rank:
+                results[name] = round(upper, 6)
+    summary.update(results)
+    summary['max'] = round(LogHistogram.bucket_bounds(buckets[-1][0], sub_bucket_bits)[1] / 1e6, 6) if buckets else None
+
+    if with_buckets:
+        summary['buckets'] = [
+            [lower / 1e6, upper / 1e6, bucket_count]
+            for index, bucket_count in buckets
+            for lower, upper in [LogHistogram.bucket_bounds(index, sub_bucket_bits)]
+        ]
+    return summary
+
+
+class LifecycleTimings:
+    """
+    Per-phase duration histograms for trapped connections.
+
+    Engines mark when each phase starts (see DeadlockSSH.register_connection,
+    banner_started and banner_complete); when a connection closes its
+    marks are turned into one duration per phase it reached and observed
+    here, so a connection costs no histogram work until it ends.
+    """
+    def __init__(self, sub_bucket_bits: int = 5):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.histograms = {phase: LogHistogram(sub_bucket_bits) for phase in PHASES}
+
+    @staticmethod
+    def durations(marks: List[Optional[float]], closed: float) -> Dict[str, float]:
+        """
+        Turn phase start marks into per-phase durations.
+
+        Args:
+            marks: Monotonic start times of accept, delay, banner and
+                monitor (None for phases never reached)
+            closed: Monotonic close time
+
+        Returns:
+            Duration in seconds of each phase reached, plus 'total'
+        """
+        reached = [(phase, start) for phase, start in zip(PHASES, marks) if start is not None]
+        durations = {}
+        for i, (phase, start) in enumerate(reached):
+            end = reached[i + 1][1] if i + 1 < len(reached) else closed
+            durations[phase] = end - start
+        durations['total'] = closed - reached[0][1]
+        return durations
+
+    def observe(self, durations: Dict[str, float]):
+        for phase, seconds in durations.items():
+            self.histograms[phase].observe(seconds)
+
+    def value(self) -> dict:
+        return {phase: histogram.value() for phase, histogram in self.histograms.items()}
+
+    def summarize(self, value: dict, with_buckets: bool = False) -> dict:
+        """
+        Summarize a value() (possibly merged across workers) phase by phase.
+        """
+        return {
+            phase: summarize(value[phase], self.sub_bucket_bits, with_buckets)
+            for phase in PHASES if phase in value
+        }
@@ -0,0 +1,374 @@
+import heapq
+import multiprocessing
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from log_archive import READ_ERRORS, open_segment, read_segment_index
+from payload_store import PayloadStore
+
+
+# Records look like "2026-01-31 12:00:00,123 - deadlockssh - INFO - message";
+# lines that do not start like this continue the previous record
+_RECORD_START = re.compile(r'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3} - ')
+
+_CONNECT = re.compile(r'Connection from (\S+):(\d+) \(attempt #(\d+), delay: ([\d.]+)s\)$')
+# Byte counts and offsets are optional so logs written before they were added still parse
+_CLOSE = re.compile(r'Connection from (\S+) closed(?: \((\d+) bytes sent\))?$')
+_DATA = re.compile(r'Data from (\S+)(?: \(offset (\d+)\))?(?: \[payload ([0-9a-f]+)\])?(?:: (.*))?$', re.DOTALL)
+_CLIENT_ID = re.compile(r'Client (\S+):(\d+) identifies as (.*)$', re.DOTALL)
+_HASSH = re.compile(r'Client (\S+):(\d+) HASSH ([0-9a-f]+)$')
+
+_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def expand_paths(paths: Iterable[str]) -> List[str]:
+    """
+    Turn files and directories into the list of log files to read.
+
+    Directories contribute every log file and archive segment in them,
+    skipping hidden files such as segments still being written.
+
+    Args:
+        paths: Log files, archive segments or directories holding them
+
+    Returns:
+        Sorted list of file paths
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in os.listdir(path):
+                if '.log' in name and not name.startswith('.') and not name.endswith('.tmp'):
+                    files.append(os.path.join(path, name))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def read_lines(path: str) -> Iterator[str]:
+    """
+    Stream the lines of a plain, gzip or zstd log file.
+    """
+    with open_segment(path) as f:
+        for line in f:
+            # Only the record terminator goes; payloads keep their own CRs
+            yield line.decode('utf-8', 'replace').rstrip('\n')
+
+
+def parse_records(lines: Iterable[str]) -> Iterator[Tuple[str, str, str]]:
+    """
+    Group lines into log records.
+
+    Payloads containing newlines span several lines; those lines are
+    joined back onto the record they belong to.
+
+    Yields:
+        (timestamp "YYYY-MM-DD HH:MM:SS", level, message)
+    """
+    record = None
+    for line in lines:
+        if _RECORD_START.match(line):
+            if record:
+                yield record[0], record[1], '\n'.join(record[2])
+            parts = line.split(' - ', 3)
+            if len(parts) < 4:
+                record = None
+                continue
+            record = (parts[0][:19], parts[2], [parts[3]])
+        elif record:
+            record[2].append(line)
+    if record:
+        yield record[0], record[1], '\n'.join(record[2])
+
+
+def parse_events(records: Iterable[Tuple[str, str, str]]) -> Iterator[tuple]:
+    """
+    Pick the connection, close, data and client identification records.
+
+    Yields:
+        ('connect', ts, ip, port), ('close', ts, ip, bytes_sent),
+        ('data', ts, ip, payload_hash, text), ('client_id', ts, ip, version)
+        or ('hassh', ts, ip, fingerprint); bytes_sent is None for older
+        logs that did not record it
+    """
+    for ts, level, message in records:
+        if message.startswith('Connection from '):
+            match = _CONNECT.match(message)
+            if match:
+                yield 'connect', ts, match.group(1), int(match.group(2))
+                continue
+            match = _CLOSE.match(message)
+            if match:
+                bytes_sent = match.group(2)
+                yield 'close', ts, match.group(1), int(bytes_sent) if bytes_sent else None
+        elif message.startswith('Data from '):
+            match = _DATA.match(message)
+            if match:
+                yield 'data', ts, match.group(1), match.group(3), match.group(4)
+        elif message.startswith('Client '):
+            match = _HASSH.match(message)
+            if match:
+                yield 'hassh', ts, match.group(1), match.group(3)
+                continue
+            match = _CLIENT_ID.match(message)
+            if match:
+                yield 'client_id', ts, match.group(1), match.group(3)
+
+
+# Fields of a per-IP entry; a list keeps hundreds of thousands of them small
+_CONNECTIONS, _FIRST_SEEN, _LAST_SEEN, _BYTES_SENT, _DATA_CHUNKS, _VERSIONS, _FINGERPRINTS = range(7)
+
+
+class Report:
+    """
+    Aggregates built from log events, mergeable across files.
+
+    Memory grows with the number of distinct IPs and payloads, never
+    with the volume of logs read.
+    """
+    def __init__(self, timeline_ips: frozenset = frozenset()):
+        self.files = 0
+        self.skipped_files = 0
+        self.failed_files: List[Tuple[str, str]] = []  # (path, error) of unreadable files
+        self.records = 0
+        self.ips: Dict[str, list] = {}  # ip -> entry (see the field indexes above)
+        self.payloads = Counter()  # payload hash (or text) -> sightings
+        self.samples: Dict[str, Optional[str]] = {}  # payload hash -> text from its first sighting, if read
+        self.hourly = Counter()  # "YYYY-MM-DD HH:00" -> connections
+        self.timeline_ips = timeline_ips
+        self.timelines: Dict[str, list] = {ip: [] for ip in timeline_ips}
+
+    def _ip(self, ip: str, ts: str) -> list:
+        entry = self.ips.get(ip)
+        if entry is None:
+            entry = self.ips[ip] = [0, ts, ts, 0, 0, None, None]
+        elif ts < entry[_FIRST_SEEN]:
+            entry[_FIRST_SEEN] = ts
+        elif ts > entry[_LAST_SEEN]:
+            entry[_LAST_SEEN] = ts
+        return entry
+
+    def add(self, event: tuple):
+        kind, ts, ip = event[:3]
+        entry = self._ip(ip, ts)
+        if kind == 'connect':
+            entry[_CONNECTIONS] += 1
+            self.hourly[ts[:13] + ':00'] += 1
+        elif kind == 'close':
+            if event[3] is not None:  # Unknown in logs from before the count was added
+                entry[_BYTES_SENT] += event[3]
+        elif kind == 'data':
+            payload, text = event[3], event[4]
+            entry[_DATA_CHUNKS] += 1
+            key = payload or text or ''
+            self.payloads[key] += 1
+            if payload and self.samples.get(payload) is None:
+                self.samples[payload] = text
+        elif kind == 'client_id':
+            entry[_VERSIONS] = (entry[_VERSIONS] or frozenset()) | {event[3]}
+        elif kind == 'hassh':
+            entry[_FINGERPRINTS] = (entry[_FINGERPRINTS] or frozenset()) | {event[3]}
+        if ip in self.timeline_ips:
+            self.timelines[ip].append(event)
+
+    def merge(self, other: 'Report'):
+        self.files += other.files
+        self.skipped_files += other.skipped_files
+        self.failed_files.extend(other.failed_files)
+        self.records += other.records
+        for ip, theirs in other.ips.items():
+            ours = self.ips.get(ip)
+            if ours is None:
+                self.ips[ip] = theirs
+                continue
+            ours[_CONNECTIONS] += theirs[_CONNECTIONS]
+            ours[_FIRST_SEEN] = min(ours[_FIRST_SEEN], theirs[_FIRST_SEEN])
+            ours[_LAST_SEEN] = max(ours[_LAST_SEEN], theirs[_LAST_SEEN])
+            ours[_BYTES_SENT] += theirs[_BYTES_SENT]
+            ours[_DATA_CHUNKS] += theirs[_DATA_CHUNKS]
+            for field in (_VERSIONS, _FINGERPRINTS):
+                if theirs[field]:
+                    ours[field] = (ours[field] or frozenset()) | theirs[field]
+        self.payloads.update(other.payloads)
+        for payload, text in other.samples.items():
+            if self.samples.get(payload) is None:
+                self.samples[payload] = text
+        self.hourly.update(other.hourly)
+        for ip, events in other.timelines.items():
+            self.timelines[ip].extend(events)
+
+    def to_dict(self, top: int, payload_store: Optional[PayloadStore] = None) -> dict:
+        """
+        Build the JSON-ready report.
+
+        Args:
+            top: Number of IPs and payloads to list
+            payload_store: Store to read payloads from when the logs
+                only carry their hash
+
+        Returns:
+            Report dictionary
+        """
+        # Ties break on the key, so the report does not depend on file order
+        busiest = heapq.nlargest(top, self.ips.items(), key=lambda item: (item[1][_CONNECTIONS], item[0]))
+        common = heapq.nlargest(top, self.payloads.items(), key=lambda item: (item[1], item[0]))
+        result = {
+            'files': self.files,
+            'files_skipped': self.skipped_files,
+            'files_failed': [{'path': path, 'error': error} for path, error in sorted(self.failed_files)],
+            'records': self.records,
+            'unique_ips': len(self.ips),
+            'connections': sum(self.hourly.values()),
+            'top_ips': [
+                {
+                    'ip': ip,
+                    'connections': entry[_CONNECTIONS],
+                    'first_seen': entry[_FIRST_SEEN],
+                    'last_seen': entry[_LAST_SEEN],
+                    'bytes_sent': entry[_BYTES_SENT],
+                    'data_chunks': entry[_DATA_CHUNKS],
+                    'versions': sorted(entry[_VERSIONS] or ()),
+                    'hassh': sorted(entry[_FINGERPRINTS] or ())
+                }
+                for ip, entry in busiest
+            ],
+            'top_payloads': [
+                self._payload_entry(key, count, payload_store)
+                for key, count in common
+            ],
+            'hourly_connections': dict(sorted(self.hourly.items()))
+        }
+        if self.timeline_ips:
+            result['timelines'] = {
+                ip: [
+                    dict(zip(_TIMELINE_FIELDS[event[0]], event))
+                    for event in sorted(events, key=lambda event: event[1])
+                ]
+                for ip, events in self.timelines.items()
+            }
+        return result
+
+    def _payload_entry(self, key: str, count: int, payload_store: Optional[PayloadStore]) -> dict:
+        if key not in self.samples:
+            return {'payload': None, 'data': key, 'count': count}  # Logged without a payload store
+        text = self.samples[key]
+        if text is None and payload_store:
+            try:
+                text = str(payload_store.get(key), 'utf-8', 'replace')
+            except OSError:
+                pass
+        return {'payload': key, 'data': text, 'count': count}
+
+
+_TIMELINE_FIELDS = {
+    'connect': ('event', 'ts', 'ip', 'port'),
+    'close': ('event', 'ts', 'ip', 'bytes_sent'),
+    'data': ('event', 'ts', 'ip', 'payload', 'data'),
+    'client_id': ('event', 'ts', 'ip', 'version'),
+    'hassh': ('event', 'ts', 'ip', 'hassh'),
+}
+
+
+def analyze_file(task: Tuple[str, Optional[str], Optional[str], frozenset]) -> Report:
+    """
+    Stream one log file through the pipeline into a Report.
+
+    Archive segments whose index shows no overlap with the time window
+    are skipped without being decompressed. A file that cannot be read
+    to the end (missing, truncated or corrupt) is skipped as a whole and
+    listed with its error.
+
+    Args:
+        task: (path, since, until, timeline IPs); since and until are
+            "YYYY-MM-DD HH:MM:SS" strings or None
+
+    Returns:
+        Report for this file
+    """
+    path, since, until, timeline_ips = task
+    report = Report(timeline_ips)
+    try:
+        index = read_segment_index(path) if path.endswith(('.gz', '.zst')) else None
+        if index and _outside(index, since, until):
+            report.skipped_files = 1
+            return report
+
+        report.files = 1
+        records = _in_window(parse_records(read_lines(path)), since, until, report)
+        for event in parse_events(records):
+            report.add(event)
+    except (RuntimeError, *READ_ERRORS) as e:  # RuntimeError: zstandard is not installed
+        # Partial counts would skew the report; leave the file out entirely
+        report = Report(timeline_ips)
+        report.skipped_files = 1
+        report.failed_files.append((path, str(e) or type(e).__name__))
+    return report
+
+
+def _in_window(records: Iterable[Tuple[str, str, str]], since: Optional[str], until: Optional[str],
+               report: Report) -> Iterator[Tuple[str, str, str]]:
+    # Timestamps share one fixed-width format, so strings compare like times
+    for record in records:
+        report.records += 1
+        if (since and record[0] < since) or (until and record[0] > until):
+            continue
+        yield record
+
+
+def normalize_time(value: str, end: bool = False) -> str:
+    """
+    Complete a "YYYY-MM-DD[ HH[:MM[:SS]]]" time to the log's timestamp format.
+
+    Args:
+        value: Time given on the command line
+        end: Fill missing fields with their last value instead of zero
+
+    Returns:
+        "YYYY-MM-DD HH:MM:SS" string
+    """
+    value = value.strip().replace('T', ' ')
+    filler = '2000-01-01 23:59:59' if end else '2000-01-01 00:00:00'
+    if len(value) < 10 or len(value) > 19:
+        raise ValueError(f"invalid time {value!r}, expected YYYY-MM-DD[ HH:MM:SS]")
+    value += filler[len(value):]
+    time.strptime(value, _TIME_FORMAT)  # Raises ValueError if malformed
+    return value
+
+
+def _outside(index: dict, since: Optional[str], until: Optional[str]) -> bool:
+    # Log timestamps are local time, like time.localtime()
+    last = time.strftime(_TIME_FORMAT, time.localtime(index['last']))
+    first = time.strftime(_TIME_FORMAT, time.localtime(index['first']))
+    return bool((since and last < since) or (until and first > until))
+
+
+def analyze(paths: Iterable[str], jobs: Optional[int] = None, since: Optional[str] = None,
+            until: Optional[str] = None, timeline_ips: Iterable[str] = ()) -> Report:
+    """
+    Analyze log files in parallel, one file per task.
+
+    Args:
+        paths: Log files, archive segments or directories
+        jobs: Worker processes (defaults to the CPU count)
+        since: Ignore records before this "YYYY-MM-DD HH:MM:SS" time
+        until: Ignore records after this "YYYY-MM-DD HH:MM:SS" time
+        timeline_ips: IPs whose every event should be kept in order
+
+    Returns:
+        Merged Report
+    """
+    timeline_ips = frozenset(timeline_ips)
+    tasks = [(path, since, until, timeline_ips) for path in expand_paths(paths)]
+    report = Report(timeline_ips)
+    jobs = min(jobs or os.cpu_count() or 1, len(tasks))
+    if jobs <= 1:
+        for task in tasks:
+            report.merge(analyze_file(task))
+        return report
+    with multiprocessing.Pool(jobs) as pool:
+        for partial in pool.imap_unordered(analyze_file, tasks):
+            report.merge(partial)
+    return report
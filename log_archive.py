@@ -0,0 +1,292 @@
+import gzip
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import BinaryIO, Optional
+
+try:
+    import zstandard
+except ImportError:  # gzip only
+    zstandard = None
+
+
+# Segment index: format version, first and last record times, record
+# count and uncompressed size. It is stored where standard tools skip it,
+# a gzip FEXTRA subfield or a zstd skippable frame, so segments still
+# decompress with zcat or zstdcat.
+_INDEX = struct.Struct('<IddQQ')
+_INDEX_VERSION = 1
+_GZIP_SUBFIELD = b'DL'
+_ZSTD_SKIPPABLE_MAGIC = 0x184D2A5D
+_ZSTD_SKIPPABLE = struct.Struct('<II')
+
+SEGMENT_PREFIX = 'deadlockssh-'
+CODEC_EXTENSIONS = {'gzip': '.log.gz', 'zstd': '.log.zst'}
+
+_CHUNK = 1 << 20
+
+# What reading a damaged or truncated segment can raise
+READ_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+_SENTINEL = None
+
+
+def resolve_codec(codec: str) -> str:
+    """
+    Pick the archive codec: 'zstd' if requested (or 'auto') and installed, else 'gzip'.
+    """
+    if codec in ('auto', 'zstd') and zstandard is not None:
+        return 'zstd'
+    return 'gzip'
+
+
+def read_segment_index(path: str) -> Optional[dict]:
+    """
+    Read an archive segment's index without decompressing it.
+
+    Args:
+        path: Segment file path
+
+    Returns:
+        Dictionary with codec, first, last, records and raw_bytes, or
+        None if the file is not an indexed segment. `records` is 0 for
+        segments recovered after a crash, whose count is unknown.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(16 + _INDEX.size)
+    if len(head) < 16 + _INDEX.size:
+        return None
+    if head[:3] == b'\x1f\x8b\x08' and head[3] & 0x04 and head[12:14] == _GZIP_SUBFIELD:
+        codec, data = 'gzip', head[16:16 + _INDEX.size]
+    elif _ZSTD_SKIPPABLE.unpack_from(head) == (_ZSTD_SKIPPABLE_MAGIC, _INDEX.size):
+        codec, data = 'zstd', head[8:8 + _INDEX.size]
+    else:
+        return None
+    version, first, last, records, raw_bytes = _INDEX.unpack(data)
+    if version != _INDEX_VERSION:
+        return None
+    return {'codec': codec, 'first': first, 'last': last, 'records': records, 'raw_bytes': raw_bytes}
+
+
+def open_segment(path: str) -> BinaryIO:
+    """
+    Open a log file for streaming reads, decompressing archive segments.
+
+    Args:
+        path: Plain log file, or a gzip or zstd segment
+
+    Returns:
+        Binary file object yielding the uncompressed log text
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is not installed, cannot read {path}")
+        f = open(path, 'rb')
+        magic, size = _ZSTD_SKIPPABLE.unpack(f.read(_ZSTD_SKIPPABLE.size))
+        if magic == _ZSTD_SKIPPABLE_MAGIC:
+            f.seek(size, os.SEEK_CUR)
+        else:
+            f.seek(0)
+        return zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+    return open(path, 'rb')
+
+
+def _write_gzip(src: BinaryIO, dst: BinaryIO, index: bytes, mtime: float):
+    # RFC 1952 member with the index in an FEXTRA subfield
+    dst.write(b'\x1f\x8b\x08\x04' + struct.pack('<IBB', int(mtime) & 0xFFFFFFFF, 0, 255))
+    dst.write(struct.pack('<H2sH', 4 + len(index), _GZIP_SUBFIELD, len(index)) + index)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    crc = 0
+    size = 0
+    while True:
+        chunk = src.read(_CHUNK)
+        if not chunk:
+            break
+        crc = zlib.crc32(chunk, crc)
+        size += len(chunk)
+        dst.write(compressor.compress(chunk))
+    dst.write(compressor.flush())
+    dst.write(struct.pack('<II', crc, size & 0xFFFFFFFF))
+
+
+def _write_zstd(src: BinaryIO, dst: BinaryIO, index: bytes):
+    dst.write(_ZSTD_SKIPPABLE.pack(_ZSTD_SKIPPABLE_MAGIC, len(index)) + index)
+    with zstandard.ZstdCompressor(level=3).stream_writer(dst, closefd=False) as writer:
+        while True:
+            chunk = src.read(_CHUNK)
+            if not chunk:
+                break
+            writer.write(chunk)
+
+
+class SegmentCompressor(threading.Thread):
+    """
+    Background thread compressing closed segments into the archive.
+
+    Each raw segment is compressed to a temporary file, renamed into
+    place and then deleted. Afterwards the oldest segments are removed
+    until the archive fits in `max_bytes` (0 for no limit).
+    """
+    def __init__(self, directory: str, codec: str, max_bytes: int = 0):
+        super().__init__(name="deadlockssh-log-archiver")
+        self.directory = directory
+        self.codec = codec
+        self.max_bytes = max_bytes
+        self.queue = queue.Queue()
+        self.daemon = True
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is _SENTINEL:
+                break
+            try:
+                self.compress(*item)
+                self.enforce_retention()
+            except OSError as e:
+                logging.getLogger("deadlockssh").warning(f"Could not archive log segment {item[0]}: {e}")
+
+    def compress(self, raw_path: str, first: float, last: float, records: int):
+        """
+        Compress one raw segment and delete it.
+
+        Args:
+            raw_path: Closed, uncompressed segment
+            first: Time of its first record
+            last: Time of its last record
+            records: Number of records it holds (0 if unknown)
+        """
+        raw_bytes = os.path.getsize(raw_path)
+        index = _INDEX.pack(_INDEX_VERSION, first, last, records, raw_bytes)
+        # Named by start time, so names sort chronologically
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.localtime(first)) + '.%06d' % (int(first * 1e6) % 1000000)
+        pid = os.path.basename(raw_path).split('-')[1]
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{stamp}-{pid}{CODEC_EXTENSIONS[self.codec]}")
+        tmp_path = path + '.tmp'
+        with open(raw_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            if self.codec == 'zstd':
+                _write_zstd(src, dst, index)
+            else:
+                _write_gzip(src, dst, index, last)
+        os.replace(tmp_path, path)
+        os.remove(raw_path)
+
+    def enforce_retention(self):
+        if self.max_bytes <= 0:
+            return
+        segments = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(SEGMENT_PREFIX) and entry.name.endswith(tuple(CODEC_EXTENSIONS.values())):
+                segments.append((entry.name, entry.stat().st_size))
+        segments.sort()  # Names start with the segment's start time
+        total = sum(size for _, size in segments)
+        for name, size in segments[:-1]:  # Always keep the newest
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass  # Removed by another worker
+            total -= size
+
+    def stop(self):
+        """
+        Compress everything queued, then stop the thread.
+        """
+        self.queue.put(_SENTINEL)
+        self.join()
+
+
+class ArchiveHandler(logging.Handler):
+    """
+    Log handler writing a compressed, rotated, indexed archive.
+
+    Records are appended to a raw segment by the log writer thread. When
+    the segment reaches `segment_bytes` or spans `segment_seconds`, it is
+    closed and queued to a SegmentCompressor, so neither the connection
+    threads nor the log writer ever compress. Every segment's index
+    records its time range and record count (see read_segment_index).
+
+    Each process writes its own segments: a forked worker notices the new
+    PID on its first record and starts its own segment and compressor.
+    Raw segments left behind by a crash are archived on the next start,
+    with an unknown record count.
+    """
+    def __init__(self, directory: str, codec: str = 'auto', segment_bytes: int = 64 * 1024 * 1024,
+                 segment_seconds: float = 3600, max_bytes: int = 0):
+        super().__init__()
+        self.directory = directory
+        self.codec = resolve_codec(codec)
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.max_bytes = max_bytes
+        self.pid = None
+        self.compressor = None
+        self.stream = None
+        self.closed = False
+        os.makedirs(directory, exist_ok=True)
+
+    def _start_process(self):
+        recover = self.pid is None  # The first process; workers inherit its segments' owner
+        self.pid = os.getpid()
+        self.stream = None  # An inherited segment belongs to the parent
+        self.compressor = SegmentCompressor(self.directory, self.codec, self.max_bytes)
+        self.compressor.start()
+        if recover:
+            for entry in os.scandir(self.directory):
+                if entry.name.startswith('.raw-') and entry.name.endswith('.log'):
+                    # Raw segments are named .raw-<pid>-<first record time in microseconds>.log
+                    first = int(entry.name[:-4].split('-')[2]) / 1e6
+                    self.compressor.queue.put((entry.path, first, entry.stat().st_mtime, 0))
+
+    def _open_segment(self, created: float):
+        self.path = os.path.join(self.directory, f".raw-{self.pid}-{int(created * 1e6)}.log")
+        self.stream = open(self.path, 'ab')
+        self.first = created
+        self.last = created
+        self.records = 0
+        self.size = 0
+
+    def _rollover(self):
+        self.stream.close()
+        self.stream = None
+        self.compressor.queue.put((self.path, self.first, self.last, self.records))
+
+    def emit(self, record: logging.LogRecord):
+        if self.closed:
+            return
+        try:
+            if self.pid != os.getpid():
+                self._start_process()
+            data = (self.format(record) + '\n').encode('utf-8', 'replace')
+            if self.stream is not None and (self.size + len(data) > self.segment_bytes
+                                            or record.created - self.first >= self.segment_seconds):
+                self._rollover()
+            if self.stream is None:
+                self._open_segment(record.created)
+            self.stream.write(data)
+            self.size += len(data)
+            self.records += 1
+            self.last = max(self.last, record.created)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        if self.stream is not None and self.pid == os.getpid():
+            self.stream.flush()
+
+    def close(self):
+        """
+        Archive the open segment and wait for the compressor to finish.
+        """
+        if not self.closed and self.pid == os.getpid():
+            if self.stream is not None:
+                self._rollover()
+            self.compressor.stop()
+        self.closed = True
+        super().close()
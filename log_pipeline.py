@@ -0,0 +1,115 @@
+import logging
+import logging.handlers
+import queue
+import threading
+
+from stats import ShardedCounters
+
+
+_SENTINEL = None
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller.
+
+    Records are put on a bounded queue without formatting; when the queue
+    is full the record is dropped and counted instead of stalling the
+    connection thread. Drops are counted per thread, so concurrent
+    callers never lose a count.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.drops = ShardedCounters(1)
+
+    @property
+    def dropped(self) -> int:
+        return int(self.drops.total(0))
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the writer thread; records never leave the process
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.drops.add(0)
+
+
+class BatchingQueueListener(threading.Thread):
+    """
+    Writer thread that drains the log queue into the real handlers in batches.
+
+    Up to `batch_size` queued records are formatted together and written
+    to each stream handler with a single write() and flush(), including
+    size-based rotation for RotatingFileHandler. Other handler types get
+    the records one by one and a flush() per batch.
+    """
+    def __init__(self, log_queue: queue.Queue, handlers: list, batch_size: int = 256):
+        super().__init__(name="deadlockssh-log-writer")
+        self.queue = log_queue
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.daemon = True
+
+    def run(self):
+        while True:
+            record = self.queue.get()
+            if record is _SENTINEL:
+                break
+
+            batch = [record]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is _SENTINEL:
+                    stop = True
+                    break
+                batch.append(record)
+
+            self._write_batch(batch)
+            if stop:
+                break
+
+    def _write_batch(self, batch: list):
+        for handler in self.handlers:
+            records = [r for r in batch if r.levelno >= handler.level]
+            if not records:
+                continue
+            try:
+                if isinstance(handler, logging.StreamHandler):
+                    self._write_stream(handler, records)
+                else:
+                    for record in records:
+                        handler.handle(record)
+                    handler.flush()
+            except Exception:
+                handler.handleError(records[-1])
+
+    def _write_stream(self, handler: logging.StreamHandler, records: list):
+        text = ''.join(handler.format(record) + handler.terminator for record in records)
+        handler.acquire()
+        try:
+            if isinstance(handler, logging.handlers.RotatingFileHandler) and handler.maxBytes > 0:
+                if handler.stream is None:
+                    handler.stream = handler._open()
+                handler.stream.seek(0, 2)
+                if handler.stream.tell() + len(text) >= handler.maxBytes:
+                    handler.doRollover()
+            elif isinstance(handler, logging.FileHandler) and handler.stream is None:
+                handler.stream = handler._open()
+            handler.stream.write(text)
+            handler.flush()
+        finally:
+            handler.release()
+
+    def stop(self):
+        """
+        Write everything still queued, then stop the thread.
+        """
+        self.queue.put(_SENTINEL)
+        self.join()
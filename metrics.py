@@ -0,0 +1,169 @@
+import bisect
+from typing import Dict, List, Optional, Sequence
+
+from stats import ShardedCounters
+
+
+class _Metric:
+    """
+    Base class for metrics rendered in the Prometheus text exposition format.
+
+    Values are kept in per-thread shards, so updates never take a lock.
+    """
+    type_name = 'untyped'
+
+    def __init__(self, name: str, help_text: str, size: int = 1):
+        self.name = name
+        self.help_text = help_text
+        self.counters = ShardedCounters(size)
+
+    def value(self):
+        """
+        Return the current value in a JSON-ready form that merges by summing.
+        """
+        return self.counters.total(0)
+
+    def render(self, value) -> List[str]:
+        return [f"{self.name} {_format(value)}"]
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count.
+    """
+    type_name = 'counter'
+
+    def inc(self, amount: float = 1):
+        self.counters.add(0, amount)
+
+
+class LabeledCounter(_Metric):
+    """
+    Counter split by one label with a fixed set of values.
+    """
+    type_name = 'counter'
+
+    def __init__(self, name: str, help_text: str, label: str, label_values: Sequence[str]):
+        self.label = label
+        self.label_values = tuple(label_values)
+        self.index = {value: i for i, value in enumerate(self.label_values)}
+        super().__init__(name, help_text, size=len(self.label_values))
+
+    def inc(self, label_value: str, amount: float = 1):
+        self.counters.add(self.index[label_value], amount)
+
+    def value(self):
+        return dict(zip(self.label_values, self.counters.totals()))
+
+    def render(self, value) -> List[str]:
+        return [
+            f'{self.name}{{{self.label}="{label_value}"}} {_format(value.get(label_value, 0))}'
+            for label_value in self.label_values
+        ]
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down.
+    """
+    type_name = 'gauge'
+
+    def inc(self, amount: float = 1):
+        self.counters.add(0, amount)
+
+    def dec(self, amount: float = 1):
+        self.counters.add(0, -amount)
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observations over fixed upper bounds.
+
+    Each observation increments one bucket; the cumulative counts
+    Prometheus expects are only computed when rendering.
+    """
+    type_name = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.bounds = sorted(buckets)
+        # One slot per bound, one for +Inf, and the running sum last
+        super().__init__(name, help_text, size=len(self.bounds) + 2)
+
+    def observe(self, amount: float):
+        shard = self.counters.shard()
+        shard[bisect.bisect_left(self.bounds, amount)] += 1
+        shard[-1] += amount
+
+    def value(self):
+        totals = self.counters.totals()
+        return {'buckets': totals[:-1], 'sum': totals[-1]}
+
+    def render(self, value) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + [float('inf')], value['buckets']):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _format(bound)
+            lines.append(f'{self.name}_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format(value['sum'])}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+def _format(value: float) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+class MetricsRegistry:
+    """
+    Set of metrics exposed together on /metrics.
+    """
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def labeled_counter(self, name: str, help_text: str, label: str,
+                        label_values: Sequence[str]) -> LabeledCounter:
+        return self._register(LabeledCounter(name, help_text, label, label_values))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float]) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def values(self) -> dict:
+        """
+        Return every metric's current value, keyed by metric name.
+        """
+        return {name: metric.value() for name, metric in self.metrics.items()}
+
+    def render(self, values: Optional[dict] = None) -> str:
+        """
+        Render metrics in the Prometheus text exposition format.
+
+        Args:
+            values: Values to render, e.g. merged from several workers
+                (defaults to this registry's own values)
+
+        Returns:
+            Exposition text
+        """
+        if values is None:
+            values = self.values()
+        lines = []
+        for name, metric in self.metrics.items():
+            if name not in values:
+                continue
+            lines.append(f"# HELP {name} {metric.help_text}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+            lines.extend(metric.render(values[name]))
+        return '\n'.join(lines) + '\n'
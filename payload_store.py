@@ -0,0 +1,145 @@
+import collections
+import hashlib
+import os
+import threading
+from typing import Tuple
+
+
+class PayloadStore(threading.Thread):
+    """
+    Content-addressed store of captured client payloads.
+
+    Each payload is named by its BLAKE2b digest and written once to
+    `directory/<first two hex digits>/<digest>`, so the log only needs to
+    carry the digest. An LRU of recently seen digests answers repeats
+    without touching the disk. put() only hashes the payload and queues
+    new ones; a background thread does every stat() and write, so
+    callers on an event loop never block on the disk. Payloads beyond
+    `max_pending` are dropped and counted. Blobs are
+    written to a temporary name and renamed into place, so worker
+    processes sharing the directory never see a partial blob and racing
+    writers of the same payload are harmless.
+    """
+    def __init__(self, directory: str, cache_size: int = 10000, max_pending: int = 10000,
+                 logger=None):
+        super().__init__(name="deadlockssh-payload-writer")
+        self.directory = directory
+        self.cache_size = cache_size
+        self.max_pending = max_pending
+        self.logger = logger
+        self.recent = collections.OrderedDict()  # digest -> None, least recent first
+        self.lock = threading.Lock()
+        self.pending = collections.deque()
+        self.wakeup = threading.Event()
+        self.running = False
+        self.stored = 0  # Counters are updated under the lock
+        self.duplicates = 0
+        self.duplicate_bytes = 0
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+        self.daemon = True
+
+    @staticmethod
+    def digest(data) -> str:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def put(self, data) -> Tuple[str, bool]:
+        """
+        Queue a payload for storing unless it was seen recently.
+
+        Args:
+            data: Payload bytes (bytes or memoryview)
+
+        Returns:
+            Tuple of (hex digest, True unless the digest was seen recently)
+        """
+        digest = self.digest(data)
+        with self.lock:
+            if digest in self.recent:
+                self.recent.move_to_end(digest)
+                self.duplicates += 1
+                self.duplicate_bytes += len(data)
+                return digest, False
+            if len(self.pending) >= self.max_pending:
+                self.dropped += 1
+                return digest, True  # Not remembered, so the next sighting tries again
+            self.recent[digest] = None
+            if len(self.recent) > self.cache_size:
+                self.recent.popitem(last=False)
+
+        self.pending.append((digest, bytes(data)))
+        self.wakeup.set()
+        return digest, True
+
+    def run(self):
+        self.running = True
+        while self.running:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """
+        Write every queued payload that is not on disk yet.
+        """
+        while self.pending:
+            digest, data = self.pending.popleft()
+            try:
+                new = self._write(digest, data)
+            except OSError as e:
+                if self.logger:
+                    self.logger.warning(f"Could not store payload {digest}: {e}")
+                continue
+            with self.lock:
+                if new:
+                    self.stored += 1
+                else:
+                    self.duplicates += 1
+                    self.duplicate_bytes += len(data)
+
+    def _write(self, digest: str, data: bytes) -> bool:
+        path = self.path(digest)
+        if os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return True
+
+    def get(self, digest: str) -> bytes:
+        """
+        Read a stored payload back.
+
+        Args:
+            digest: Hex digest returned by put()
+
+        Returns:
+            Payload bytes
+        """
+        with open(self.path(digest), 'rb') as f:
+            return f.read()
+
+    def stats(self) -> dict:
+        return {
+            'stored': self.stored,
+            'duplicates': self.duplicates,
+            'duplicate_bytes': self.duplicate_bytes,
+            'dropped': self.dropped
+        }
+
+    def stop(self):
+        """
+        Write all queued payloads and stop the writer thread.
+        """
+        self.running = False
+        self.wakeup.set()
+        if self.is_alive():
+            self.join()
+        else:
+            self.flush()
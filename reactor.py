@@ -0,0 +1,370 @@
+import select
+import selectors
+import socket
+import time
+
+from async_engine import raise_nofile_limit
+from tarpit import endless_line
+from timer_wheel import TimerWheel
+from zero_window import shrink_receive_buffer
+
+
+# Per-connection states, in the order a client moves through them
+DELAY = 'delay'
+BANNER = 'banner'
+ENDLESS = 'endless'
+MONITOR = 'monitor'
+
+
+class _EpollPoller:
+    """
+    Edge-triggered epoll set.
+
+    Each readiness change is reported once, so reads must drain a socket
+    until EAGAIN, and sockets that are not being read raise no further
+    events however much data they hold.
+    """
+    edge_triggered = True
+
+    def __init__(self):
+        self.epoll = select.epoll()
+        self.registered = set()
+
+    def watch(self, fd: int, read: bool, write: bool):
+        mask = select.EPOLLET | (select.EPOLLIN if read else 0) | (select.EPOLLOUT if write else 0)
+        if fd in self.registered:
+            self.epoll.modify(fd, mask)
+        else:
+            self.epoll.register(fd, mask)
+            self.registered.add(fd)
+
+    def forget(self, fd: int):
+        if fd in self.registered:
+            self.registered.discard(fd)
+            try:
+                self.epoll.unregister(fd)
+            except OSError:
+                pass
+
+    def poll(self, timeout: float):
+        """
+        Yield (fd, readable, writable, failed) for each ready descriptor.
+        """
+        for fd, events in self.epoll.poll(timeout):
+            yield (fd, bool(events & select.EPOLLIN), bool(events & select.EPOLLOUT),
+                   bool(events & (select.EPOLLHUP | select.EPOLLERR)))
+
+    def close(self):
+        self.epoll.close()
+
+
+class _SelectorPoller:
+    """
+    Level-triggered fallback for platforms without epoll.
+
+    A socket only asks for reads once it is being read, so pending data
+    from a client still in its delay or banner cannot spin the loop.
+    """
+    edge_triggered = False
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+
+    def watch(self, fd: int, read: bool, write: bool):
+        mask = (selectors.EVENT_READ if read else 0) | (selectors.EVENT_WRITE if write else 0)
+        registered = fd in self.selector.get_map()
+        if not mask:
+            if registered:
+                self.selector.unregister(fd)
+        elif registered:
+            self.selector.modify(fd, mask)
+        else:
+            self.selector.register(fd, mask)
+
+    def forget(self, fd: int):
+        if fd in self.selector.get_map():
+            self.selector.unregister(fd)
+
+    def poll(self, timeout: float):
+        for key, events in self.selector.select(timeout):
+            yield (key.fd, bool(events & selectors.EVENT_READ), bool(events & selectors.EVENT_WRITE), False)
+
+    def close(self):
+        self.selector.close()
+
+
+class _Connection:
+    """
+    One client's progress through delay, banner and monitoring.
+    """
+    __slots__ = ('client_socket', 'client_address', 'fd', 'state', 'data', 'pos',
+                 'timer', 'want_write', 'capture')
+
+    def __init__(self, client_socket: socket.socket, client_address: tuple):
+        self.client_socket = client_socket
+        self.client_address = client_address
+        self.fd = client_socket.fileno()
+        self.state = DELAY
+        self.data = b''  # Bytes being sent in the BANNER or ENDLESS state
+        self.pos = 0
+        self.timer = None
+        self.want_write = False  # Waiting for the send buffer to drain
+        self.capture = None
+
+
+class ReactorEngine:
+    """
+    Single-threaded reactor engine for DeadlockSSH.
+
+    Runs the threaded engine's per-client sequence (adaptive delay, slow
+    banner, then monitoring) as explicit states driven by one epoll loop,
+    with every delay and per-byte timer on a TimerWheel. Sockets are
+    non-blocking and registered edge-triggered, so a ready socket is
+    drained until EAGAIN and an idle one costs nothing per loop. Where
+    epoll is missing it falls back to selectors.DefaultSelector.
+    Statistics, admission and the zero-window parker are shared with the
+    other engines through the honeypot's helpers.
+    """
+    def __init__(self, honeypot, tick: float = 0.01):
+        self.honeypot = honeypot
+        self.config = honeypot.config
+        self.logger = honeypot.logger
+        self.wheel = TimerWheel(tick=tick)
+        self.poller = None
+        self.server_socket = None
+        self.connections = {}  # fd -> _Connection
+        self.banner = (self.config['ssh_banner'] + '\r\n').encode('utf-8')
+        self.endless = self.config['tarpit_mode'] == 'endless'
+        self.running = False
+
+    def run(self):
+        """
+        Serve clients on the calling thread until stop() is called.
+        """
+        raise_nofile_limit(self.logger)
+        self.poller = _EpollPoller() if hasattr(select, 'epoll') else _SelectorPoller()
+        self.server_socket = self._listen()
+        self.honeypot.server_socket = self.server_socket
+        listen_fd = self.server_socket.fileno()
+        self.poller.watch(listen_fd, read=True, write=False)
+
+        kind = 'epoll' if self.poller.edge_triggered else 'selectors'
+        self.logger.info(f"DeadlockSSH listening on port {self.config['port']} (reactor engine, {kind})")
+
+        self.running = True
+        if self.config['overflow_policy'] == 'tarpit':
+            self._expire_overflow()
+        tick = self.wheel.tick
+        try:
+            while self.running and self.honeypot.running:
+                for fd, readable, writable, failed in self.poller.poll(tick):
+                    if fd == listen_fd:
+                        self._accept()
+                        continue
+                    conn = self.connections.get(fd)
+                    if conn is None:
+                        continue
+                    try:
+                        self._on_ready(conn, readable, writable, failed)
+                    except Exception as e:
+                        self.logger.error(f"Error handling client {conn.client_address[0]}: {e}")
+                        self._close(conn)
+                self.wheel.advance(time.monotonic())
+        finally:
+            for conn in list(self.connections.values()):
+                self._close(conn)
+            self.poller.forget(listen_fd)
+            self.poller.close()
+
+    def stop(self):
+        """
+        Ask the loop to stop; it exits within one tick. Safe from any thread.
+        """
+        self.running = False
+
+    def _listen(self) -> socket.socket:
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.honeypot.reuse_port:
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if self.config['tcp_keepalive']:
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if self.honeypot.zero_window:
+            # Accepted sockets inherit a minimal receive window
+            shrink_receive_buffer(server_socket)
+        server_socket.bind(('0.0.0.0', self.config['port']))
+        server_socket.listen(self.config['max_connections'])
+        server_socket.setblocking(False)
+        return server_socket
+
+    def _accept(self):
+        # One edge can stand for many queued connections
+        while True:
+            try:
+                client_socket, client_address = self.server_socket.accept()
+                accepted = time.monotonic()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                if self.running:
+                    self.logger.error(f"Socket error: {e}")
+                return
+
+            reason = self.honeypot.admission.admit(client_address[0])
+            if reason:
+                self.honeypot.shed_connection(client_socket, client_address, reason)
+                continue
+
+            try:
+                client_socket.setblocking(False)
+                if self.config['tcp_keepalive']:
+                    client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            except OSError as e:
+                self.logger.error(f"Error handling client {client_address[0]}: {e}")
+                client_socket.close()
+                self.honeypot.admission.release(client_address[0])
+                continue
+
+            conn = _Connection(client_socket, client_address)
+            self.connections[conn.fd] = conn
+            current_delay = self.honeypot.register_connection(client_address[0], client_address[1], accepted)
+            self._watch(conn)
+            self._schedule(current_delay, self._delay_done, conn)
+
+    def _expire_overflow(self):
+        # Shed connections are closed on time even when no new ones arrive
+        self.honeypot.overflow_tarpit.expire()
+        self.wheel.schedule(self.honeypot.overflow_tarpit.expiry_interval, self._expire_overflow)
+
+    def _watch(self, conn: _Connection):
+        # Edge-triggered sockets can always ask for reads: unread data
+        # raises one event, not one per loop
+        read = conn.state == MONITOR or self.poller.edge_triggered
+        self.poller.watch(conn.fd, read, conn.want_write)
+
+    def _schedule(self, delay: float, callback, conn: _Connection):
+        conn.timer = self.wheel.schedule(delay, self._fire, callback, conn)
+
+    def _fire(self, callback, conn: _Connection):
+        # A failing callback must not cost the rest of the tick's timers
+        try:
+            callback(conn)
+        except Exception as e:
+            self.logger.error(f"Error handling client {conn.client_address[0]}: {e}")
+            self._close(conn)
+
+    def _on_ready(self, conn: _Connection, readable: bool, writable: bool, failed: bool):
+        if conn.state == MONITOR:
+            if readable or failed:
+                self._drain(conn)
+            return
+        if failed:
+            self._close(conn)
+        elif writable and conn.want_write:
+            conn.want_write = False
+            self._watch(conn)
+            self._send(conn)
+        # Data from a client still in its delay or banner waits in the
+        # kernel until monitoring starts, as in the threaded engine
+
+    def _delay_done(self, conn: _Connection):
+        self.honeypot.banner_started(conn.client_address)
+        if self.endless:
+            conn.state = ENDLESS
+            conn.data = endless_line(self.config['endless_line_length'])
+        else:
+            conn.state = BANNER
+            conn.data = self.banner
+        conn.pos = 0
+        self._send(conn)
+
+    def _send(self, conn: _Connection):
+        if self.connections.get(conn.fd) is not conn:
+            return  # Closed while its timer was pending
+        # Endless lines go out in one tiny write; the banner a byte at a time
+        end = len(conn.data) if conn.state == ENDLESS else conn.pos + 1
+        try:
+            sent = conn.client_socket.send(conn.data[conn.pos:end])
+        except (BlockingIOError, InterruptedError):
+            # Send buffer full: resume when the socket turns writable
+            conn.want_write = True
+            self._watch(conn)
+            return
+        except OSError:
+            self._close(conn)
+            return
+
+        conn.pos += sent
+        self.honeypot.record_bytes_sent(conn.client_address, sent)
+
+        if conn.pos < len(conn.data):
+            delay = self.config['banner_delay'] if conn.state == BANNER else 0
+            self._schedule(delay, self._send, conn)
+        elif conn.state == ENDLESS:
+            conn.data = endless_line(self.config['endless_line_length'])
+            conn.pos = 0
+            self._schedule(self.config['endless_interval'], self._send, conn)
+        else:
+            # The threaded engine sleeps once more after the last byte
+            self._schedule(self.config['banner_delay'], self._start_monitor, conn)
+
+    def _start_monitor(self, conn: _Connection):
+        if self.connections.get(conn.fd) is not conn:
+            return
+        self.honeypot.banner_complete(conn.client_address)
+        conn.state = MONITOR
+        conn.data = b''
+        conn.timer = None
+        conn.capture = self.honeypot.new_capture()
+        self._watch(conn)
+        # Anything sent during the delay or banner raised its edge long ago
+        self._drain(conn)
+
+    def _drain(self, conn: _Connection):
+        capture = conn.capture
+        limit = self.config['zero_window_capture_bytes'] if self.honeypot.zero_window else None
+        while True:
+            try:
+                if limit is None:
+                    data = capture.recv_into(conn.client_socket)
+                else:
+                    data = capture.recv_into(conn.client_socket, min(1024, limit - capture.total))
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                self._close(conn)
+                return
+            if not data:
+                self._close(conn)
+                return
+
+            self.honeypot.log_received_data(conn.client_address, capture, data)
+            if limit is not None and capture.total >= limit:
+                self._park(conn)
+                return
+
+    def _park(self, conn: _Connection):
+        # The zero-window parker owns the socket and its release from here on
+        self._forget(conn)
+        self.honeypot.end_capture(conn.client_address, conn.capture)
+        self.honeypot.park_zero_window(conn.client_socket, conn.client_address)
+
+    def _forget(self, conn: _Connection) -> bool:
+        if self.connections.get(conn.fd) is not conn:
+            return False
+        del self.connections[conn.fd]
+        if conn.timer:
+            conn.timer.cancel()
+        self.poller.forget(conn.fd)
+        return True
+
+    def _close(self, conn: _Connection):
+        if not self._forget(conn):
+            return
+        try:
+            conn.client_socket.close()
+        except OSError:
+            pass
+        if conn.capture is not None:
+            self.honeypot.end_capture(conn.client_address, conn.capture)
+        self.honeypot.release_connection(conn.client_address[0], conn.client_address[1])
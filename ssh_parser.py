@@ -0,0 +1,259 @@
+import hashlib
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from heavy_hitters import ShardedSpaceSaving
+
+
+SSH_MSG_KEXINIT = 20
+
+# RFC 4253 section 4.2: the identification line is at most 255 bytes with CRLF
+MAX_IDENT_LENGTH = 255
+
+# RFC 4253 section 6.1: packets up to 35000 bytes must be accepted
+MAX_PACKET_LENGTH = 35000
+
+# KEXINIT name-lists, in protocol order (RFC 4253 section 7.1)
+KEXINIT_FIELDS = (
+    'kex_algorithms', 'server_host_key_algorithms',
+    'encryption_client_to_server', 'encryption_server_to_client',
+    'mac_client_to_server', 'mac_server_to_client',
+    'compression_client_to_server', 'compression_server_to_client',
+    'languages_client_to_server', 'languages_server_to_client'
+)
+
+_UINT32 = struct.Struct('>I')
+_PACKET_HEADER = struct.Struct('>IB')
+
+# Parser states
+_IDENT = 0
+_PACKET = 1
+_DONE = 2
+_FAILED = 3
+
+
+def hassh(kexinit: Dict[str, str]) -> Tuple[str, str]:
+    """
+    Compute the HASSH fingerprint of a client KEXINIT.
+
+    HASSH is the MD5 of the client-to-server key exchange, encryption,
+    MAC and compression lists joined with ';'.
+
+    Args:
+        kexinit: Name-lists keyed by KEXINIT_FIELDS
+
+    Returns:
+        Tuple of (hex fingerprint, the string it was computed from)
+    """
+    algorithms = ';'.join((
+        kexinit['kex_algorithms'],
+        kexinit['encryption_client_to_server'],
+        kexinit['mac_client_to_server'],
+        kexinit['compression_client_to_server']
+    ))
+    return hashlib.md5(algorithms.encode('ascii', 'replace'), usedforsecurity=False).hexdigest(), algorithms
+
+
+def parse_kexinit(payload: memoryview) -> Optional[Dict[str, str]]:
+    """
+    Parse the name-lists of an SSH_MSG_KEXINIT payload.
+
+    Args:
+        payload: Packet payload, starting with the message number
+
+    Returns:
+        Name-lists keyed by KEXINIT_FIELDS, or None if malformed
+    """
+    if len(payload) < 17 or payload[0] != SSH_MSG_KEXINIT:
+        return None
+    offset = 17  # Message number and 16-byte cookie
+    lists = {}
+    for field in KEXINIT_FIELDS:
+        if offset + 4 > len(payload):
+            return None
+        length = _UINT32.unpack_from(payload, offset)[0]
+        offset += 4
+        if offset + length > len(payload):
+            return None
+        lists[field] = str(payload[offset:offset + length], 'ascii', 'replace')
+        offset += length
+    return lists
+
+
+class SSHClientParser:
+    """
+    Incremental parser for the start of a client's SSH session.
+
+    Fed each chunk as it is received, it reads the client identification
+    line and then the first binary packet, which must be the client's
+    KEXINIT. Complete lines and packets are parsed straight from the
+    received memoryview; only one spanning several chunks is copied into a
+    small pending buffer. Anything that is not SSH, and every byte after
+    the KEXINIT, is ignored. The KEXINIT's position in the stream is kept
+    so captures can be normalised by zeroing its random cookie.
+    """
+    __slots__ = ('state', 'pending', 'received', 'client_version', 'kexinit', 'kexinit_offset',
+                 'kexinit_length', 'hassh', 'hassh_algorithms')
+
+    def __init__(self):
+        self.state = _IDENT
+        self.pending = None  # bytearray holding a partial line or packet
+        self.received = 0  # Bytes fed so far
+        self.client_version: Optional[str] = None
+        self.kexinit: Optional[Dict[str, str]] = None
+        self.kexinit_offset: Optional[int] = None  # Stream offset of the KEXINIT packet
+        self.kexinit_length = 0  # Packet length, including the length field
+        self.hassh: Optional[str] = None
+        self.hassh_algorithms: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.state >= _DONE
+
+    def feed(self, data) -> List[str]:
+        """
+        Parse the next received chunk.
+
+        Args:
+            data: Newly received bytes (bytes or memoryview)
+
+        Returns:
+            What this chunk completed: 'version' and/or 'kexinit'
+        """
+        completed = []
+        view = memoryview(data)
+        self.received += len(view)
+        while view and self.state < _DONE:
+            if self.state == _IDENT:
+                view = self._feed_ident(view, completed)
+            else:
+                view = self._feed_packet(view, completed)
+        if self.state == _DONE and self.kexinit_offset is None:
+            self.kexinit_offset = self.received - len(view) - self.kexinit_length
+        return completed
+
+    @property
+    def cookie_range(self) -> Optional[Tuple[int, int]]:
+        """
+        Stream offsets (start, end) of the KEXINIT's 16-byte random cookie, once parsed.
+        """
+        if self.kexinit_offset is None:
+            return None
+        start = self.kexinit_offset + _PACKET_HEADER.size + 1  # After the header and message number
+        return start, start + 16
+
+    def _stash(self, view: memoryview, limit: int) -> bool:
+        # Keep a partial line or packet for the next chunk
+        if self.pending is None:
+            self.pending = bytearray()
+        if len(self.pending) + len(view) > limit:
+            self._fail()
+            return False
+        self.pending += view
+        return True
+
+    def _fail(self):
+        self.state = _FAILED
+        self.pending = None
+
+    def _feed_ident(self, view: memoryview, completed: list) -> memoryview:
+        held = len(self.pending) if self.pending else 0
+        window = bytes(view[:MAX_IDENT_LENGTH - held])  # At most 255 bytes copied to search
+        end = window.find(b'\n')
+        if end < 0:
+            self._stash(view, MAX_IDENT_LENGTH)
+            return view[len(view):]
+
+        line = (bytes(self.pending) + window[:end]) if held else window[:end]
+        self.pending = None
+        if not line.startswith(b'SSH-'):
+            self._fail()  # Not an SSH client
+            return view[len(view):]
+        self.client_version = line.rstrip(b'\r').decode('ascii', 'replace')
+        self.state = _PACKET
+        completed.append('version')
+        return view[end + 1:]
+
+    def _feed_packet(self, view: memoryview, completed: list) -> memoryview:
+        if self.pending:
+            # Finish the packet in the pending buffer first
+            needed = self._packet_size(self.pending) if len(self.pending) >= 4 else 4
+            if needed is None:
+                return view[len(view):]
+            take = min(len(view), needed - len(self.pending))
+            self.pending += view[:take]
+            view = view[take:]
+            if len(self.pending) == 4:
+                return view  # Length known now; loop round for the body
+            if len(self.pending) == needed:
+                packet, self.pending = memoryview(self.pending), None
+                self._parse_packet(packet, completed)
+            return view
+
+        size = self._packet_size(view) if len(view) >= 4 else 4
+        if size is None:
+            return view[len(view):]
+        if len(view) < size:
+            self._stash(view, MAX_PACKET_LENGTH + 4)
+            return view[len(view):]
+        self._parse_packet(view[:size], completed)
+        return view[size:]
+
+    def _packet_size(self, buffer) -> Optional[int]:
+        length = _UINT32.unpack_from(buffer, 0)[0]
+        if not 5 <= length <= MAX_PACKET_LENGTH:
+            self._fail()
+            return None
+        return 4 + length
+
+    def _parse_packet(self, packet: memoryview, completed: list):
+        length, padding = _PACKET_HEADER.unpack_from(packet, 0)
+        lists = parse_kexinit(packet[5:4 + length - padding]) if padding < length else None
+        if lists is None:
+            self._fail()
+            return
+        self.kexinit = lists
+        self.kexinit_length = len(packet)
+        self.hassh, self.hassh_algorithms = hassh(lists)
+        self.state = _DONE
+        completed.append('kexinit')
+
+
+class ClientFingerprints:
+    """
+    Live counts of client versions and HASSH fingerprints.
+
+    Both are Space-Saving sketches, so memory stays bounded however many
+    distinct clients show up. The algorithm string behind each fingerprint
+    is kept for fingerprints the sketch may still report.
+    """
+    def __init__(self, capacity: int = 1000, shards: int = 16):
+        self.capacity = capacity
+        self.versions = ShardedSpaceSaving(capacity, shards)
+        self.fingerprints = ShardedSpaceSaving(capacity, shards)
+        self.algorithms: Dict[str, str] = {}  # hassh -> algorithm string
+        self.algorithms_lock = threading.Lock()  # Guards trimming and inserting
+
+    def add_version(self, version: str):
+        self.versions.add(version)
+
+    def add_fingerprint(self, fingerprint: str, algorithms: str):
+        self.fingerprints.add(fingerprint)
+        if fingerprint in self.algorithms:
+            return  # Known fingerprints, the common case, take no lock
+        with self.algorithms_lock:
+            if len(self.algorithms) >= 2 * self.capacity:
+                # Forget strings of fingerprints the sketch no longer monitors
+                monitored = {item for item, _, _ in self.fingerprints.top(self.capacity)}
+                self.algorithms = {h: a for h, a in self.algorithms.items() if h in monitored}
+            self.algorithms[fingerprint] = algorithms
+
+    def top_versions(self, k: int) -> List[Tuple[str, int, int]]:
+        return self.versions.top(k)
+
+    def top_fingerprints(self, k: int) -> List[Tuple[str, int, int, Optional[str]]]:
+        return [
+            (fingerprint, count, error, self.algorithms.get(fingerprint))
+            for fingerprint, count, error in self.fingerprints.top(k)
+        ]
@@ -0,0 +1,62 @@
+import threading
+from typing import List
+
+
+class ShardedCounters:
+    """
+    A fixed set of counters split into per-thread shards.
+
+    Each thread adds to its own shard, so an increment is a plain list
+    update with no lock and no contention between connection threads.
+    Reads sum every shard, which keeps totals exact. Shards of finished
+    threads can no longer change, so they are folded into a retired
+    total, keeping the shard set about as large as the set of live
+    threads.
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self.local = threading.local()
+        self.shards = {}  # id(shard) -> (owning thread, shard)
+        self.retired = [0] * size
+        self.fold_threshold = 64
+        self.read_lock = threading.Lock()  # Serializes readers only
+
+    def shard(self) -> list:
+        """
+        Return the calling thread's shard, creating it on first use.
+        """
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = [0] * self.size
+            self.shards[id(shard)] = (threading.current_thread(), shard)
+            if len(self.shards) > self.fold_threshold:
+                # Once per new thread, never per increment
+                self.totals()
+            return shard
+
+    def add(self, index: int, amount: float = 1):
+        """
+        Add to one counter in the calling thread's shard.
+        """
+        self.shard()[index] += amount
+
+    def totals(self) -> List[float]:
+        """
+        Return the exact sum of every counter across all shards.
+        """
+        with self.read_lock:
+            totals = list(self.retired)
+            for key, (thread, shard) in list(self.shards.items()):
+                finished = not thread.is_alive()
+                for index, value in enumerate(shard):
+                    totals[index] += value
+                    if finished:
+                        self.retired[index] += value
+                if finished:
+                    del self.shards[key]
+            self.fold_threshold = 2 * len(self.shards) + 64
+            return totals
+
+    def total(self, index: int) -> float:
+        return self.totals()[index]
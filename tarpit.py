@@ -0,0 +1,27 @@
+import random
+
+
+# Printable ASCII without space, so lines never look empty
+_LINE_ALPHABET = bytes(range(0x21, 0x7f))
+
+
+def endless_line(max_length: int = 32) -> bytes:
+    """
+    Build a random line to send before the SSH identification string.
+
+    RFC 4253 section 4.2 lets a server send other lines of data before
+    its version string, as long as they do not start with "SSH-". Clients
+    are expected to keep reading until the version line arrives, so a
+    steady trickle of these lines holds them forever.
+
+    Args:
+        max_length: Maximum line length excluding CRLF (capped at 253)
+
+    Returns:
+        Random line terminated by CRLF
+    """
+    max_length = max(3, min(max_length, 253))
+    line = bytes(random.choices(_LINE_ALPHABET, k=random.randint(3, max_length)))
+    if line.startswith(b'SSH-'):
+        line = b'X' + line[1:]
+    return line + b'\r\n'
@@ -0,0 +1,78 @@
+import socket
+
+import pytest
+
+from capture_buffer import CaptureBuffer
+
+
+@pytest.fixture
+def sockets():
+    client, server = socket.socketpair()
+    yield client, server
+    client.close()
+    server.close()
+
+
+def test_contents_before_the_ring_fills():
+    capture = CaptureBuffer(8)
+    assert capture.contents() == b''
+    assert bytes(capture.feed(b'abc')) == b'abc'
+    capture.feed(b'de')
+    assert capture.contents() == b'abcde'
+    assert capture.total == 5
+
+
+def test_ring_keeps_the_latest_bytes_in_order():
+    capture = CaptureBuffer(8)
+    for chunk in (b'abcde', b'fghij', b'kl'):
+        capture.feed(chunk)
+    assert capture.contents() == b'efghijkl'
+    assert capture.total == 12
+
+
+def test_chunk_larger_than_the_ring():
+    capture = CaptureBuffer(4)
+    capture.feed(b'xy')
+    view = capture.feed(b'0123456789')
+    assert bytes(view) == b'0123456789'
+    assert capture.contents() == b'6789'
+    assert capture.total == 12
+
+
+def test_room_stops_at_the_end_of_the_ring():
+    capture = CaptureBuffer(10, holding=True)
+    assert capture.room() == 10
+    capture.feed(b'1234567')
+    assert capture.room() == 3
+    assert capture.room(2) == 2
+
+
+def test_recv_into_reads_straight_into_the_ring(sockets):
+    client, server = sockets
+    capture = CaptureBuffer(8)
+    client.sendall(b'SSH-2.0-')
+    assert bytes(capture.recv_into(server, 5)) == b'SSH-2'
+    assert bytes(capture.recv_into(server)) == b'.0-'
+    assert capture.room() == 8  # Full ring; the next read starts over at the front
+
+    client.sendall(b'xyz')
+    data = capture.recv_into(server)
+    assert bytes(data) == b'xyz'
+    assert capture.contents() == b'-2.0-xyz'
+    assert capture.total == 11
+
+
+def test_recv_into_while_holding_never_wraps(sockets):
+    client, server = sockets
+    capture = CaptureBuffer(6, holding=True)
+    client.sendall(b'abcdefgh')
+    assert bytes(capture.recv_into(server)) == b'abcdef'
+    assert capture.contents() == b'abcdef'  # Whole payload, still unwrapped
+
+
+def test_recv_into_on_eof(sockets):
+    client, server = sockets
+    capture = CaptureBuffer(8)
+    client.close()
+    assert bytes(capture.recv_into(server)) == b''
+    assert capture.total == 0
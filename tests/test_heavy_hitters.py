@@ -0,0 +1,66 @@
+import collections
+import random
+
+from heavy_hitters import ShardedSpaceSaving, SpaceSaving
+
+
+def zipf_stream(length, universe, seed=3):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, universe + 1)]
+    return rng.choices([f'10.0.{i // 256}.{i % 256}' for i in range(universe)], weights, k=length)
+
+
+def test_exact_while_under_capacity():
+    sketch = SpaceSaving(10)
+    for item in 'aaabbc':
+        sketch.add(item)
+    assert sketch.top(10) == [('a', 3, 0), ('b', 2, 0), ('c', 1, 0)]
+    assert sketch.top(2) == [('a', 3, 0), ('b', 2, 0)]
+
+
+def test_replaced_item_inherits_the_minimum_count():
+    sketch = SpaceSaving(2)
+    for item in 'aab':
+        sketch.add(item)
+    sketch.add('c')  # Replaces b, the only item with the minimum count
+    assert dict((item, (count, error)) for item, count, error in sketch.top(2)) == {'a': (2, 0), 'c': (2, 1)}
+
+
+def test_error_bounds_hold_on_a_skewed_stream():
+    capacity = 50
+    stream = zipf_stream(20000, 2000)
+    true_counts = collections.Counter(stream)
+    sketch = SpaceSaving(capacity)
+    for item in stream:
+        sketch.add(item)
+
+    top = sketch.top(capacity)
+    assert len(top) == capacity
+    assert sum(count for _, count, _ in top) == len(stream)
+    assert [count for _, count, _ in top] == sorted((count for _, count, _ in top), reverse=True)
+    bound = len(stream) / capacity
+    for item, count, error in top:
+        assert count - error <= true_counts[item] <= count
+        assert error <= bound
+
+    # Every item more frequent than N/capacity is guaranteed to be monitored
+    reported = {item for item, _, _ in top}
+    assert {item for item, count in true_counts.items() if count > bound} <= reported
+
+
+def test_sharded_sketch_keeps_the_bounds():
+    capacity, shards = 64, 4
+    stream = zipf_stream(20000, 2000, seed=5)
+    true_counts = collections.Counter(stream)
+    sketch = ShardedSpaceSaving(capacity, shards)
+    for item in stream:
+        sketch.add(item)
+
+    top = sketch.top(capacity)
+    assert [count for _, count, _ in top] == sorted((count for _, count, _ in top), reverse=True)
+    bound = len(stream) / (capacity // shards)
+    for item, count, error in top:
+        assert count - error <= true_counts[item] <= count
+        assert error <= bound
+    assert true_counts.most_common(1)[0][0] == top[0][0]
+    assert len(sketch) <= capacity
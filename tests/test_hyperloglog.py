@@ -0,0 +1,85 @@
+import pytest
+
+from hyperloglog import HyperLogLog, SlidingHyperLogLog, UniqueCounter, hash64
+
+
+def ips(start, count):
+    return [f'{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}.7' for i in range(start, start + count)]
+
+
+@pytest.mark.parametrize('distinct', [10, 1000, 50000])
+def test_estimate_is_within_a_few_standard_errors(distinct):
+    sketch = HyperLogLog(12)
+    for ip in ips(0, distinct):
+        sketch.add(ip)
+        sketch.add(ip)  # Repeats never change the estimate
+    error = 1.04 / (1 << 6)
+    assert abs(sketch.count() - distinct) <= max(2, 4 * error * distinct)
+
+
+def test_merge_counts_the_union():
+    left, right, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for ip in ips(0, 30000):
+        left.add(ip)
+        both.add(ip)
+    for ip in ips(20000, 30000):
+        right.add(ip)
+        both.add(ip)
+
+    left.merge(right)
+    assert left.registers == both.registers
+    assert abs(left.count() - 50000) <= 4 * 1.04 / 64 * 50000
+
+
+def test_merge_is_idempotent():
+    sketch, other = HyperLogLog(), HyperLogLog()
+    for ip in ips(0, 5000):
+        other.add(ip)
+    sketch.merge(other)
+    once = bytes(sketch.registers)
+    sketch.merge(other)
+    assert bytes(sketch.registers) == once
+
+
+def test_merge_rejects_another_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(10))
+
+
+def test_bytes_round_trip():
+    sketch = HyperLogLog(10)
+    for ip in ips(0, 100):
+        sketch.add(ip)
+    assert HyperLogLog.from_bytes(sketch.to_bytes()).registers == sketch.registers
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(sketch.to_bytes()[:-1])
+
+
+def test_sliding_window_drops_old_slices():
+    window = SlidingHyperLogLog(60, 6)
+    for ip in ips(0, 100):
+        window.add_hash(hash64(ip), now=1000)
+    for ip in ips(100, 50):
+        window.add_hash(hash64(ip), now=1030)
+    assert abs(window.count(now=1030) - 150) <= 3
+    assert abs(window.count(now=1065) - 50) <= 2
+    assert window.count(now=1100) == 0
+
+
+def test_encoded_windows_merge_across_workers():
+    first, second = SlidingHyperLogLog(60, 6), SlidingHyperLogLog(60, 6)
+    for ip in ips(0, 400):
+        first.add_hash(hash64(ip), now=1000)
+    for ip in ips(200, 400):
+        second.add_hash(hash64(ip), now=1015)
+
+    first.merge_encoded(second.encode())
+    first.merge_encoded(second.encode())  # Reports repeat; merging again changes nothing
+    assert abs(first.count(now=1020) - 600) <= 4 * 1.04 / 64 * 600
+
+
+def test_unique_counter_reports_every_window():
+    counter = UniqueCounter()
+    for ip in ips(0, 20):
+        counter.add(ip)
+    assert counter.counts() == {'minute': 20, 'hour': 20, 'day': 20}
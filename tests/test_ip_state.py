@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+import ip_state
+from ip_state import IPStateStore, int_to_ip, ip_to_int
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1_000_000)
+    monkeypatch.setattr(ip_state.time, 'time', clock)
+    return clock
+
+
+def make_store(capacity=16, ttl=60, stripes=1, **kwargs):
+    options = dict(initial_delay=1.0, delay_increment=2.0, max_delay=60.0, decay_interval=0)
+    options.update(kwargs)
+    return IPStateStore(capacity, ttl, stripes=stripes, **options)
+
+
+def test_keys_round_trip_for_both_families():
+    for ip in ('203.0.113.7', '2001:db8::1', '::1', '0.0.0.0'):
+        assert int_to_ip(ip_to_int(ip)) == ip
+
+
+def test_counts_and_delays(clock):
+    store = make_store()
+    assert store.record_connection('203.0.113.7') == (1, 1.0)
+    store.record_close('203.0.113.7')
+    assert store.record_connection('203.0.113.7') == (2, 3.0)
+    assert store['203.0.113.7'] == 2
+    assert store.get_delay('198.51.100.1') == 1.0
+
+
+def test_delay_decays_while_quiet(clock):
+    store = make_store(decay_interval=100)
+    for _ in range(3):
+        store.record_connection('203.0.113.7')
+        store.record_close('203.0.113.7')
+    assert store.get_delay('203.0.113.7') == 7.0
+    clock.now += 150
+    assert store.get_delay('203.0.113.7') == 5.0
+    clock.now += 1000
+    assert store.get_delay('203.0.113.7') == 1.0
+
+
+def test_ttl_sweep_forgets_idle_ips(clock):
+    store = make_store(capacity=16, ttl=60)
+    idle = [f'203.0.113.{i}' for i in range(10)]
+    for ip in idle:
+        store.record_connection(ip)
+
+    clock.now += 30
+    for _ in range(store.stripes[0].table.size):
+        store.record_connection('198.51.100.1')
+    assert all(ip in store for ip in idle)
+
+    clock.now += 31
+    for _ in range(store.stripes[0].table.size):
+        store.record_connection('198.51.100.1')
+    assert not any(ip in store for ip in idle)
+    assert len(store) == 1
+    assert store.stats()['evictions'] == 10
+
+
+def test_capacity_is_never_exceeded(clock):
+    store = make_store(capacity=8, ttl=10 ** 9, stripes=4)
+    for i in range(100):
+        store.record_connection(f'10.0.0.{i}')
+        clock.now += 1
+        assert len(store) <= 8
+    assert store.stats()['evictions'] == 100 - len(store)
+    assert '10.0.0.99' in store
+
+
+def test_eviction_prefers_least_recently_seen(clock):
+    random.seed(7)
+    store = make_store(capacity=50, ttl=10 ** 9)
+    ips = [f'10.0.0.{i}' for i in range(50)]
+    for ip in ips:
+        store.record_connection(ip)
+    clock.now += 100
+    recent = ips[::2]
+    for ip in recent:
+        store.record_connection(ip)
+
+    clock.now += 100
+    for i in range(10):
+        store.record_connection(f'10.1.0.{i}')
+
+    assert len(store) == 50
+    evicted_recent = sum(ip not in store for ip in recent)
+    evicted_stale = sum(ip not in store for ip in ips[1::2])
+    assert evicted_recent + evicted_stale == 10
+    assert evicted_stale >= 8
+
+
+def test_capacity_below_one_is_rejected():
+    with pytest.raises(ValueError):
+        make_store(capacity=0)
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from ip_table import CompactIPTable
+
+
+def keys_with_home(table, home, count, start=1):
+    keys = []
+    key = start
+    while len(keys) < count:
+        if table._home(*table.split_key(key)) == home:
+            keys.append(key)
+        key += 1
+    return keys
+
+
+def test_insert_and_lookup():
+    table = CompactIPTable(capacity=6)
+    index = table.insert(42, 1.5, 100)
+    assert table.lookup(42) == index
+    assert table.read(index) == (0, 1.5, 100, 100)
+    assert table.lookup(43) == -1
+    assert len(table) == 1
+
+
+def test_write_keeps_first_seen():
+    table = CompactIPTable(capacity=6)
+    index = table.insert(7, 1.0, 100)
+    table.write(index, 3, 5.0, 200)
+    assert table.read(index) == (3, 5.0, 100, 200)
+    assert table.key_at(index) == 7
+
+
+def test_probe_chain_wraps_past_the_last_slot():
+    table = CompactIPTable(capacity=6)
+    last = table.size - 1
+    keys = keys_with_home(table, last, 3)
+    slots = [table.insert(key, 1.0, 100) for key in keys]
+    assert slots == [last, 0, 1]
+    for key, slot in zip(keys, slots):
+        assert table.lookup(key) == slot
+
+
+def test_backward_shift_delete_across_wraparound():
+    table = CompactIPTable(capacity=6)
+    last = table.size - 1
+    wrapped = keys_with_home(table, last, 3)
+    at_zero = keys_with_home(table, 0, 1)[0]
+    for key in wrapped:
+        table.insert(key, 1.0, 100)
+    table.insert(at_zero, 2.0, 100)  # Home 0 is taken, so it lands in slot 2
+
+    table.delete_at(table.lookup(wrapped[0]))
+
+    # Every later chain member moved back one slot; nothing is left stranded
+    assert table.lookup(wrapped[0]) == -1
+    assert table.lookup(wrapped[1]) == last
+    assert table.lookup(wrapped[2]) == 0
+    assert table.lookup(at_zero) == 1
+    assert not table.occupied(2)
+    assert len(table) == 3
+
+
+def test_backward_shift_leaves_records_at_home():
+    table = CompactIPTable(capacity=6)
+    first, second = keys_with_home(table, 3, 2)
+    at_five = keys_with_home(table, 5, 1)[0]
+    table.insert(first, 1.0, 100)
+    table.insert(second, 1.0, 100)  # Slot 4
+    table.insert(at_five, 1.0, 100)  # Slot 5, its home
+
+    table.delete_at(table.lookup(first))
+
+    assert table.lookup(second) == 3
+    assert table.lookup(at_five) == 5
+    assert not table.occupied(4)
+
+
+def test_random_inserts_and_deletes_match_a_dict():
+    rng = random.Random(1)
+    table = CompactIPTable(capacity=200)
+    expected = {}
+    for step in range(5000):
+        key = rng.getrandbits(128) if rng.random() < 0.5 or not expected else rng.choice(list(expected))
+        if key in expected:
+            table.delete_at(table.lookup(key))
+            del expected[key]
+        elif len(expected) < table.capacity:
+            table.insert(key, 1.0, step + 1)
+            expected[key] = step + 1
+
+        if step % 250 == 0:
+            for known, first_seen in expected.items():
+                assert table.read(table.lookup(known))[2] == first_seen
+    assert len(table) == len(expected)
+    assert {key for key, *_ in table} == set(expected)
+
+
+def test_full_table_refuses_inserts():
+    table = CompactIPTable(capacity=6, size=8)
+    for key in range(1, 8):
+        table.insert(key, 1.0, 100)
+    with pytest.raises(OverflowError):
+        table.insert(8, 1.0, 100)
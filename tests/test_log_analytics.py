@@ -0,0 +1,95 @@
+import pytest
+
+from log_analytics import analyze_file, normalize_time, parse_events, parse_records
+
+
+# Written before byte counts, offsets and payload hashes were logged
+OLD_LOG = """\
+2026-01-31 12:00:00,001 - deadlockssh - INFO - Connection from 10.0.0.1:5000 (attempt #1, delay: 10.0s)
+2026-01-31 12:00:05,002 - deadlockssh - INFO - Data from 10.0.0.1: SSH-2.0-libssh\r
+2026-01-31 12:00:09,003 - deadlockssh - INFO - Connection from 10.0.0.1 closed
+"""
+
+NEW_LOG = """\
+2026-01-31 13:00:00,001 - deadlockssh - INFO - Connection from 10.0.0.1:5001 (attempt #2, delay: 12.5s)
+2026-01-31 13:00:01,002 - deadlockssh - INFO - Client 10.0.0.1:5001 identifies as SSH-2.0-Go
+2026-01-31 13:00:01,003 - deadlockssh - INFO - Client 10.0.0.1:5001 HASSH 0123456789abcdef0123456789abcdef
+2026-01-31 13:00:01,004 - deadlockssh - INFO - Data from 10.0.0.1 (offset 0) [payload aa11]
+2026-01-31 13:00:02,005 - deadlockssh - INFO - Data from 10.0.0.1 (offset 508) [payload bb22]: uname -a
+cat /etc/passwd
+2026-01-31 13:00:03,006 - deadlockssh - INFO - Data from 10.0.0.2 (offset 0): hello
+2026-01-31 13:00:09,007 - deadlockssh - INFO - Connection from 10.0.0.1 closed (2048 bytes sent)
+2026-01-31 13:00:10,008 - deadlockssh - INFO - Connection from 10.0.0.2 timed out
+"""
+
+
+def events(text):
+    return list(parse_events(parse_records(text.split('\n'))))
+
+
+def test_old_format_events():
+    assert events(OLD_LOG) == [
+        ('connect', '2026-01-31 12:00:00', '10.0.0.1', 5000),
+        ('data', '2026-01-31 12:00:05', '10.0.0.1', None, 'SSH-2.0-libssh\r'),
+        ('close', '2026-01-31 12:00:09', '10.0.0.1', None),
+    ]
+
+
+def test_new_format_events():
+    assert events(NEW_LOG) == [
+        ('connect', '2026-01-31 13:00:00', '10.0.0.1', 5001),
+        ('client_id', '2026-01-31 13:00:01', '10.0.0.1', 'SSH-2.0-Go'),
+        ('hassh', '2026-01-31 13:00:01', '10.0.0.1', '0123456789abcdef0123456789abcdef'),
+        ('data', '2026-01-31 13:00:01', '10.0.0.1', 'aa11', None),
+        ('data', '2026-01-31 13:00:02', '10.0.0.1', 'bb22', 'uname -a\ncat /etc/passwd'),
+        ('data', '2026-01-31 13:00:03', '10.0.0.2', None, 'hello'),
+        ('close', '2026-01-31 13:00:09', '10.0.0.1', 2048),
+    ]
+
+
+def test_lines_before_the_first_record_are_dropped():
+    assert list(parse_records(['continuation without a record', 'garbage'])) == []
+
+
+def test_report_over_both_formats(tmp_path):
+    log = tmp_path / 'deadlockssh.log'
+    log.write_text(OLD_LOG + NEW_LOG)
+    report = analyze_file((str(log), None, None, frozenset({'10.0.0.2'}))).to_dict(top=10)
+
+    assert report['files'] == 1
+    assert report['records'] == 11
+    assert report['connections'] == 2
+    assert report['unique_ips'] == 2
+    first = report['top_ips'][0]
+    assert first['ip'] == '10.0.0.1'
+    assert (first['connections'], first['bytes_sent'], first['data_chunks']) == (2, 2048, 3)
+    assert (first['first_seen'], first['last_seen']) == ('2026-01-31 12:00:00', '2026-01-31 13:00:09')
+    assert first['versions'] == ['SSH-2.0-Go']
+    assert report['hourly_connections'] == {'2026-01-31 12:00': 1, '2026-01-31 13:00': 1}
+    assert {entry['data'] for entry in report['top_payloads']} == {
+        'SSH-2.0-libssh\r', None, 'uname -a\ncat /etc/passwd', 'hello'
+    }
+    assert [event['event'] for event in report['timelines']['10.0.0.2']] == ['data']
+
+
+def test_time_window(tmp_path):
+    log = tmp_path / 'deadlockssh.log'
+    log.write_text(OLD_LOG + NEW_LOG)
+    since = normalize_time('2026-01-31 13')
+    report = analyze_file((str(log), since, None, frozenset())).to_dict(top=10)
+    assert report['hourly_connections'] == {'2026-01-31 13:00': 1}
+    assert report['top_ips'][0]['data_chunks'] == 2
+
+
+def test_unreadable_file_is_reported(tmp_path):
+    report = analyze_file((str(tmp_path / 'missing.log'), None, None, frozenset())).to_dict(top=10)
+    assert report['files'] == 0
+    assert report['files_skipped'] == 1
+    assert report['files_failed'][0]['path'].endswith('missing.log')
+
+
+def test_normalize_time():
+    assert normalize_time('2026-01-31') == '2026-01-31 00:00:00'
+    assert normalize_time('2026-01-31T12:30', end=True) == '2026-01-31 12:30:59'
+    with pytest.raises(ValueError):
+        normalize_time('yesterday')
@@ -0,0 +1,124 @@
+import hashlib
+import random
+import struct
+
+import pytest
+
+from ssh_parser import KEXINIT_FIELDS, MAX_IDENT_LENGTH, MAX_PACKET_LENGTH, SSHClientParser
+
+
+IDENT = b'SSH-2.0-OpenSSH_9.6p1 Ubuntu-3\r\n'
+COOKIE = bytes(range(100, 116))
+LISTS = {field: '' for field in KEXINIT_FIELDS}
+LISTS.update({
+    'kex_algorithms': 'curve25519-sha256,diffie-hellman-group14-sha256',
+    'server_host_key_algorithms': 'ssh-ed25519',
+    'encryption_client_to_server': 'aes128-ctr,aes256-gcm@openssh.com',
+    'encryption_server_to_client': 'aes128-ctr',
+    'mac_client_to_server': 'hmac-sha2-256',
+    'mac_server_to_client': 'hmac-sha2-256',
+    'compression_client_to_server': 'none',
+    'compression_server_to_client': 'none',
+})
+
+
+def kexinit_packet(lists=LISTS, message=20):
+    payload = bytes([message]) + COOKIE
+    for field in KEXINIT_FIELDS:
+        name_list = lists[field].encode()
+        payload += struct.pack('>I', len(name_list)) + name_list
+    payload += b'\x00' + b'\x00\x00\x00\x00'  # first_kex_packet_follows, reserved
+    padding = 8 - (len(payload) + 5) % 8 + 8
+    return struct.pack('>IB', len(payload) + padding + 1, padding) + payload + bytes(padding)
+
+
+STREAM = IDENT + kexinit_packet() + b'trailing bytes after the handshake'
+
+
+def feed_chunks(chunks):
+    parser = SSHClientParser()
+    completed = []
+    for chunk in chunks:
+        completed.extend(parser.feed(memoryview(chunk)))
+    return parser, completed
+
+
+def split(data, cuts):
+    edges = [0] + sorted(cuts) + [len(data)]
+    return [data[a:b] for a, b in zip(edges, edges[1:])]
+
+
+def assert_parsed(parser, completed):
+    assert completed == ['version', 'kexinit']
+    assert parser.done
+    assert parser.client_version == IDENT.rstrip(b'\r\n').decode()
+    assert parser.kexinit == LISTS
+    algorithms = 'curve25519-sha256,diffie-hellman-group14-sha256;aes128-ctr,aes256-gcm@openssh.com;hmac-sha2-256;none'
+    assert parser.hassh_algorithms == algorithms
+    assert parser.hassh == hashlib.md5(algorithms.encode()).hexdigest()
+    start, end = parser.cookie_range
+    assert STREAM[start:end] == COOKIE
+
+
+def test_whole_handshake_in_one_chunk():
+    assert_parsed(*feed_chunks([STREAM]))
+
+
+def test_every_two_way_split():
+    for cut in range(1, len(STREAM)):
+        assert_parsed(*feed_chunks(split(STREAM, [cut])))
+
+
+def test_one_byte_at_a_time():
+    assert_parsed(*feed_chunks([STREAM[i:i + 1] for i in range(len(STREAM))]))
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_random_chunking(seed):
+    rng = random.Random(seed)
+    cuts = rng.sample(range(1, len(STREAM)), rng.randint(2, 12))
+    assert_parsed(*feed_chunks(split(STREAM, cuts)))
+
+
+def test_version_is_reported_before_the_kexinit_arrives():
+    parser = SSHClientParser()
+    assert parser.feed(IDENT + kexinit_packet()[:10]) == ['version']
+    assert not parser.done
+    assert parser.cookie_range is None
+
+
+def test_non_ssh_input_is_ignored():
+    parser, completed = feed_chunks([b'GET / HTTP/1.1\r\n', b'Host: example\r\n\r\n'])
+    assert completed == []
+    assert parser.done
+    assert parser.client_version is None
+
+
+def test_identification_line_without_newline_fails():
+    parser, completed = feed_chunks([b'SSH-2.0-' + b'x' * 200, b'y' * MAX_IDENT_LENGTH])
+    assert completed == []
+    assert parser.done
+    assert parser.pending is None
+
+
+def test_oversize_packet_length_fails():
+    header = struct.pack('>IB', MAX_PACKET_LENGTH + 1, 4)
+    parser, completed = feed_chunks([IDENT, header[:2], header[2:] + bytes(100)])
+    assert completed == ['version']
+    assert parser.done
+    assert parser.kexinit is None
+
+
+def test_first_packet_other_than_kexinit_fails():
+    parser, completed = feed_chunks([IDENT + kexinit_packet(message=21)])
+    assert completed == ['version']
+    assert parser.done
+    assert parser.kexinit is None
+
+
+def test_truncated_name_list_fails():
+    packet = bytearray(kexinit_packet())
+    struct.pack_into('>I', packet, 5 + 17, 10000)  # kex_algorithms runs past the payload
+    parser, completed = feed_chunks([IDENT, bytes(packet)])
+    assert completed == ['version']
+    assert parser.kexinit is None
@@ -0,0 +1,75 @@
+import pytest
+
+from timer_wheel import TimerWheel
+
+
+def make_wheel():
+    # A tiny wheel (4 slots, 3 levels, 1 second ticks) so short delays
+    # already live on the upper levels and have to cascade down
+    wheel = TimerWheel(tick=1.0, slots=4, levels=3)
+    return wheel, float(wheel.current_tick)
+
+
+def fire_times(wheel, start, until, calls):
+    # (label, second) for each callback, advancing one second at a time
+    fired = []
+    for second in range(1, until + 1):
+        wheel.advance(start + second)
+        fired.extend((label, second) for label in calls)
+        calls.clear()
+    return fired
+
+
+def schedule(wheel, delays):
+    calls = []
+    for delay in delays:
+        wheel.schedule(delay, calls.append, delay)
+    return calls
+
+
+def test_rejects_slot_counts_that_are_not_powers_of_two():
+    with pytest.raises(ValueError):
+        TimerWheel(slots=6)
+
+
+@pytest.mark.parametrize('delays', [[1, 2, 3], [4, 5, 15, 16, 17], [30, 63]])
+def test_timers_fire_on_their_deadline_after_cascading(delays):
+    wheel, start = make_wheel()
+    calls = schedule(wheel, delays)
+    assert len(wheel) == len(delays)
+
+    fired = fire_times(wheel, start, max(delays) + 2, calls)
+    assert fired == [(delay, delay) for delay in sorted(delays)]
+    assert len(wheel) == 0
+
+
+def test_timer_beyond_the_wheel_range_is_parked_and_fires_on_time():
+    wheel, start = make_wheel()
+    calls = schedule(wheel, [150])
+    assert fire_times(wheel, start, 160, calls) == [(150, 150)]
+
+
+def test_cancelled_timers_do_not_fire_and_leave_the_count():
+    wheel, start = make_wheel()
+    calls = []
+    keep = wheel.schedule(20, calls.append, 'keep')
+    wheel.schedule(20, calls.append, 'drop').cancel()
+    wheel.schedule(2, calls.append, 'early').cancel()
+
+    assert fire_times(wheel, start, 25, calls) == [('keep', 20)]
+    assert len(wheel) == 0
+    assert not keep.cancelled
+
+
+def test_advancing_over_a_long_gap_fires_everything_due():
+    wheel, start = make_wheel()
+    calls = schedule(wheel, [3, 17, 40])
+    assert wheel.advance(start + 41) == 3
+    assert sorted(calls) == [3, 17, 40]
+
+
+def test_empty_wheel_jumps_to_the_current_tick():
+    wheel, start = make_wheel()
+    wheel.advance(start + 1000)
+    calls = schedule(wheel, [5])
+    assert fire_times(wheel, start + 1000, 6, calls) == [(5, 5)]
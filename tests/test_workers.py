@@ -0,0 +1,68 @@
+import logging
+from types import SimpleNamespace
+
+from workers import WorkerSupervisor, merge_stats, worker_log_file
+
+
+def test_numbers_sum_and_dicts_merge_by_key():
+    first = {'total_connections': 3, 'bytes': 1.5, 'ssh_versions': {'a': 1, 'b': 2}}
+    second = {'total_connections': 4, 'bytes': 2.0, 'ssh_versions': {'b': 5, 'c': 1}}
+    assert merge_stats(merge_stats(None, first), second) == {
+        'total_connections': 7, 'bytes': 3.5, 'ssh_versions': {'a': 1, 'b': 7, 'c': 1}
+    }
+
+
+def test_merge_leaves_the_inputs_alone():
+    first = {'nested': {'count': 1}}
+    second = {'nested': {'count': 2}}
+    merge_stats(first, second)
+    assert first == {'nested': {'count': 1}}
+
+
+def test_lists_sum_element_wise_when_lengths_match():
+    # Space-Saving entries travel as [count, error]
+    assert merge_stats({'top': {'1.2.3.4': [5, 1]}}, {'top': {'1.2.3.4': [2, 0]}}) == {'top': {'1.2.3.4': [7, 1]}}
+    assert merge_stats([1, 2], [1, 2, 3]) == [1, 2]
+
+
+def test_delays_take_the_maximum_and_start_time_the_minimum():
+    first = {'ip_delays': {'1.2.3.4': 10.0}, 'start_time': 200.0}
+    second = {'ip_delays': {'1.2.3.4': 4.0, '5.6.7.8': 2.0}, 'start_time': 100.0}
+    assert merge_stats(first, second) == {
+        'ip_delays': {'1.2.3.4': 10.0, '5.6.7.8': 2.0}, 'start_time': 100.0
+    }
+
+
+def test_other_values_keep_the_first_seen():
+    # The algorithm string of a fingerprint entry is not summed
+    first = {'fp': [3, 0, 'curve25519-sha256;aes128-ctr;hmac-sha2-256;none']}
+    second = {'fp': [1, 0, 'other']}
+    assert merge_stats(first, second) == {'fp': [4, 0, 'curve25519-sha256;aes128-ctr;hmac-sha2-256;none']}
+    assert merge_stats({'engine': 'reactor', 'flag': True}, {'engine': 'asyncio', 'flag': False}) == {
+        'engine': 'reactor', 'flag': True
+    }
+
+
+def test_worker_log_file_names():
+    assert worker_log_file('deadlockssh.log', 0) == 'deadlockssh.worker-0.log'
+    assert worker_log_file('/var/log/hp', 3) == '/var/log/hp.worker-3'
+
+
+def test_private_ip_tables_are_reported_per_worker():
+    honeypot = SimpleNamespace(
+        logger=logging.getLogger('test'),
+        config={'stats_report_interval': 1},
+        ip_state=SimpleNamespace(file=None)
+    )
+    supervisor = WorkerSupervisor(honeypot, 2)
+    supervisor.snapshots = {
+        0: {'total_connections': 2, 'ip_state': {'entries': 2, 'evictions': 0}},
+        1: {'total_connections': 3, 'ip_state': {'entries': 1, 'evictions': 4}},
+    }
+    merged = supervisor.merged_snapshot()
+    assert merged['total_connections'] == 5
+    assert 'ip_state' not in merged
+    assert merged['ip_state_per_worker'] == {
+        '0': {'entries': 2, 'evictions': 0}, '1': {'entries': 1, 'evictions': 4}
+    }
+    assert supervisor.snapshots[0]['ip_state'] == {'entries': 2, 'evictions': 0}
@@ -0,0 +1,136 @@
+import math
+import threading
+import time
+
+
+class Timer:
+    """
+    A single scheduled callback on a TimerWheel.
+    """
+    __slots__ = ('deadline', 'callback', 'args', 'cancelled')
+
+    def __init__(self, deadline: int, callback, args: tuple):
+        self.deadline = deadline  # Absolute deadline in ticks
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        Cancel the timer. It is dropped lazily when its slot expires.
+        """
+        self.cancelled = True
+
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel with O(1) insert, cancel and expiry.
+
+    Level 0 has one slot per tick; each higher level covers `slots` times
+    the range of the level below it. Timers far in the future sit in a
+    coarse slot and cascade down as the wheel turns, so each timer is
+    touched at most `levels` times over its lifetime.
+    """
+    def __init__(self, tick: float = 0.01, slots: int = 256, levels: int = 4):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.bits = slots.bit_length() - 1
+        self.mask = slots - 1
+        self.max_ticks = slots ** levels - 1
+        self.wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.current_tick = self._to_tick(time.monotonic())
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def _to_tick(self, now: float) -> int:
+        return int(now / self.tick)
+
+    def __len__(self):
+        return self.count
+
+    def schedule(self, delay: float, callback, *args) -> Timer:
+        """
+        Schedule callback(*args) to run after `delay` seconds.
+
+        Args:
+            delay: Delay in seconds (rounded up to the wheel resolution)
+            callback: Callable to invoke on expiry
+
+        Returns:
+            Timer handle that can be cancelled
+        """
+        ticks = max(1, math.ceil(delay / self.tick))
+        with self.lock:
+            timer = Timer(self.current_tick + ticks, callback, args)
+            self._insert(timer)
+            self.count += 1
+        return timer
+
+    def _insert(self, timer: Timer):
+        # schedule() always inserts at least one tick ahead; a cascade may
+        # insert a timer due on the current tick, whose level 0 slot is
+        # expired right after cascading.
+        ticks = max(0, timer.deadline - self.current_tick)
+        deadline = timer.deadline
+        if ticks > self.max_ticks:
+            # Beyond the wheel's range; park at the far edge and re-cascade later
+            deadline = self.current_tick + self.max_ticks
+
+        for level in range(self.levels):
+            if ticks < 1 << (self.bits * (level + 1)) or level == self.levels - 1:
+                index = (deadline >> (self.bits * level)) & self.mask
+                self.wheels[level][index].append(timer)
+                return
+
+    def _cascade(self, level: int):
+        index = (self.current_tick >> (self.bits * level)) & self.mask
+        bucket = self.wheels[level][index]
+        if bucket:
+            self.wheels[level][index] = []
+            for timer in bucket:
+                if not timer.cancelled:
+                    self._insert(timer)
+                else:
+                    self.count -= 1
+
+    def advance(self, now: float = None) -> int:
+        """
+        Turn the wheel up to `now` and run every timer that has expired.
+
+        Args:
+            now: Monotonic time in seconds (defaults to time.monotonic())
+
+        Returns:
+            Number of callbacks invoked
+        """
+        target = self._to_tick(time.monotonic() if now is None else now)
+        expired = []
+
+        with self.lock:
+            if self.count == 0:
+                self.current_tick = max(self.current_tick, target)
+                return 0
+
+            while self.current_tick < target:
+                self.current_tick += 1
+                for level in range(1, self.levels):
+                    if self.current_tick & ((1 << (self.bits * level)) - 1):
+                        break
+                    self._cascade(level)
+
+                index = self.current_tick & self.mask
+                bucket = self.wheels[0][index]
+                if bucket:
+                    self.wheels[0][index] = []
+                    self.count -= len(bucket)
+                    expired.extend(bucket)
+
+        fired = 0
+        for timer in expired:
+            if not timer.cancelled:
+                timer.callback(*timer.args)
+                fired += 1
+        return fired
@@ -0,0 +1,174 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+# Counted quantities, in bucket order
+FIELDS = ('accepts', 'closes', 'bytes_in', 'banners')
+ACCEPTS, CLOSES, BYTES_IN, BANNERS = range(len(FIELDS))
+
+# Bucket widths in seconds
+RESOLUTIONS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+
+class RingSeries:
+    """
+    Fixed-size ring of time buckets at one resolution.
+
+    Bucket n covers [n * width, (n + 1) * width) in Unix time and lives in
+    slot n % length, next to the bucket number it currently holds. A slot
+    still holding an older bucket is zeroed when a newer one reaches it,
+    so adding is O(1) and nothing ever has to sweep expired buckets.
+    """
+    __slots__ = ('width', 'length', 'numbers', 'counts')
+
+    def __init__(self, width: int, length: int):
+        self.width = width
+        self.length = length
+        self.numbers = [-1] * length  # Bucket number held by each slot
+        self.counts = [0] * (length * len(FIELDS))  # Slot-major, one count per field
+
+    def add(self, number: int, counts: List[int]):
+        """
+        Add one bucket's counts, unless its slot already holds a newer bucket.
+        """
+        slot = number % self.length
+        base = slot * len(FIELDS)
+        held = self.numbers[slot]
+        if held != number:
+            if held > number:
+                return
+            self.counts[base:base + len(FIELDS)] = [0] * len(FIELDS)
+            self.numbers[slot] = number
+        for index, count in enumerate(counts):
+            self.counts[base + index] += count
+
+    def value(self, now: float) -> Dict[str, list]:
+        """
+        Return the live non-empty buckets keyed by bucket number.
+        """
+        current = int(now // self.width)
+        buckets = {}
+        for slot, number in enumerate(self.numbers):
+            if current - self.length < number <= current:
+                counts = self.counts[slot * len(FIELDS):(slot + 1) * len(FIELDS)]
+                if any(counts):
+                    buckets[str(number)] = counts
+        return buckets
+
+
+class ConnectionRates:
+    """
+    Rolling per-second, per-minute and per-hour counts of accepts,
+    closes, bytes received and banner completions.
+
+    Like stats.ShardedCounters, each thread counts into its own shard, so
+    an update takes no lock. A shard holds only the buckets its thread
+    touched, at most one ring's worth per resolution, and drops the oldest
+    as it adds a new one, so an update stays O(1). Reads sum the shards;
+    shards of finished threads are folded into one fixed-size RingSeries
+    per resolution. Buckets are aligned to Unix time, so values from
+    several workers merge by summing buckets with the same number (see
+    workers.merge_stats).
+    """
+    def __init__(self, seconds: int = 600, minutes: int = 1440, hours: int = 168):
+        lengths = {'second': seconds, 'minute': minutes, 'hour': hours}
+        self.rings = {
+            name: RingSeries(width, lengths[name])
+            for name, width in RESOLUTIONS.items() if lengths[name] > 0
+        }
+        self.local = threading.local()
+        self.shards = {}  # id(shard) -> (owning thread, shard)
+        self.fold_threshold = 64
+        self.read_lock = threading.Lock()  # Serializes readers only
+
+    def _shard(self) -> tuple:
+        # (width, length, buckets) per resolution; buckets maps bucket
+        # number -> counts, oldest first
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = tuple((ring.width, ring.length, {}) for ring in self.rings.values())
+            self.shards[id(shard)] = (threading.current_thread(), shard)
+            if len(self.shards) > self.fold_threshold:
+                # Once per new thread, never per update
+                self.value()
+            return shard
+
+    def add(self, field: int, amount: int = 1):
+        """
+        Count an event in the current bucket of every resolution.
+
+        Args:
+            field: ACCEPTS, CLOSES, BYTES_IN or BANNERS
+            amount: How much to add
+        """
+        now = time.time()
+        for width, length, buckets in self._shard():
+            number = int(now // width)
+            counts = buckets.get(number)
+            if counts is None:
+                counts = buckets[number] = [0] * len(FIELDS)
+                oldest = next(iter(buckets))
+                if oldest <= number - length:
+                    del buckets[oldest]  # Left the window
+            counts[field] += amount
+
+    def value(self, now: Optional[float] = None) -> Dict[str, Dict[str, list]]:
+        """
+        Return every resolution's non-empty buckets in a form that merges by summing.
+        """
+        now = time.time() if now is None else now
+        with self.read_lock:
+            result = {name: ring.value(now) for name, ring in self.rings.items()}
+            for key, (thread, shard) in list(self.shards.items()):
+                finished = not thread.is_alive()
+                for (name, ring), (_, _, buckets) in zip(self.rings.items(), shard):
+                    current = int(now // ring.width)
+                    totals = result[name]
+                    for number, counts in buckets.copy().items():
+                        if not current - ring.length < number <= current:
+                            continue
+                        total = totals.setdefault(str(number), [0] * len(FIELDS))
+                        for index, count in enumerate(counts):
+                            total[index] += count
+                        if finished:
+                            ring.add(number, counts)
+                if finished:
+                    del self.shards[key]
+            self.fold_threshold = 2 * len(self.shards) + 64
+            return result
+
+    def render(self, value: Dict[str, Dict[str, list]], resolutions: Iterable[str] = RESOLUTIONS,
+               points: Optional[int] = None, now: Optional[float] = None) -> dict:
+        """
+        Turn a value() (possibly merged across workers) into one array per field.
+
+        Args:
+            value: Dictionary from value()
+            resolutions: Resolutions to include
+            points: Only the most recent buckets (defaults to the whole ring)
+            now: Time of the newest bucket (defaults to now)
+
+        Returns:
+            JSON-ready dictionary keyed by resolution. Arrays run oldest
+            first from `start` (Unix time) in steps of `width` seconds; the
+            last bucket is still filling.
+        """
+        now = time.time() if now is None else now
+        series = {}
+        for name in resolutions:
+            ring = self.rings.get(name)
+            if ring is None:
+                continue
+            length = min(points, ring.length) if points else ring.length
+            current = int(now // ring.width)
+            first = current - length + 1
+            buckets = value.get(name, {})
+            rows: List[list] = [buckets.get(str(number)) for number in range(first, current + 1)]
+            entry = {'width': ring.width, 'start': first * ring.width}
+            for index, field in enumerate(FIELDS):
+                entry[field] = [row[index] if row else 0 for row in rows]
+            series[name] = entry
+        return series
+
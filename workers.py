@@ -0,0 +1,278 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+
+# Keys merged with max()/min() instead of being summed across workers
+_MAX_KEYS = {'ip_delays'}
+_MIN_KEYS = {'start_time'}
+
+
+def worker_log_file(path: str, worker_id: int) -> str:
+    """
+    Name a worker's own log file after the main one.
+
+    Args:
+        path: Main log file path, e.g. deadlockssh.log
+        worker_id: Worker number
+
+    Returns:
+        Path such as deadlockssh.worker-0.log
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}.worker-{worker_id}{ext}"
+
+
+def merge_stats(total, snapshot, key=None):
+    """
+    Merge one worker's JSON-ready stats snapshot into a running total.
+
+    Numbers are summed, dicts are merged key by key, equal-length lists
+    are summed element-wise and anything else keeps the first value seen.
+
+    Args:
+        total: Merged value so far (None for the first snapshot)
+        snapshot: Value from the next worker
+        key: Stats key being merged, used to pick max/min semantics
+
+    Returns:
+        Merged value
+    """
+    if total is None:
+        return snapshot
+    if isinstance(total, dict) and isinstance(snapshot, dict):
+        merged = dict(total)
+        for k, v in snapshot.items():
+            merged[k] = merge_stats(merged.get(k), v, key if key in _MAX_KEYS else k)
+        return merged
+    if key in _MAX_KEYS:
+        return max(total, snapshot)
+    if key in _MIN_KEYS:
+        return min(total, snapshot)
+    if isinstance(total, (int, float)) and not isinstance(total, bool):
+        return total + snapshot
+    if isinstance(total, list) and isinstance(snapshot, list) and len(total) == len(snapshot):
+        return [merge_stats(a, b, key) for a, b in zip(total, snapshot)]
+    return total
+
+
+class WorkerSupervisor:
+    """
+    Runs N forked honeypot workers that share the port via SO_REUSEPORT.
+
+    The kernel spreads incoming connections across the workers' listening
+    sockets. Each worker periodically sends a stats snapshot (including
+    its ip_delays, top attackers, client fingerprints, unique-IP sketches
+    and rolling rate buckets) to the parent over a queue, and the parent
+    merges them into the single view served by HTTPStatsServer. With an
+    ip_state_file, the workers and the parent share one memory-mapped IP
+    table, which the parent reads directly. Each worker writes its own
+    log file (see worker_log_file), so no two processes rotate one file.
+
+    The first workers are forked before the parent starts any thread. A
+    worker that dies is re-forked from the running parent, whose stats
+    server and log writer threads may hold locks at that moment. The
+    child gets fresh log handlers and never serves HTTP, but a lock the
+    stats server held on shared state (such as an IP table stripe) would
+    stay held in the child. Restarts only follow a crash, so this is
+    accepted rather than paid for with a fork server.
+    """
+    def __init__(self, honeypot, num_workers: int):
+        self.honeypot = honeypot
+        self.logger = honeypot.logger
+        self.num_workers = num_workers
+        self.report_interval = honeypot.config['stats_report_interval']
+        self.context = multiprocessing.get_context('fork')
+        self.queue = self.context.Queue()
+        self.processes = {}
+        self.snapshots = {}
+        self.metric_values = {}  # worker_id -> latest /metrics values
+        self.timeseries_values = {}  # worker_id -> latest rolling rate buckets
+        self.lock = threading.Lock()
+
+    def spawn(self):
+        """
+        Fork every worker. Must run before any other threads are started.
+        """
+        for worker_id in range(self.num_workers):
+            self._spawn_worker(worker_id)
+        self.logger.info(f"Started {self.num_workers} workers on port {self.honeypot.config['port']}")
+
+    def _spawn_worker(self, worker_id: int):
+        process = self.context.Process(
+            target=self._worker_main,
+            args=(worker_id,),
+            name=f"deadlockssh-worker-{worker_id}",
+            daemon=True
+        )
+        # Fork between log writes, so the child's copy of the log file has
+        # nothing buffered that it would write again when closing it
+        file_handler = self.honeypot.file_handler
+        file_handler.acquire()
+        try:
+            process.start()
+        finally:
+            file_handler.release()
+        self.processes[worker_id] = process
+
+    def _worker_main(self, worker_id: int):
+        """
+        Entry point of a forked worker process.
+        """
+        honeypot = self.honeypot
+        honeypot.supervisor = None
+        honeypot.reuse_port = True
+        honeypot.config['workers'] = 1
+        honeypot.config['enable_http_stats'] = False  # Served by the parent
+        # A restarted worker forks after the parent's stats server started;
+        # its thread did not survive fork, so shutdown must not wait on it
+        honeypot.http_server_thread = None
+        honeypot.config['unique_ips_state_file'] = ''  # Saved by the parent
+        honeypot.reopen_log_file(worker_log_file(honeypot.config['log_file'], worker_id))
+        honeypot.setup_log_pipeline()  # Records queued in the parent are the parent's to write
+        # The parent stops reading reports at shutdown; a report still in
+        # the pipe must not keep this process from exiting
+        self.queue.cancel_join_thread()
+
+        reporter = threading.Thread(target=self._report_loop, args=(worker_id,), daemon=True)
+        reporter.start()
+
+        honeypot.start()
+
+    def _report_loop(self, worker_id: int):
+        while True:
+            time.sleep(self.report_interval)
+            if not self.honeypot.running:
+                continue
+            self._report(worker_id)
+
+    def _report(self, worker_id: int):
+        snapshot = self.honeypot.local_stats_snapshot()
+        if self.honeypot.ip_state.file:
+            # The parent maps the same state file and reads it directly
+            del snapshot['connections_per_ip']
+        else:
+            snapshot['ip_delays'] = self.honeypot.ip_state.delays()
+        snapshot['top_attackers'] = {
+            ip: [count, error]
+            for ip, count, error in self.honeypot.top_attackers.top(self.honeypot.top_attackers.capacity)
+        }
+        fingerprints = self.honeypot.client_fingerprints
+        snapshot['client_versions'] = {
+            version: [count, error]
+            for version, count, error in fingerprints.top_versions(fingerprints.capacity)
+        }
+        # The algorithm string rides along; merging keeps the first one seen
+        snapshot['client_fingerprints'] = {
+            fingerprint: [count, error, algorithms]
+            for fingerprint, count, error, algorithms in fingerprints.top_fingerprints(fingerprints.capacity)
+        }
+        snapshot['unique_ips'] = self.honeypot.unique_ips.encode()
+        snapshot['timeseries'] = self.honeypot.connection_rates.value()
+        snapshot['metrics'] = self.honeypot.metrics.values()
+        self.queue.put((worker_id, snapshot))
+
+    def run(self):
+        """
+        Collect worker snapshots and restart workers that die, until shutdown.
+        """
+        while self.honeypot.running:
+            try:
+                worker_id, snapshot = self.queue.get(timeout=0.5)
+                # Sketch merges are idempotent, so folding every report into
+                # the parent's own sketches also keeps what restarted workers saw
+                self.honeypot.unique_ips.merge_encoded(snapshot.pop('unique_ips', {}))
+                with self.lock:
+                    self.metric_values[worker_id] = snapshot.pop('metrics', {})
+                    self.timeseries_values[worker_id] = snapshot.pop('timeseries', {})
+                    self.snapshots[worker_id] = snapshot
+            except queue.Empty:
+                pass
+            except (EOFError, OSError):
+                break
+
+            for worker_id, process in list(self.processes.items()):
+                if not process.is_alive() and self.honeypot.running:
+                    self.logger.error(f"Worker {worker_id} exited with code {process.exitcode}, restarting")
+                    self._spawn_worker(worker_id)
+
+    def merged_snapshot(self) -> dict:
+        """
+        Merge the latest snapshot of every worker into one stats view.
+
+        Returns:
+            JSON-ready stats dictionary
+        """
+        with self.lock:
+            snapshots = dict(self.snapshots)
+
+        merged = None
+        for snapshot in snapshots.values():
+            merged = merge_stats(merged, snapshot)
+        if merged is None:
+            merged = self.honeypot.local_stats_snapshot()
+        elif not self.honeypot.ip_state.file:
+            # Each worker has its own table and the kernel spreads an IP's
+            # connections over several of them, so entries do not add up
+            merged = {key: value for key, value in merged.items() if key != 'ip_state'}
+            merged['ip_state_per_worker'] = {
+                str(worker_id): snapshot['ip_state'] for worker_id, snapshot in sorted(snapshots.items())
+            }
+        else:
+            # Workers share one mapped table; summing their views would
+            # count every IP once per worker
+            ip_state = self.honeypot.ip_state
+            evictions = merged.get('ip_state', {}).get('evictions', 0)
+            merged['connections_per_ip'] = ip_state.counts()
+            merged['ip_delays'] = ip_state.delays()
+            merged['ip_state'] = dict(ip_state.stats(), evictions=evictions)
+        merged['workers'] = sum(1 for p in self.processes.values() if p.is_alive())
+        return merged
+
+    def merged_metrics(self) -> dict:
+        """
+        Sum the latest /metrics values of every worker.
+
+        Returns:
+            Metric values keyed by metric name
+        """
+        with self.lock:
+            values = list(self.metric_values.values())
+
+        merged = {}
+        for worker_values in values:
+            merged = merge_stats(merged, worker_values)
+        return merged
+
+    def merged_timeseries(self) -> dict:
+        """
+        Sum the latest rolling rate buckets of every worker.
+
+        Buckets are numbered by Unix time, so workers' buckets for the
+        same interval share a key and merge_stats sums them.
+
+        Returns:
+            Buckets keyed by resolution and bucket number
+        """
+        with self.lock:
+            values = list(self.timeseries_values.values())
+
+        merged = {}
+        for worker_values in values:
+            merged = merge_stats(merged, worker_values)
+        return merged
+
+    def stop(self):
+        """
+        Terminate every worker and wait for them to exit.
+        """
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                self.logger.warning(f"{process.name} did not shut down gracefully.")
+                process.kill()  # Otherwise the parent's exit would wait for it
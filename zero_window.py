@@ -0,0 +1,137 @@
+import select
+import socket
+import threading
+import time
+
+from timer_wheel import TimerWheel
+
+
+class _Parked:
+    """
+    A client held in zero-window limbo.
+    """
+    __slots__ = ('client_socket', 'client_address', 'fd', 'timer')
+
+    def __init__(self, client_socket: socket.socket, client_address: tuple):
+        self.client_socket = client_socket
+        self.client_address = client_address
+        self.fd = client_socket.fileno()
+        self.timer = None
+
+
+def shrink_receive_buffer(sock: socket.socket, size: int = 1):
+    """
+    Request a minimal receive buffer (the kernel rounds up to its floor).
+
+    Set on a listening socket, accepted sockets inherit it before the
+    handshake, so the advertised window starts small.
+    """
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+
+
+class ZeroWindowParker(threading.Thread):
+    """
+    Holds clients whose input is no longer read.
+
+    Once a client's receive buffer fills, the kernel advertises a zero
+    TCP window and the client sits in persist-probe limbo, answered by
+    the kernel alone. Parked sockets cost no thread of their own: one
+    thread waits on an epoll set that only reports hangups (EPOLLRDHUP,
+    which unlike a read sees the peer's FIN behind unread data), and a
+    coarse TimerWheel closes clients still there after `hold_time`.
+    Without epoll, each socket is instead peeked at every
+    `probe_interval` seconds. `on_release(client_address)` is called
+    once each socket is closed.
+    """
+    def __init__(self, hold_time: float, probe_interval: float, on_release, logger):
+        super().__init__(name="deadlockssh-zero-window")
+        self.hold_time = hold_time
+        self.probe_interval = probe_interval
+        self.on_release = on_release
+        self.logger = logger
+        self.wheel = TimerWheel(tick=0.5, slots=64)
+        self.poller = select.epoll() if hasattr(select, 'epoll') else None
+        self.parked = {}  # fd -> _Parked
+        self.lock = threading.Lock()
+        self.running = False
+        self.daemon = True
+
+    def park(self, client_socket: socket.socket, client_address: tuple):
+        """
+        Take ownership of a client socket and stop reading from it.
+
+        Args:
+            client_socket: Client socket whose capture is complete
+            client_address: Client address tuple (ip, port)
+        """
+        try:
+            shrink_receive_buffer(client_socket)
+        except OSError:
+            pass
+        state = _Parked(client_socket, client_address)
+        with self.lock:
+            self.parked[state.fd] = state
+            state.timer = self.wheel.schedule(self.hold_time, self._release, state)
+        if self.poller:
+            self.poller.register(state.fd, select.EPOLLRDHUP | select.EPOLLHUP | select.EPOLLERR)
+        else:
+            self.wheel.schedule(min(self.probe_interval, self.hold_time), self._probe, state)
+
+    def _probe(self, state: _Parked):
+        if self.parked.get(state.fd) is not state:
+            return
+        try:
+            # Peek only: reading would reopen the window
+            if state.client_socket.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b'':
+                self._release(state)
+                return
+        except (BlockingIOError, InterruptedError):
+            pass  # Still connected, nothing new
+        except OSError:
+            self._release(state)
+            return
+        self.wheel.schedule(self.probe_interval, self._probe, state)
+
+    def _release(self, state: _Parked):
+        with self.lock:
+            if self.parked.get(state.fd) is not state:
+                return  # Already released
+            del self.parked[state.fd]
+            state.timer.cancel()
+            if self.poller:
+                try:
+                    self.poller.unregister(state.fd)
+                except OSError:
+                    pass
+            try:
+                state.client_socket.close()
+            except OSError:
+                pass
+        try:
+            self.on_release(state.client_address)
+        except Exception as e:
+            self.logger.error(f"Error releasing parked client {state.client_address[0]}: {e}")
+
+    def run(self):
+        self.running = True
+        tick = self.wheel.tick
+        while self.running:
+            try:
+                if self.poller:
+                    for fd, _ in self.poller.poll(tick):
+                        state = self.parked.get(fd)
+                        if state:
+                            self._release(state)
+                else:
+                    time.sleep(tick)
+                self.wheel.advance(time.monotonic())
+            except Exception as e:
+                self.logger.error(f"Zero-window parker error: {e}")
+
+    def stop(self):
+        """
+        Stop the parker and close every parked client.
+        """
+        self.running = False
+        for state in list(self.parked.values()):
+            self._release(state)